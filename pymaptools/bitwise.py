@@ -150,3 +150,52 @@ def create_bit_packer(bit_depth):
     else:
         fun = partial(packl_ctypes, bit_depth)
     return fun
+
+
+def popcount(num):
+    """Return the number of set bits of a non-negative number
+
+    :param num: some number
+    :type num: long, int
+    :rtype: int
+
+    ::
+
+        >>> popcount(0), popcount(0b101101), popcount(1 << 100)
+        (0, 4, 1)
+    """
+    return bin(num).count('1')
+
+
+def iter_set_bits(num):
+    """Iterate over positions of set bits of a non-negative number, lowest first
+
+    ::
+
+        >>> list(iter_set_bits(0b101101))
+        [0, 2, 3, 5]
+    """
+    while num:
+        lowest = num & -num
+        yield lowest.bit_length() - 1
+        num ^= lowest
+
+
+def from_indices(indices, size):
+    """Return a number with bits set at given positions (all below ``size``)
+
+    Takes time linear in ``size`` rather than in ``size`` times the number
+    of positions, as adding up powers of two would
+
+    ::
+
+        >>> from_indices([0, 2, 3, 5], 8) == 0b101101
+        True
+    """
+    if not size:
+        return 0
+    chars = bytearray('0' * size)
+    last = size - 1
+    for idx in indices:
+        chars[last - idx] = '1'
+    return int(str(chars), 2)
@@ -1,6 +1,12 @@
-from itertools import izip
+import struct
+import hashlib
+from math import log, fsum
+from numbers import Integral, Real
+from itertools import izip, imap
 from functools import partial
-from collections import defaultdict, Counter, Mapping
+from operator import itemgetter
+from collections import defaultdict, Counter, Mapping, MutableMapping
+from joblib import Parallel, delayed, cpu_count
 from pymaptools.iter import plen, iter_items, iter_keys, iter_vals
 from pymaptools._cyordereddict import OrderedDict
 from pymaptools._containers import OrderedSet, DefaultOrderedDict
@@ -10,6 +16,102 @@ OrderedCounter = partial(DefaultOrderedDict, int)
 
 SLICE_ALL = slice(None, None, None)
 
+# number of incremental updates after which floating-point running sums of
+# live_stats are recomputed from the table
+LIVE_STATS_REFRESH = 1 << 16
+
+
+def _comb2(count):
+    return count * (count - 1) // 2
+
+
+def _xlogx(count):
+    return count * log(count) if count > 0 else 0.0
+
+
+def _digest_repr(value):
+    """Representation of a label or count fed to content digests
+
+    Values that compare equal across storage types (integers of any Python
+    or NumPy type, integral floats, ASCII strings and unicode) are written
+    the same way::
+
+        >>> _digest_repr(2L) == _digest_repr(2.0), _digest_repr(u'a') == _digest_repr('a')
+        (True, True)
+    """
+    if isinstance(value, Integral):
+        return '%d' % value
+    if isinstance(value, Real):
+        value = float(value)
+        return '%d' % value if value.is_integer() else repr(value)
+    if isinstance(value, unicode):
+        value = value.encode('utf-8')
+    return repr(value)
+
+
+def _pack_values(values):
+    """Pack a list of labels or counts for content digests
+
+    Returns a type code and a string: integral values are packed as 64-bit
+    integers, other reals as doubles (both little-endian), and anything else
+    as NUL-separated representations. ``SparseCrossTab`` packs NumPy arrays
+    the same way without converting them to lists::
+
+        >>> _pack_values([1, 2.0]) == _pack_values([1L, 2]), _pack_values([0.5])[0]
+        (True, 'd')
+    """
+    # check types rather than values: ABC checks of NumPy scalars are slow
+    types = set(imap(type, values))
+    if all(issubclass(cls, Real) for cls in types):
+        if all(issubclass(cls, Integral) for cls in types):
+            ints = map(int, values)
+        else:
+            floats = map(float, values)
+            ints = map(int, floats) if all(value.is_integer() for value in floats) else None
+        if ints is not None:
+            try:
+                return 'q', struct.pack('<%dq' % len(ints), *ints)
+            except struct.error:
+                pass
+        floats = map(float, values)
+        return 'd', struct.pack('<%dd' % len(floats), *floats)
+    return 's', ''.join(_digest_repr(value) + '\0' for value in values)
+
+
+def _canonical_digest(*packed):
+    """SHA-1 digest (in hex) of a table in canonical CSR form
+
+    Takes ``(type code, string)`` pairs (see ``_pack_values``) for sorted row
+    labels, sorted column labels, ``indptr``, ``indices`` and cell counts
+    """
+    digest = hashlib.sha1()
+    for code, data in packed:
+        digest.update('%s%d\n' % (code, len(data)))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def _nonzero_cells(row):
+    return dict((key, val) for key, val in iter_items(row) if val)
+
+
+def _rows_equal(rows, other_rows):
+    """Compare nonzero cells of two tables given as rows
+
+    Rows held in dicts are compared directly; they are only filtered for
+    zero cells when they differ
+    """
+    if not isinstance(rows, Mapping):
+        rows = dict(iter_items(rows))
+    if not isinstance(other_rows, Mapping):
+        other_rows = dict(iter_items(other_rows))
+    for label in set(iter_keys(rows)) | set(iter_keys(other_rows)):
+        row = rows.get(label, ())
+        other_row = other_rows.get(label, ())
+        if row != other_row and _nonzero_cells(row) != _nonzero_cells(other_row):
+            return False
+    return True
+
 
 class Struct(object):
     """An abstract class with namespace-like properties
@@ -239,6 +341,9 @@ class CrossTab(object):
         self._row_totals = None
         self._col_totals = None
         self._grand_total = None
+        self._live_stats = None
+        self._canonical = None
+        self._content_hash = None
 
     @property
     def rows(self):
@@ -247,9 +352,10 @@ class CrossTab(object):
         _rows = self._rows
         if _rows is None:
             self._rows = _rows = self._row_type_2d()
-            for cid, col in iter_items(self._cols):
-                for rid, cell in iter_items(col):
-                    _rows[rid][cid] = cell
+            if self._cols is not None:
+                for cid, col in iter_items(self._cols):
+                    for rid, cell in iter_items(col):
+                        _rows[rid][cid] = cell
         return _rows
 
     @property
@@ -489,6 +595,429 @@ class CrossTab(object):
                 lpred.append(k)
         return cls.from_labels(ltrue, lpred)
 
+    def to_weighted_labels(self):
+        """Run-length form of ``to_labels``
+
+        Returns a tuple ``([a], [b], [w])`` with one entry per nonzero cell,
+        so memory use is proportional to the number of nonzero cells rather
+        than to the grand total. Inverse of ``from_weighted_labels``::
+
+            >>> t = OrderedCrossTab.from_labels([0, 0, 0, 1, 1], [0, 0, 1, 1, 1])
+            >>> t.to_weighted_labels()
+            ([0, 0, 1], [0, 1, 1], [2, 1, 2])
+            >>> OrderedCrossTab.from_weighted_labels(*t.to_weighted_labels()) == t
+            True
+        """
+        ltrue = []
+        lpred = []
+        weights = []
+        for (ri, ci), count in self.iteritems():
+            if count:
+                ltrue.append(ri)
+                lpred.append(ci)
+                weights.append(count)
+        return ltrue, lpred, weights
+
+    @classmethod
+    def from_weighted_labels(cls, labels_true, labels_pred, weights):
+        """Instantiate from arrays of labels and observation counts
+        """
+        rows = cls._row_type_2d()
+        for c, k, w in izip(labels_true, labels_pred, weights):
+            rows[c][k] += w
+        return cls(rows=rows)
+
+    def to_partition_runs(self):
+        """Run-length form of ``to_partitions``
+
+        Points are numbered as in ``to_partitions``, but each cluster is
+        represented by a list of ``(start, stop)`` half-open ranges of point
+        numbers, so memory use is proportional to the number of nonzero
+        cells. Inverse of ``from_partition_runs``::
+
+            >>> p1 = [[5, 6, 7, 8], [9, 10, 11], [0, 1, 2, 3, 4]]
+            >>> p2 = [[0, 1, 5, 6, 9], [2, 3, 7], [8, 10, 11], [4]]
+            >>> t = OrderedCrossTab.from_partitions(p1, p2)
+            >>> t.to_partitions()
+            ([[5, 6, 7, 8], [9, 10, 11], [0, 1, 2, 3, 4]], [[0, 1, 5, 6, 9], [2, 3, 7], [8, 10, 11], [4]])
+            >>> runs = t.to_partition_runs()
+            >>> runs
+            ([[(5, 9)], [(9, 12)], [(0, 5)]], [[(0, 2), (5, 7), (9, 10)], [(2, 4), (7, 8)], [(8, 9), (10, 12)], [(4, 5)]])
+            >>> OrderedCrossTab.from_partition_runs(*runs) == t
+            True
+        """
+        point = 0
+        ptrue = defaultdict(list)
+        ppred = defaultdict(list)
+        for (ri, ci), count in self.iteritems():
+            if count:
+                stop = point + count
+                _append_run(ptrue[ri], point, stop)
+                _append_run(ppred[ci], point, stop)
+                point = stop
+        return ptrue.values(), ppred.values()
+
+    @classmethod
+    def from_partition_runs(cls, runs1, runs2):
+        """Instantiate from two partitions given as lists of point ranges
+
+        Partitions are intersected with a single sweep over sorted ranges::
+
+            >>> p1 = [[(0, 3)], [(3, 6)]]
+            >>> p2 = [[(0, 2)], [(2, 5)], [(5, 6)]]
+            >>> OrderedCrossTab.from_partition_runs(p1, p2).to_rows()
+            [[2, 1, 0], [0, 2, 1]]
+
+            >>> OrderedCrossTab.from_partition_runs(p1, [[(0, 7)]])
+            Traceback (most recent call last):
+            ValueError: Partitions cover different points
+        """
+        sorted1 = _sorted_runs(runs1, 'p1')
+        sorted2 = _sorted_runs(runs2, 'p2')
+        rows = cls._row_type_2d()
+        idx1 = idx2 = 0
+        covered = 0
+        while idx1 < len(sorted1) and idx2 < len(sorted2):
+            start1, stop1, cid1 = sorted1[idx1]
+            start2, stop2, cid2 = sorted2[idx2]
+            overlap = min(stop1, stop2) - max(start1, start2)
+            if overlap > 0:
+                rows[cid1][cid2] += overlap
+                covered += overlap
+            if stop1 <= stop2:
+                idx1 += 1
+            else:
+                idx2 += 1
+        total1 = sum(stop - start for start, stop, _ in sorted1)
+        total2 = sum(stop - start for start, stop, _ in sorted2)
+        if not total1 == total2 == covered:
+            raise ValueError("Partitions cover different points")
+        return cls(rows=rows)
+
+    def to_weighted_clusters(self):
+        """Run-length form of ``to_clusters``
+
+        Each cluster is a list of ``(class, count)`` pairs. Inverse of
+        ``from_weighted_clusters``::
+
+            >>> clusters = [[2, 2, 0, 0, 1], [2, 2, 0], [0, 1, 1], [2]]
+            >>> t = OrderedCrossTab.from_clusters(clusters)
+            >>> t.to_weighted_clusters()
+            [[(2, 2), (0, 2), (1, 1)], [(2, 2), (0, 1)], [(0, 1), (1, 2)], [(2, 1)]]
+            >>> OrderedCrossTab.from_weighted_clusters(t.to_weighted_clusters()) == t
+            True
+        """
+        result = defaultdict(list)
+        for ci, col in iter_items(self.cols):
+            for ri, count in iter_items(col):
+                if count:
+                    result[ci].append((ri, count))
+        return result.values()
+
+    @classmethod
+    def from_weighted_clusters(cls, clusters):
+        """Instantiate from clusters given as lists of ``(class, count)`` pairs
+        """
+        rows = cls._row_type_2d()
+        for k, class_counts in iter_items(clusters):
+            for c, count in class_counts:
+                rows[c][k] += count
+        return cls(rows=rows)
+
+    @classmethod
+    def from_labels_parallel(cls, labels_true, labels_pred, n_jobs=-1, num_shards=None):
+        """Instantiate from two arrays of labels using a pool of processes
+
+        Label arrays (any sequences supporting slicing, e.g. NumPy arrays) are
+        split into contiguous shards, partial tables are built in parallel,
+        and the partial tables are then merged. Negative ``n_jobs`` values
+        follow ``joblib`` convention (-1 means all CPUs). By default, there is
+        one shard per worker::
+
+            >>> a = [0, 2, 1, 1, 0, 3, 1, 3, 0, 1]
+            >>> b = [0, 1, 1, 1, 0, 2, 1, 2, 3, 1]
+            >>> t = CrossTab.from_labels_parallel(a, b, n_jobs=1, num_shards=3)
+            >>> t == CrossTab.from_labels(a, b)
+            True
+        """
+        num_points = len(labels_true)
+        if num_points != len(labels_pred):
+            raise ValueError("Label arrays differ in length (%d vs %d)"
+                             % (num_points, len(labels_pred)))
+        if num_shards is None:
+            num_shards = cpu_count() + 1 + n_jobs if n_jobs < 0 else n_jobs
+        shard_size = max(1, -(-num_points // max(1, num_shards)))
+        tables = Parallel(n_jobs=n_jobs)(
+            delayed(_from_labels_shard)(
+                cls, labels_true[start:start + shard_size],
+                labels_pred[start:start + shard_size])
+            for start in xrange(0, num_points, shard_size))
+        if not tables:
+            return cls.from_labels(labels_true, labels_pred)
+        return tables[0].merge(*tables[1:])
+
+    # Arithmetic
+
+    def _accumulate(self, rows, table):
+        """Add cells of a table to a mapping of mutable rows
+        """
+        new_row = self._col_type_1d
+        for ri, row in iter_items(table.rows):
+            dest = rows.get(ri)
+            if dest is None:
+                dest = rows[ri] = new_row()
+            for ci, cell in iter_items(row):
+                dest[ci] = dest.get(ci, 0) + cell
+
+    def _mutable_rows(self):
+        """Return table rows in a form that can be updated in place
+        """
+        rows = self.rows
+        if isinstance(rows, MutableMapping) and \
+                all(isinstance(row, MutableMapping) for row in iter_vals(rows)):
+            return rows
+        mutable_rows = self._row_type_2d()
+        self._accumulate(mutable_rows, self)
+        return mutable_rows
+
+    def _reset_derived(self):
+        """Invalidate everything computed from table rows
+        """
+        self._cols = None
+        self._row_totals = None
+        self._col_totals = None
+        self._grand_total = None
+        self._live_stats = None
+        self._canonical = None
+        self._content_hash = None
+
+    def merge(self, *others):
+        """Add counts from other tables to this one (in place)
+
+        Rows and columns missing from this table are added. Returns the table
+        itself so that partial tables can be reduced in one expression::
+
+            >>> t1 = CrossTab(rows={'a': {'x': 2}, 'b': {'x': 4}})
+            >>> t2 = CrossTab(rows={'a': {'x': 1, 'y': 3}})
+            >>> sorted(t1.merge(t2, t2).items())
+            [(('a', 'x'), 4), (('a', 'y'), 6), (('b', 'x'), 4)]
+            >>> t1.grand_total
+            14
+        """
+        rows = self._mutable_rows()
+        for other in others:
+            self._accumulate(rows, other)
+        self._rows = rows
+        self._reset_derived()
+        return self
+
+    # Incremental updates
+
+    @property
+    def live_stats(self):
+        """Running sums maintained by incremental updates
+
+        Once a table has been updated with ``add`` or ``add_batch``, this is
+        a list of ``[n, sum C(n_ij, 2), sum C(a_i, 2), sum C(b_j, 2),
+        sum n_ij log n_ij, sum a_i log a_i, sum b_j log b_j]`` over cells
+        (``n_ij``), row totals (``a_i``) and column totals (``b_j``), which is
+        sufficient to compute pair-counting and entropy-based metrics in O(1)
+        time. For tables not updated incrementally, this is ``None``.
+
+        Integer sums are exact. The ``n log n`` sums are updated with
+        floating-point deltas and are recomputed from the table on access
+        once ``LIVE_STATS_REFRESH`` updates have been made since they were
+        last computed, so that rounding errors do not accumulate over long
+        streams.
+        """
+        stats = self._live_stats
+        if stats is not None and self._live_updates >= LIVE_STATS_REFRESH:
+            stats[4:] = self._xlogx_sums()
+            self._live_updates = 0
+        return stats
+
+    def _xlogx_sums(self):
+        """Sums of ``n log n`` over cells, row totals and column totals
+        """
+        return [fsum(_xlogx(cell) for row in iter_vals(self._rows)
+                     for cell in iter_vals(row)),
+                fsum(_xlogx(total) for total in iter_vals(self._row_totals)),
+                fsum(_xlogx(total) for total in iter_vals(self._col_totals))]
+
+    def _start_incremental(self):
+        """Materialize both orientations, all margins, and running sums
+        """
+        rows = self._mutable_rows()
+        if rows is not self._rows:
+            self._rows = rows
+            self._reset_derived()
+        cols = self._cols
+        if not (isinstance(cols, MutableMapping) and
+                all(isinstance(col, MutableMapping) for col in iter_vals(cols))):
+            self._cols = None
+        row_totals = self.row_totals
+        col_totals = self.col_totals
+        # grand total is not computed from row totals because row totals may
+        # have been supplied as an immutable structure
+        stats = [self.grand_total,
+                 sum(_comb2(cell) for row in iter_vals(rows) for cell in iter_vals(row)),
+                 sum(_comb2(total) for total in iter_vals(row_totals)),
+                 sum(_comb2(total) for total in iter_vals(col_totals))]
+        stats.extend(self._xlogx_sums())
+        self._live_stats = stats
+        self._live_updates = 0
+
+    def add(self, row_label, col_label, count=1):
+        """Add observations to a cell, keeping the table consistent
+
+        Both orientations, both margins, the grand total and ``live_stats``
+        are updated in O(1) time. Negative counts remove observations (e.g.
+        when maintaining a sliding window), and rows or columns whose totals
+        drop to zero are removed from the table::
+
+            >>> t = CrossTab.from_labels([1, 1, 2], ['x', 'y', 'y'])
+            >>> t.add(2, 'z')
+            >>> t.add(1, 'x', -1)
+            >>> sorted(t.items())
+            [((1, 'y'), 1), ((2, 'y'), 1), ((2, 'z'), 1)]
+            >>> sorted(t.cols['y'].items())
+            [(1, 1), (2, 1)]
+            >>> sorted(t.col_totals.items()), t.grand_total
+            ([('y', 2), ('z', 1)], 3)
+            >>> t.add(1, 'x', -1)
+            Traceback (most recent call last):
+            ValueError: Cell (1, 'x') would have a negative count
+        """
+        if count == 0:
+            return
+        if self._live_stats is None:
+            self._start_incremental()
+        self._canonical = None
+        self._content_hash = None
+        rows = self._rows
+        cols = self._cols
+        row_totals = self._row_totals
+        col_totals = self._col_totals
+
+        row = rows.get(row_label)
+        old_cell = 0 if row is None else row.get(col_label, 0)
+        new_cell = old_cell + count
+        if new_cell < 0:
+            raise ValueError("Cell %r would have a negative count"
+                             % ((row_label, col_label),))
+        if row is None:
+            row = rows[row_label] = self._col_type_1d()
+        col = cols.get(col_label)
+        if col is None:
+            col = cols[col_label] = self._row_type_1d()
+        if new_cell:
+            row[col_label] = col[row_label] = new_cell
+        else:
+            row.pop(col_label, None)
+            col.pop(row_label, None)
+
+        old_row_total = row_totals.get(row_label, 0)
+        new_row_total = old_row_total + count
+        if new_row_total:
+            row_totals[row_label] = new_row_total
+        else:
+            del row_totals[row_label]
+            del rows[row_label]
+
+        old_col_total = col_totals.get(col_label, 0)
+        new_col_total = old_col_total + count
+        if new_col_total:
+            col_totals[col_label] = new_col_total
+        else:
+            del col_totals[col_label]
+            del cols[col_label]
+
+        self._grand_total += count
+        stats = self._live_stats
+        stats[0] += count
+        stats[1] += _comb2(new_cell) - _comb2(old_cell)
+        stats[2] += _comb2(new_row_total) - _comb2(old_row_total)
+        stats[3] += _comb2(new_col_total) - _comb2(old_col_total)
+        stats[4] += _xlogx(new_cell) - _xlogx(old_cell)
+        stats[5] += _xlogx(new_row_total) - _xlogx(old_row_total)
+        stats[6] += _xlogx(new_col_total) - _xlogx(old_col_total)
+        self._live_updates += 1
+
+    def add_batch(self, labels_true, labels_pred, count=1):
+        """Add (or, with ``count=-1``, remove) a batch of observations
+
+        Pairs of labels are aggregated first, so the cost of an update is
+        proportional to the number of distinct cells changed::
+
+            >>> t = CrossTab.from_labels([1, 1, 2], ['x', 'y', 'y'])
+            >>> t.add_batch([2, 2, 3], ['y', 'y', 'x'])
+            >>> t.add_batch([1, 1], ['x', 'y'], count=-1)
+            >>> sorted(t.items())
+            [((2, 'y'), 3), ((3, 'x'), 1)]
+        """
+        if count == 0:
+            return
+        cells = Counter(izip(labels_true, labels_pred))
+        if count < 0:
+            # validate before applying so that a failed batch changes nothing
+            for (row_label, col_label), num in cells.iteritems():
+                if self.get((row_label, col_label), 0) < -count * num:
+                    raise ValueError("Cell %r would have a negative count"
+                                     % ((row_label, col_label),))
+        for (row_label, col_label), num in cells.iteritems():
+            self.add(row_label, col_label, count * num)
+
+    def __add__(self, other):
+        """Sum of two tables
+
+        ::
+
+            >>> t1 = OrderedCrossTab(rows=[(1, 5), (4, 6)])
+            >>> (t1 + t1).to_rows()
+            [[2, 10], [8, 12]]
+            >>> sum([t1, t1, t1]).to_rows()
+            [[3, 15], [12, 18]]
+        """
+        if not isinstance(other, CrossTab):
+            return NotImplemented
+        return self.__class__(rows=self._row_type_2d()).merge(self, other)
+
+    def __radd__(self, other):
+        if other == 0:
+            # allows the use of built-in ``sum``
+            return self.__class__(rows=self._row_type_2d()).merge(self)
+        return NotImplemented
+
+    def __iadd__(self, other):
+        if not isinstance(other, CrossTab):
+            return NotImplemented
+        return self.merge(other)
+
+    # Resampling
+
+    def bootstrap(self, metric, num_replicates=1000, **kwargs):
+        """Values of a metric over bootstrap replicates of this table
+
+        Replicates are multinomial draws over cells, and the metric is
+        evaluated on all of them at once. See ``pymaptools.resample.bootstrap``
+        for keyword arguments (including ``n_jobs`` and ``random_state``)::
+
+            >>> from pymaptools.metrics import rand_score
+            >>> t = CrossTab(rows=[(5, 1), (0, 4)])
+            >>> t.bootstrap(rand_score, 100, random_state=0).shape
+            (100,)
+        """
+        from pymaptools.resample import bootstrap
+        return bootstrap(self, metric, num_replicates, **kwargs)
+
+    def permutation_test(self, metric, num_replicates=1000, **kwargs):
+        """Observed metric value, p-value, and null distribution of the metric
+
+        See ``pymaptools.resample.permutation_test``
+        """
+        from pymaptools.resample import permutation_test
+        return permutation_test(self, metric, num_replicates, **kwargs)
+
     # Mapping methods
 
     def __contains__(self, item):
@@ -552,7 +1081,93 @@ class CrossTab(object):
         else:
             return default
 
+    # Canonical form
+
+    # tables with the same canonical form type are compared through it; rows
+    # of dict-based tables can be changed directly, so they are compared row
+    # by row
+    _canonical_type = None
+
+    def canonical_items(self):
+        """Nonzero cells as a sorted tuple of ``((row, col), count)`` pairs
+
+        The result is cached until the table is modified through ``add``,
+        ``add_batch``, or ``merge`` (tables whose ``rows`` are mutated
+        directly are not tracked)::
+
+            >>> t = CrossTab(rows={'b': {'x': 1}, 'a': {'y': 2, 'x': 0}})
+            >>> t.canonical_items()
+            ((('a', 'y'), 2), (('b', 'x'), 1))
+        """
+        canonical = self._canonical
+        if canonical is None:
+            # sorting rows one at a time is much faster than sorting all cells
+            self._canonical = canonical = tuple(
+                ((ri, ci), val)
+                for ri, row in sorted(iter_items(self.rows), key=itemgetter(0))
+                for ci, val in sorted(iter_items(row), key=itemgetter(0)) if val)
+        return canonical
+
+    @property
+    def content_hash(self):
+        """SHA-1 digest (in hex) of nonzero cells, for use as a cache key
+
+        The digest is computed from the canonical CSR form of the table
+        (sorted labels of nonempty rows and columns, ``indptr``, ``indices``
+        and counts), so equal tables have equal digests whatever their
+        storage. Tables are mutable and so not hashable by content; the
+        digest is cached like ``canonical_items``::
+
+            >>> from pymaptools.sparse import SparseCrossTab
+            >>> t1 = CrossTab.from_labels([1, 1, 2], ['x', 'y', 'y'])
+            >>> t2 = SparseCrossTab.from_labels([2, 1, 1], ['y', 'y', 'x'])
+            >>> t1.content_hash == t2.content_hash, t1 == t2
+            (True, True)
+            >>> {t1.content_hash: 'cached'}[t2.content_hash]
+            'cached'
+        """
+        content_hash = self._content_hash
+        if content_hash is None:
+            items = self.canonical_items()
+            col_labels = sorted(set(ci for (_, ci), _ in items))
+            col_ids = dict((ci, idx) for idx, ci in enumerate(col_labels))
+            row_labels = []
+            indptr = [0]
+            indices = []
+            counts = []
+            for (ri, ci), count in items:
+                if not row_labels:
+                    row_labels.append(ri)
+                elif ri != row_labels[-1]:
+                    row_labels.append(ri)
+                    indptr.append(len(indices))
+                indices.append(col_ids[ci])
+                counts.append(count)
+            if row_labels:
+                indptr.append(len(indices))
+            self._content_hash = content_hash = _canonical_digest(*map(
+                _pack_values, [row_labels, col_labels, indptr, indices, counts]))
+        return content_hash
+
     def __eq__(self, other):
+        """Compare cell counts (zero cells are the same as missing ones)
+
+        Tables that both have cached digests (see ``content_hash``) and
+        differ in them are rejected right away. Otherwise, tables with the
+        same canonical form type (whose storage only changes through methods
+        that keep the canonical form up to date) are compared through it, and
+        other tables row by row.
+        """
+        if self is other:
+            return True
+        if isinstance(other, CrossTab):
+            if self._content_hash is not None and other._content_hash is not None \
+                    and self._content_hash != other._content_hash:
+                return False
+            if self._canonical_type is not None and \
+                    self._canonical_type == other._canonical_type:
+                return self._canonical_equal(other)
+            return _rows_equal(self.rows, other.rows)
         if len(self) != len(other):
             return False
         for k, v in other.iteritems():
@@ -748,6 +1363,36 @@ class OrderedCrossTab(CrossTab):
     _row_type_2d = partial(DefaultOrderedDict, _col_type_1d)
 
 
+def _append_run(runs, start, stop):
+    """Append a range of points to a list of ranges, merging adjacent ones
+    """
+    if runs and runs[-1][1] == start:
+        runs[-1] = (runs[-1][0], stop)
+    else:
+        runs.append((start, stop))
+
+
+def _sorted_runs(partition, name):
+    """Flatten runs of a partition into sorted (start, stop, cluster) triples
+    """
+    result = sorted(
+        (start, stop, cid)
+        for cid, cluster in iter_items(partition)
+        for start, stop in cluster
+        if stop > start)
+    for prev, curr in izip(result, result[1:]):
+        if curr[0] < prev[1]:
+            raise ValueError("Point '%s' is in more than one cluster in %s"
+                             % (curr[0], name))
+    return result
+
+
+def _from_labels_shard(cls, labels_true, labels_pred):
+    """Build a partial table (module-level so that it can be pickled)
+    """
+    return cls.from_labels(labels_true, labels_pred)
+
+
 def partitions_to_labels(p1, p2):
 
     """Jointly encode a pair of partitions as arrays of labels
@@ -0,0 +1,1771 @@
+"""
+Compact array-backed graphs
+
+``CSRBigraph`` and ``CSRGraph`` implement the interfaces of ``Bigraph`` and
+``Graph`` from ``pymaptools.graph`` on top of integer arrays instead of
+dictionaries of sets. Node labels are interned into consecutive integer ids
+(``NodeIndex``), new edges are appended to typed buffers, and buffers are
+compacted on first read into a sorted array of unique edges (with weights of
+duplicate edges summed) plus CSR adjacency arrays for each partition. This
+takes a few dozen bytes per edge instead of a few hundred.
+
+.. code-block:: python
+
+    >>> g = CSRBigraph()
+    >>> g.add_clique(([1, 2, 3], [-1, -2, -3]))
+    >>> g.add_clique(([4], [-4, -5]))
+    >>> g.add_clique(([5], [-5, -6]))
+    >>> g.add_edge(4, -1, weight=3)
+    >>> len(g), g.get_weight(), sorted(g.U2V[4])
+    (14, 16, [-5, -4, -1])
+    >>> sorted((sorted(L), sorted(R)) for L, R in g.find_cliques())[:2]
+    [([1, 2, 3], [-3, -2, -1]), ([1, 2, 3, 4], [-1])]
+
+``U2V``, ``V2U`` and ``edges`` are read-only mapping views, so code written
+against ``Bigraph`` keeps working, while methods on hot paths (connected
+components, clique enumeration, node weights, iteration) work on integer ids
+directly. Edges are added only through ``add_edge``, ``add_clique``,
+``map_edge`` and ``store_weight``.
+
+The same arrays make up the binary format in which ``save_to`` stores graphs
+(of either kind) given paths ending in ``.npz``, or directory paths with
+``format='arrays'``; see ``GRAPH_LABELS`` and ``GRAPH_EDGES``.
+"""
+
+from array import array
+from copy import deepcopy
+from itertools import izip, imap
+from collections import Mapping
+import numpy as np
+from scipy.sparse import coo_matrix, csr_matrix
+from scipy.sparse.csgraph import connected_components
+from pymaptools.graph import Bigraph, Graph, ComponentLabels, _check_kernel, \
+    _enumerate_bicliques, _enumerate_cliques, _find_cliques_degeneracy, _limit_cliques, \
+    _degree_bounds, _degeneracy_ordering, _output_handle, _read_edgelist_header, \
+    EDGELIST_HEADER, EDGELIST_MAGIC, EDGELIST_WEIGHT_CODES
+from pymaptools.io import open_gz
+from pymaptools.sparse import factorize, as_label_array, concat_labels, label_array, \
+    save_arrays, load_arrays
+
+
+# number of edges converted to Python objects at a time while iterating
+ITER_CHUNK_SIZE = 1 << 16
+
+# approximate number of bytes of an edge-list file parsed at a time
+READ_CHUNK_SIZE = 1 << 24
+
+# approximate number of entries of a one-mode projection computed at a time
+PROJECT_CHUNK_NNZ = 1 << 22
+
+# normalizations of shared-neighbor weights in one-mode projections
+PROJECTION_NORMS = (None, 'jaccard', 'cosine')
+
+# arrays making up the on-disk format of graphs: format metadata, node labels
+# ('vlabels' only for bipartite graphs), edge arrays sorted by "left" node
+# (stored in blocks named 'u_0', 'u_1' etc. when saved with a block size) and,
+# for each side, offsets and positions of edges incident to every node
+# ('U_edge_ids' is implied by the order of edges)
+GRAPH_FORMAT_VERSION = 1
+GRAPH_LABELS = ('ulabels', 'vlabels')
+GRAPH_EDGES = ('u', 'v', 'weights')
+
+# NumPy counterparts of graph.CONTRACT_REDUCTIONS
+CONTRACT_UFUNCS = {'sum': np.add, 'max': np.maximum, 'min': np.minimum}
+
+# k-core peeling switches from whole-array passes to a queue of nodes once a
+# pass removes fewer than this fraction of remaining edges
+PEEL_QUEUE_FRACTION = 1.0 / 64
+
+
+def _id_dtype(num_nodes):
+    """Smallest signed integer type able to hold node ids
+    """
+    return np.int32 if num_nodes < np.iinfo(np.int32).max else np.int64
+
+
+def _weight_typecodes(weight_type):
+    """Array typecode and NumPy dtype used to store weights of given type
+    """
+    if weight_type is int:
+        return 'l', np.dtype('l')
+    elif weight_type is float:
+        return 'd', np.dtype('d')
+    raise TypeError("Unsupported weight type %r (use int or float)" % weight_type)
+
+
+class NodeIndex(object):
+
+    """Bidirectional mapping between hashable node labels and integer ids
+
+    Ids are assigned consecutively in the order in which labels are first
+    seen::
+
+        >>> index = NodeIndex()
+        >>> index.intern('b'), index.intern('a'), index.intern('b')
+        (0, 1, 0)
+        >>> index.intern_many(['a', 'c']).tolist()
+        [1, 2]
+        >>> index.labels, len(index), 'c' in index
+        (['b', 'a', 'c'], 3, True)
+    """
+
+    def __init__(self, labels=()):
+        self.labels = []
+        self.ids = {}
+        self.intern_many(labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, label):
+        return label in self.ids
+
+    def __iter__(self):
+        return iter(self.labels)
+
+    def intern(self, label):
+        """Return id of a label, assigning a new one if necessary
+        """
+        ids = self.ids
+        try:
+            return ids[label]
+        except KeyError:
+            node_id = ids[label] = len(self.labels)
+            self.labels.append(label)
+            return node_id
+
+    def intern_many(self, labels):
+        """Return an array of ids of a sequence of labels
+
+        Only labels not seen before are handled one by one
+        """
+        labels = labels if isinstance(labels, list) else list(labels)
+        ids = self.ids
+        all_labels = self.labels
+        for label in [label for label in labels if label not in ids]:
+            if label not in ids:
+                ids[label] = len(all_labels)
+                all_labels.append(label)
+        return np.fromiter(imap(ids.__getitem__, labels), dtype=np.int64,
+                           count=len(labels))
+
+    def get(self, label, default=None):
+        return self.ids.get(label, default)
+
+    def get_many(self, labels, default=-1):
+        """Return an array of ids of a sequence of labels without interning
+        """
+        labels = labels if isinstance(labels, list) else list(labels)
+        get = self.ids.get
+        return np.fromiter((get(label, default) for label in labels), dtype=np.int64,
+                           count=len(labels))
+
+    def __getitem__(self, label):
+        return self.ids[label]
+
+    def subset(self, node_ids):
+        """New index holding labels of given ids (renumbered in given order)
+        """
+        labels = self.labels
+        return self.__class__(labels[node_id] for node_id in node_ids)
+
+
+class CSREdgeStore(object):
+
+    """Weighted edges between interned nodes kept as sorted arrays
+
+    Edges are pairs of ids ``(a, b)`` of "left" and "right" nodes; for graphs
+    that are not bipartite, both ends share one ``NodeIndex`` and edges are
+    stored with ``a <= b``. Appended edges are buffered and merged into the
+    sorted arrays on the next call to ``compact``. Adjacency arrays are built
+    on demand and invalidated by compaction.
+    """
+
+    def __init__(self, weight_type=int, bipartite=True):
+        self.weight_type = weight_type
+        self.bipartite = bipartite
+        self.unodes = NodeIndex()
+        self.vnodes = NodeIndex() if bipartite else self.unodes
+        self._typecode, self.weight_dtype = _weight_typecodes(weight_type)
+        self._clear_buffers()
+        self.u = np.zeros(0, dtype=np.int32)
+        self.v = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=self.weight_dtype)
+        self._adjacency = [None, None]
+        self._degrees = [None, None]
+
+    def _clear_buffers(self):
+        self._buf_u = array('l')
+        self._buf_v = array('l')
+        self._buf_w = array(self._typecode)
+        self._chunks = []
+
+    def append(self, u, v, weight):
+        """Buffer an edge between node labels
+        """
+        if u is None or v is None:
+            raise ValueError("An edge must connect two nodes")
+        a = self.unodes.intern(u)
+        b = self.vnodes.intern(v)
+        if not self.bipartite and a > b:
+            a, b = b, a
+        self._buf_u.append(a)
+        self._buf_v.append(b)
+        self._buf_w.append(weight)
+
+    @staticmethod
+    def _intern_array(nodes, labels):
+        """Intern an array of labels, looking up each distinct label once
+        """
+        uniques, codes = factorize(labels)
+        uniques = uniques.tolist()
+        if None in uniques:
+            raise ValueError("An edge must connect two nodes")
+        return nodes.intern_many(uniques)[codes]
+
+    def extend(self, u, v, weights=None):
+        """Buffer edges given as parallel sequences of node labels
+
+        Weights default to one. Labels are factorized first, so only distinct
+        labels are looked up in node indexes.
+        """
+        u = as_label_array(u)
+        v = as_label_array(v)
+        if self.bipartite:
+            u_ids = self._intern_array(self.unodes, u)
+            v_ids = self._intern_array(self.vnodes, v)
+        else:
+            ids = self._intern_array(self.unodes, concat_labels([u, v]))
+            u_ids, v_ids = ids[:len(u)], ids[len(u):]
+        self.extend_ids(u_ids, v_ids, weights)
+
+    def extend_ids(self, u, v, weights=None):
+        """Buffer edges given as arrays of ids of already interned nodes
+        """
+        u = np.asarray(u, dtype=np.int64)
+        v = np.asarray(v, dtype=np.int64)
+        if weights is None:
+            weights = np.ones(len(u), dtype=self.weight_dtype)
+        else:
+            weights = np.asarray(weights, dtype=self.weight_dtype)
+        if not len(u) == len(v) == len(weights):
+            raise ValueError("Edge arrays differ in length")
+        if len(u) and (u.min() < 0 or u.max() >= len(self.unodes) or
+                       v.min() < 0 or v.max() >= len(self.vnodes)):
+            raise ValueError("Node ids out of range")
+        if not self.bipartite:
+            u, v = np.minimum(u, v), np.maximum(u, v)
+        self._chunks.append((u, v, weights))
+
+    def compact(self):
+        """Merge buffered edges into sorted arrays, summing duplicates
+        """
+        if not len(self._buf_u) and not self._chunks:
+            return
+        chunks = zip(*self._chunks) or ((), (), ())
+        u = np.concatenate([self.u] + list(chunks[0]) +
+                           [np.frombuffer(self._buf_u, dtype=np.dtype('l'))])
+        v = np.concatenate([self.v] + list(chunks[1]) +
+                           [np.frombuffer(self._buf_v, dtype=np.dtype('l'))])
+        weights = np.concatenate([self.weights] + list(chunks[2]) + [
+            np.frombuffer(self._buf_w, dtype=self.weight_dtype)])
+        self._clear_buffers()
+        num_vnodes = len(self.vnodes)
+        keys = u.astype(np.int64) * num_vnodes + v
+        # order of duplicate edges does not matter as their weights are summed
+        order = np.argsort(keys)
+        keys = keys[order]
+        starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]])[:len(keys)])
+        self.weights = np.add.reduceat(weights[order], starts) if len(keys) else weights
+        keys = keys[starts]
+        self.u = (keys // num_vnodes).astype(_id_dtype(len(self.unodes)))
+        self.v = (keys % num_vnodes).astype(_id_dtype(num_vnodes))
+        self._adjacency = [None, None]
+        self._degrees = [None, None]
+
+    def __len__(self):
+        self.compact()
+        return len(self.u)
+
+    @property
+    def nbytes(self):
+        """Memory taken by edge and adjacency arrays
+        """
+        self.compact()
+        total = self.u.nbytes + self.v.nbytes + self.weights.nbytes
+        for adjacency in self._adjacency:
+            if adjacency is not None:
+                total += sum(arr.nbytes for arr in adjacency if arr is not None)
+        return total
+
+    def adjacency(self, side):
+        """CSR adjacency of left (side 0) or right (side 1) nodes
+
+        Returns ``(indptr, indices, edge_ids)`` where ``indices`` holds
+        neighbor ids sorted within each row and ``edge_ids`` holds positions
+        of the corresponding edges in the edge arrays (``None`` standing for
+        the identity)
+        """
+        self.compact()
+        if not self.bipartite:
+            side = 0
+        adjacency = self._adjacency[side]
+        if adjacency is None:
+            u, v = self.u, self.v
+            if not self.bipartite:
+                # both directions of each edge except for self-loops
+                mask = np.flatnonzero(u != v)
+                rows = np.concatenate([u, v[mask]])
+                cols = np.concatenate([v, u[mask]])
+                order = np.lexsort((cols, rows))
+                edge_ids = np.concatenate([np.arange(len(u)), mask])[order]
+                rows, indices = rows[order], cols[order]
+                num_nodes = len(self.unodes)
+            elif side == 0:
+                rows, indices, edge_ids = u, v, None
+                num_nodes = len(self.unodes)
+            else:
+                # stable sort keeps left nodes sorted within rows
+                edge_ids = np.argsort(v, kind='mergesort')
+                rows, indices = v[edge_ids], u[edge_ids]
+                num_nodes = len(self.vnodes)
+            indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+            np.cumsum(np.bincount(rows, minlength=num_nodes), out=indptr[1:])
+            self._adjacency[side] = adjacency = (indptr, indices, edge_ids)
+        return adjacency
+
+    def degrees(self, side):
+        """Degrees and weighted degrees of left (side 0) or right (side 1) nodes
+
+        Both are read-only arrays indexed by node id, computed from adjacency
+        arrays and cached until the next compaction
+        """
+        self.compact()
+        if not self.bipartite:
+            side = 0
+        degrees = self._degrees[side]
+        if degrees is None:
+            indptr, _, edge_ids = self.adjacency(side)
+            counts = np.diff(indptr)
+            weights = self.weights if edge_ids is None else self.weights[edge_ids]
+            sums = np.zeros(len(counts), dtype=self.weight_dtype)
+            # rows without edges are skipped, so each sum ends where the next starts
+            nonempty = np.flatnonzero(counts)
+            if len(nonempty):
+                sums[nonempty] = np.add.reduceat(weights, indptr[nonempty])
+            counts.flags.writeable = False
+            sums.flags.writeable = False
+            self._degrees[side] = degrees = (counts, sums)
+        return degrees
+
+    def neighbor_ids(self, side, node_id):
+        """Neighbor ids and weights of incident edges
+        """
+        indptr, indices, edge_ids = self.adjacency(side)
+        start, end = indptr[node_id], indptr[node_id + 1]
+        if edge_ids is None:
+            return indices[start:end], self.weights[start:end]
+        return indices[start:end], self.weights[edge_ids[start:end]]
+
+    def neighbor_sets(self, side):
+        """List of sets of neighbor ids, indexed by node id
+        """
+        indptr, indices, _ = self.adjacency(side)
+        bounds = indptr.tolist()
+        indices = indices.tolist()
+        return [set(indices[start:end]) for start, end in izip(bounds[:-1], bounds[1:])]
+
+    def find_edge(self, a, b):
+        """Position of an edge in the edge arrays (or -1 if there is none)
+        """
+        self.compact()
+        if not self.bipartite and a > b:
+            a, b = b, a
+        start = np.searchsorted(self.u, a, side='left')
+        end = np.searchsorted(self.u, a, side='right')
+        pos = start + np.searchsorted(self.v[start:end], b)
+        return pos if pos < end and self.v[pos] == b else -1
+
+    def _translate(self, other, intern):
+        """Ends of edges of another store as ids of nodes in this store
+
+        Nodes missing from this store are either interned or given id -1
+        """
+        other.compact()
+        if other.unodes is self.unodes and other.vnodes is self.vnodes:
+            return other.u.astype(np.int64), other.v.astype(np.int64)
+        lookup = NodeIndex.intern_many if intern else NodeIndex.get_many
+        uids = lookup(self.unodes, other.unodes.labels)
+        if other.vnodes is other.unodes and self.vnodes is self.unodes:
+            vids = uids
+        else:
+            vids = lookup(self.vnodes, other.vnodes.labels)
+        u, v = uids[other.u], vids[other.v]
+        if not self.bipartite:
+            u, v = np.minimum(u, v), np.maximum(u, v)
+        return u, v
+
+    def match(self, other):
+        """Positions of edges shared with another store, in both stores
+
+        Edges of the other store are looked up in the sorted edge arrays of
+        this one by binary search; returns a pair of arrays sorted by
+        position in this store
+        """
+        self.compact()
+        u, v = self._translate(other, intern=False)
+        found = np.flatnonzero((u >= 0) & (v >= 0))
+        num_vnodes = len(self.vnodes)
+        keys = self.u.astype(np.int64) * num_vnodes + self.v
+        other_keys = u[found] * num_vnodes + v[found]
+        pos = np.searchsorted(keys, other_keys)
+        shared = pos < len(keys)
+        shared[shared] = keys[pos[shared]] == other_keys[shared]
+        pos, found = pos[shared], found[shared]
+        order = np.argsort(pos)
+        return pos[order], found[order]
+
+    def merge(self, other):
+        """Add edges of another store, summing weights of shared edges
+
+        New edges are merged into the sorted edge arrays in a single pass
+        instead of being buffered and sorted together with existing ones
+        """
+        self.compact()
+        u, v = self._translate(other, intern=True)
+        weights = other.weights.astype(self.weight_dtype)
+        num_vnodes = len(self.vnodes)
+        keys = self.u.astype(np.int64) * num_vnodes + self.v
+        other_keys = u * num_vnodes + v
+        if len(other_keys) > 1 and (other_keys[1:] < other_keys[:-1]).any():
+            order = np.argsort(other_keys)
+            other_keys, weights = other_keys[order], weights[order]
+        pos = np.searchsorted(keys, other_keys)
+        shared = pos < len(keys)
+        shared[shared] = keys[pos[shared]] == other_keys[shared]
+        self.weights = self.weights.copy()
+        self.weights[pos[shared]] += weights[shared]
+        added = ~shared
+        keys = np.insert(keys, pos[added], other_keys[added])
+        self.weights = np.insert(self.weights, pos[added], weights[added])
+        self.u = (keys // num_vnodes).astype(_id_dtype(len(self.unodes)))
+        self.v = (keys % num_vnodes).astype(_id_dtype(num_vnodes))
+        self._adjacency = [None, None]
+        self._degrees = [None, None]
+
+    def extend_store(self, other):
+        """Buffer all edges of another store
+        """
+        u, v = self._translate(other, intern=True)
+        self.extend_ids(u, v, other.weights)
+
+    def peel(self, keep, min_udegree, min_vdegree):
+        """Repeatedly drop edges of nodes with fewer neighbors than required
+
+        Takes and returns a boolean mask of kept edges (see ``_peel_edges``)
+        """
+        self.compact()
+        if self.bipartite:
+            num_unodes, num_vnodes = len(self.unodes), len(self.vnodes)
+            ends = (self.u.astype(np.int64), self.v.astype(np.int64) + num_unodes)
+            min_degrees = np.repeat([min_udegree, min_vdegree], [num_unodes, num_vnodes])
+        else:
+            ends = (self.u, self.v)
+            min_degrees = np.repeat(min_udegree, len(self.unodes))
+        return _peel_edges(ends, keep, min_degrees)
+
+    def node_components(self):
+        """Connected component labels of left and right nodes
+        """
+        self.compact()
+        num_unodes = len(self.unodes)
+        num_nodes = num_unodes + len(self.vnodes) if self.bipartite else num_unodes
+        offset = num_unodes if self.bipartite else 0
+        matrix = coo_matrix(
+            (np.ones(len(self.u), dtype=np.int8), (self.u, self.v + offset)),
+            shape=(num_nodes, num_nodes))
+        _, labels = connected_components(matrix, directed=False)
+        return labels[:num_unodes], labels[offset:]
+
+    def subset(self, edge_ids):
+        """New store with a subset of edges and only the nodes they touch
+        """
+        result = self.__class__(self.weight_type, self.bipartite)
+        u, v = self.u[edge_ids], self.v[edge_ids]
+        # renumbering nodes in the order of their ids keeps edges sorted
+        if self.bipartite:
+            unode_ids, u = np.unique(u, return_inverse=True)
+            vnode_ids, v = np.unique(v, return_inverse=True)
+            result.unodes = self.unodes.subset(unode_ids.tolist())
+            result.vnodes = self.vnodes.subset(vnode_ids.tolist())
+        else:
+            node_ids, inverse = np.unique(np.concatenate([u, v]), return_inverse=True)
+            u, v = inverse[:len(u)], inverse[len(u):]
+            result.unodes = result.vnodes = self.unodes.subset(node_ids.tolist())
+        result.u = u.astype(_id_dtype(len(result.unodes)))
+        result.v = v.astype(_id_dtype(len(result.vnodes)))
+        result.weights = self.weights[edge_ids]
+        return result
+
+
+def _peel_edges(ends, keep, min_degrees):
+    """Repeatedly drop edges touching nodes with too few kept neighbors
+
+    ``ends`` is a pair of arrays of node ids of edges, ``keep`` a boolean
+    mask of edges to start from and ``min_degrees`` an array of degrees
+    required of nodes. Self-loops do not count towards degrees. Whole-array
+    passes remove the bulk of edges, and a queue of nodes takes over once
+    passes stop paying off::
+
+        >>> ends = np.array([0, 1, 2, 2, 3]), np.array([1, 2, 0, 3, 4])
+        >>> _peel_edges(ends, np.ones(5, dtype=bool), np.repeat(2, 5)).tolist()
+        [True, True, True, False, False]
+    """
+    a, b = ends
+    num_nodes = len(min_degrees)
+    counted = a != b
+    keep = keep.copy()
+    while True:
+        live = keep & counted
+        degrees = np.bincount(a[live], minlength=num_nodes) + \
+            np.bincount(b[live], minlength=num_nodes)
+        weak = degrees < min_degrees
+        dropped = keep & (weak[a] | weak[b])
+        num_dropped = np.count_nonzero(dropped)
+        if not num_dropped:
+            return keep
+        keep &= ~dropped
+        num_kept = np.count_nonzero(keep)
+        if num_dropped < PEEL_QUEUE_FRACTION * num_kept:
+            break
+    # incidence lists of the remaining edges
+    edge_ids = np.flatnonzero(keep)
+    incident = np.concatenate([a[edge_ids], b[edge_ids]])
+    others = np.concatenate([b[edge_ids], a[edge_ids]])
+    order = np.argsort(incident, kind='mergesort')
+    incident_edges = np.concatenate([edge_ids, edge_ids])[order]
+    others = others[order]
+    indptr = np.searchsorted(incident[order], np.arange(num_nodes + 1))
+    live = keep & counted
+    degrees = np.bincount(a[live], minlength=num_nodes) + \
+        np.bincount(b[live], minlength=num_nodes)
+    stack = np.flatnonzero((degrees < min_degrees) & (np.diff(indptr) > 0)).tolist()
+    removed = set()
+    while stack:
+        node = stack.pop()
+        if node in removed:
+            continue
+        removed.add(node)
+        for pos in xrange(indptr[node], indptr[node + 1]):
+            edge_id = incident_edges[pos]
+            if not keep[edge_id]:
+                continue
+            keep[edge_id] = False
+            other = others[pos]
+            if other != node:
+                degrees[other] -= 1
+                if degrees[other] < min_degrees[other] and other not in removed:
+                    stack.append(other)
+    return keep
+
+
+def _group_ids(ids, node_components, num_components):
+    """Split an array of node ids into lists by component, keeping order
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    labels = node_components[ids]
+    order = np.argsort(labels, kind='mergesort')
+    bounds = np.searchsorted(labels[order], np.arange(num_components + 1)).tolist()
+    ids = ids[order].tolist()
+    return [ids[start:end] for start, end in izip(bounds[:-1], bounds[1:])]
+
+
+def _chunk_bounds(costs, budget):
+    """Split rows into runs of consecutive rows costing about ``budget`` each
+
+    A row costing more than the budget makes up a run of its own::
+
+        >>> list(_chunk_bounds(np.array([2, 2, 5, 1, 1]), 4))
+        [(0, 2), (2, 3), (3, 5)]
+    """
+    cumulative = np.concatenate([[0], np.cumsum(costs)])
+    num_rows = len(costs)
+    start = 0
+    while start < num_rows:
+        end = np.searchsorted(cumulative, cumulative[start] + budget, side='right') - 1
+        end = min(max(end, start + 1), num_rows)
+        yield start, end
+        start = end
+
+
+def _project_edges(store, side, weighted, normalize, min_shared, min_weight, top_k,
+                   max_chunk_nnz):
+    """Edges of a one-mode projection of a bipartite edge store
+
+    Returns ``(nodes, a, b, weights)``, where ``a < b`` are ids of projected
+    nodes in ``nodes``. The product of the biadjacency matrix with its
+    transpose is computed a few rows at a time so that each chunk of rows
+    holds no more than about ``max_chunk_nnz`` entries
+    """
+    if normalize not in PROJECTION_NORMS:
+        raise ValueError("Unknown normalization: %r" % normalize)
+    store.compact()
+    if side == 'U':
+        rows, cols, nodes = store.u, store.v, store.unodes
+        num_rows, num_cols = len(store.unodes), len(store.vnodes)
+    elif side == 'V':
+        rows, cols, nodes = store.v, store.u, store.vnodes
+        num_rows, num_cols = len(store.vnodes), len(store.unodes)
+    else:
+        raise ValueError("Side must be either 'U' or 'V'")
+    rows, cols = rows.astype(np.int64), cols.astype(np.int64)
+    ones = np.ones(len(rows), dtype=np.int64)
+    matrix = csr_matrix((store.weights if weighted else ones, (rows, cols)),
+                        shape=(num_rows, num_cols))
+    transposed = matrix.T.tocsr()
+    if weighted and min_shared > 1:
+        counts = csr_matrix((ones, (rows, cols)), shape=(num_rows, num_cols))
+        counts_transposed = counts.T.tocsr()
+    if normalize is not None:
+        diagonal = np.asarray(matrix.multiply(matrix).sum(axis=1), dtype=float).ravel()
+    # every neighbor contributes at most its degree to the row of a node
+    col_degrees = np.bincount(cols, minlength=num_cols)
+    row_costs = np.bincount(rows, weights=col_degrees[cols], minlength=num_rows)
+    results = []
+    for start, end in _chunk_bounds(row_costs, max_chunk_nnz or PROJECT_CHUNK_NNZ):
+        product = matrix[start:end].dot(transposed)
+        if min_shared > 1:
+            shared = counts[start:end].dot(counts_transposed) if weighted else product
+            product = product.multiply(shared >= min_shared).tocsr()
+        product.sort_indices()
+        product = product.tocoo()
+        a, b, weights = product.row.astype(np.int64) + start, product.col, product.data
+        keep = (a != b) & (weights != 0)
+        a, b, weights = a[keep], b[keep], weights[keep]
+        if normalize == 'jaccard':
+            weights = weights / (diagonal[a] + diagonal[b] - weights)
+        elif normalize == 'cosine':
+            weights = weights / np.sqrt(diagonal[a] * diagonal[b])
+        if min_weight is not None:
+            keep = weights >= min_weight
+            a, b, weights = a[keep], b[keep], weights[keep]
+        if top_k is None:
+            # each pair is found in the rows of both of its nodes
+            keep = a < b
+        else:
+            # heaviest entries of rows with more than top_k of them (a stable
+            # sort keeps ties in the order of sorted column indices)
+            row_sizes = np.bincount(a - start, minlength=end - start)
+            keep = row_sizes[a - start] <= top_k
+            long_rows = np.flatnonzero(~keep)
+            order = long_rows[np.lexsort((-weights[long_rows], a[long_rows]))]
+            ranks = np.arange(len(order)) - np.searchsorted(a[order], a[order])
+            keep[order[ranks < top_k]] = True
+            a, b = np.minimum(a, b), np.maximum(a, b)
+        results.append((a[keep], b[keep], weights[keep]))
+    if results:
+        a, b, weights = (np.concatenate(arrays) for arrays in zip(*results))
+    else:
+        a = b = np.zeros(0, dtype=np.int64)
+        weights = np.zeros(0, dtype=float if normalize else matrix.dtype)
+    if top_k is not None:
+        # pairs kept for both of their nodes
+        _, first = np.unique(a * num_rows + b, return_index=True)
+        a, b, weights = a[first], b[first], weights[first]
+    return nodes, a, b, weights
+
+
+def _top_ids(values, k):
+    """Positions of the ``k`` largest values, largest first (ties by position)
+    """
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k >= len(values):
+        return np.argsort(-values, kind='mergesort')
+    top = np.argpartition(-values, k)[:k]
+    top.sort()
+    return top[np.argsort(-values[top], kind='mergesort')]
+
+
+def _graph_sides(bipartite):
+    """Names of sides of nodes kept in the on-disk format
+    """
+    return ('U', 'V') if bipartite else ('V',)
+
+
+def _load_edge_arrays(path, num_edges, block_size, positions=None, mmap_mode=None):
+    """Edge arrays of a saved graph, or their entries at sorted ``positions``
+
+    Only blocks holding requested positions are read
+    """
+    if not block_size:
+        arrays = load_arrays(path, GRAPH_EDGES, mmap_mode=mmap_mode, mmap_names=GRAPH_EDGES)
+        if positions is not None:
+            arrays = dict((name, arr[positions]) for name, arr in arrays.iteritems())
+        return arrays
+    if positions is None:
+        blocks = np.arange(-(-num_edges // block_size))
+    else:
+        blocks = np.unique(positions // block_size)
+    loaded = load_arrays(path, ['%s_%d' % (name, block)
+                                for name in GRAPH_EDGES for block in blocks.tolist()])
+    arrays = {}
+    for name in GRAPH_EDGES:
+        arr = np.concatenate([loaded['%s_%d' % (name, block)] for block in blocks.tolist()])
+        if positions is not None:
+            # all blocks but the last one are full, so offsets follow from ranks
+            ranks = np.searchsorted(blocks, positions // block_size)
+            arr = arr[ranks * block_size + positions % block_size]
+        arrays[name] = arr
+    return arrays
+
+
+def _group_codes(nodes, groups):
+    """Group ids of nodes in a ``NodeIndex`` (-1 for dropped ones) and group labels
+
+    Groups are given as a mapping from node labels to group labels (nodes
+    missing from it are dropped) or as a sequence of group labels aligned
+    with node ids (entries masked in a ``numpy.ma`` array are dropped)::
+
+        >>> codes, labels = _group_codes(NodeIndex('abc'), {'a': 5, 'c': 2})
+        >>> codes.tolist(), labels
+        ([1, -1, 0], [2, 5])
+        >>> codes, labels = _group_codes(NodeIndex('abc'), np.ma.masked_equal([5, 5, 0], 0))
+        >>> codes.tolist(), labels
+        ([0, 0, -1], [5])
+    """
+    if groups is None:
+        return np.arange(len(nodes)), list(nodes.labels)
+    if isinstance(groups, Mapping):
+        kept = np.fromiter((label in groups for label in nodes.labels),
+                           dtype=bool, count=len(nodes))
+        values = as_label_array([groups[label] for label in nodes.labels if label in groups])
+    else:
+        if len(groups) != len(nodes):
+            raise ValueError("Expected %d group labels, got %d" % (len(nodes), len(groups)))
+        if np.ma.isMaskedArray(groups):
+            kept = ~np.ma.getmaskarray(groups)
+            values = as_label_array(groups.data)[kept]
+        else:
+            kept = np.ones(len(nodes), dtype=bool)
+            values = as_label_array(groups)
+    labels, codes = factorize(values)
+    group_ids = np.empty(len(nodes), dtype=np.int64)
+    group_ids.fill(-1)
+    group_ids[kept] = codes
+    return group_ids, labels.tolist()
+
+
+def _edgelist_dtype(weight_code):
+    """Record type of binary edge lists
+    """
+    return np.dtype([('u', '<i8'), ('v', '<i8'), ('weight', '<' + weight_code)])
+
+
+def _integer_labels(nodes):
+    """Array of labels of a ``NodeIndex`` holding integers only
+    """
+    labels = np.asarray(nodes.labels)
+    if len(labels) and labels.dtype.kind not in 'iu':
+        raise ValueError("Cannot write binary edge list: nodes must be integers")
+    return labels.astype(np.int64)
+
+
+def _parse_numeric_lines(lines, weight_type):
+    """Parse whitespace-separated lines of numbers into edge arrays
+    """
+    num_cols = len(lines[0].split())
+    if num_cols not in (2, 3):
+        raise ValueError("Expected 2 or 3 columns, got %d" % num_cols)
+    dtype = np.float64 if num_cols == 3 and weight_type is float else np.int64
+    values = np.fromstring(''.join(lines), dtype=dtype, sep=' ')
+    if len(values) != num_cols * len(lines):
+        raise ValueError("Malformed edge list (inconsistent number of columns)")
+    values = values.reshape(-1, num_cols)
+    weights = values[:, 2] if num_cols == 3 else None
+    return values[:, 0].astype(np.int64), values[:, 1].astype(np.int64), weights
+
+
+def _parse_lines(lines, sep, numeric, weight_type):
+    """Split lines into lists of node labels and weights
+    """
+    u, v, weights = [], [], []
+    label_type = int if numeric else str
+    for line in lines:
+        fields = line.rstrip('\r\n').split(sep)
+        if len(fields) == 2:
+            weights.append(1)
+        elif len(fields) == 3:
+            weights.append(weight_type(fields[2]))
+        else:
+            raise ValueError("Expected 2 or 3 columns in line %r" % line)
+        u.append(label_type(fields[0]))
+        v.append(label_type(fields[1]))
+    return u, v, weights
+
+
+class AdjacencyView(Mapping):
+
+    """Read-only mapping of node labels to sets of neighbor labels
+    """
+
+    def __init__(self, store, side):
+        self._store = store
+        self._side = side
+
+    def _nodes(self):
+        store = self._store
+        return store.unodes if self._side == 0 else store.vnodes
+
+    def __getitem__(self, label):
+        store = self._store
+        node_id = self._nodes()[label]
+        neighbors = store.vnodes if self._side == 0 else store.unodes
+        ids, _ = store.neighbor_ids(self._side, node_id)
+        labels = neighbors.labels
+        return set(labels[idx] for idx in ids.tolist())
+
+    def __contains__(self, label):
+        return label in self._nodes()
+
+    def __iter__(self):
+        return iter(self._nodes())
+
+    def __len__(self):
+        return len(self._nodes())
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, dict(self))
+
+
+class ComponentLabelView(Mapping):
+
+    """Read-only mapping of node labels to component ids
+    """
+
+    def __init__(self, nodes, node_components):
+        self._nodes = nodes
+        self._node_components = node_components
+
+    def __getitem__(self, label):
+        return int(self._node_components[self._nodes[label]])
+
+    def __contains__(self, label):
+        return label in self._nodes
+
+    def __iter__(self):
+        return iter(self._nodes)
+
+    def __len__(self):
+        return len(self._nodes)
+
+
+class CSRComponentLabels(ComponentLabels):
+
+    """Component ids of nodes of an array-backed graph
+
+    Besides label mappings, component ids are available as arrays indexed
+    by node id (``unode_components`` and ``vnode_components``). Edges are
+    grouped by component once, on first access to a component subgraph.
+    """
+
+    def __init__(self, graph, unode_components, vnode_components):
+        store = graph._store
+        num_components = int(max(unode_components.max() if len(unode_components) else -1,
+                                 vnode_components.max() if len(vnode_components) else -1)) + 1
+        super(CSRComponentLabels, self).__init__(
+            graph,
+            ComponentLabelView(store.unodes, unode_components),
+            ComponentLabelView(store.vnodes, vnode_components),
+            num_components)
+        self.unode_components = unode_components
+        self.vnode_components = vnode_components
+        self._edge_groups = None
+
+    def get_edge_ids(self, component_id):
+        """Return sorted ids of edges belonging to a component
+        """
+        if self._edge_groups is None:
+            edge_labels = self.unode_components[self.graph._store.u]
+            # stable sort keeps edge ids sorted within each component
+            order = np.argsort(edge_labels, kind='mergesort')
+            bounds = np.searchsorted(edge_labels[order],
+                                     np.arange(self.num_components + 1))
+            self._edge_groups = order, bounds
+        order, bounds = self._edge_groups
+        return order[bounds[component_id]:bounds[component_id + 1]]
+
+
+class EdgeView(Mapping):
+
+    """Read-only mapping of edges (pairs of node labels) to weights
+    """
+
+    def __init__(self, graph):
+        self._graph = graph
+
+    @property
+    def default_factory(self):
+        return self._graph.weight_type
+
+    def __getitem__(self, edge):
+        store = self._graph._store
+        u, v = edge
+        a = store.unodes.get(u)
+        b = store.vnodes.get(v)
+        if a is None or b is None:
+            raise KeyError(edge)
+        pos = store.find_edge(a, b)
+        if pos < 0:
+            raise KeyError(edge)
+        return store.weights[pos].item()
+
+    def __contains__(self, edge):
+        try:
+            self[edge]
+        except (KeyError, TypeError, ValueError):
+            return False
+        return True
+
+    def __iter__(self):
+        return self._graph.iter_edges()
+
+    def __len__(self):
+        return len(self._graph._store)
+
+    def iterkeys(self):
+        return self._graph.iter_edges()
+
+    def itervalues(self):
+        return iter(self._graph._store.weights.tolist())
+
+    def iteritems(self):
+        return self._graph.iter_edge_weights()
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, dict(self.iteritems()))
+
+
+class _CSRGraphMixin(object):
+
+    """Methods shared by array-backed bipartite and general graphs
+    """
+
+    _bipartite = True
+
+    def __init__(self, base=None, weight_type=int, min_edge_weight=None):
+        self.weight_type = weight_type
+        self._store = CSREdgeStore(weight_type, bipartite=self._bipartite)
+        if base is None:
+            return
+        if not isinstance(base, Bigraph):
+            raise TypeError("Base object has incorrect type")
+        if weight_type is not base.weight_type:
+            raise ValueError("Cannot convert %s weights to %s"
+                             % (base.weight_type, weight_type))
+        if isinstance(base, self.__class__) and min_edge_weight is None:
+            base._store.compact()
+            self._store = deepcopy(base._store)
+            return
+        add_edge = self.add_edge
+        for (u, v), weight in base.iter_edge_weights():
+            if min_edge_weight is None or weight >= min_edge_weight:
+                add_edge(u, v, weight)
+
+    @classmethod
+    def from_arrays(cls, u, v, weights=None, weight_type=None):
+        """Construct a graph from parallel arrays of node labels and weights
+
+        Duplicate edges have their weights summed. Unless given, weight type
+        is inferred from the weight array::
+
+            >>> g = CSRBigraph.from_arrays(['a', 'a', 'b', 'a'], [1, 2, 1, 1],
+            ...                            np.array([0.5, 1.0, 2.0, 0.25]))
+            >>> sorted(g.iter_edge_weights())
+            [(('a', 1), 0.75), (('a', 2), 1.0), (('b', 1), 2.0)]
+        """
+        if weight_type is None:
+            weight_type = float if weights is not None and \
+                np.asarray(weights).dtype.kind == 'f' else int
+        graph = cls(weight_type=weight_type)
+        graph._store.extend(u, v, weights)
+        return graph
+
+    @classmethod
+    def from_sparse_matrix(cls, matrix, ulabels=None, vlabels=None, weight_type=None):
+        """Construct a graph from a (weighted) sparse biadjacency matrix
+
+        Rows correspond to "left" nodes and columns to "right" nodes, labeled
+        with their indices unless labels are given; every nonzero entry is an
+        edge. For a ``CSRGraph``, column labels default to row labels, and
+        both entries of a symmetric matrix are added (pass the output of
+        ``scipy.sparse.triu`` to read each edge once)::
+
+            >>> from scipy.sparse import csr_matrix
+            >>> m = csr_matrix(np.array([[0, 2], [3, 0], [0, 0]]))
+            >>> sorted(CSRBigraph.from_sparse_matrix(m, ulabels='abc').iter_edge_weights())
+            [(('a', 1), 2), (('b', 0), 3)]
+        """
+        matrix = coo_matrix(matrix)
+        nonzero = matrix.data != 0
+        rows, cols, data = matrix.row[nonzero], matrix.col[nonzero], matrix.data[nonzero]
+        if vlabels is None and not cls._bipartite:
+            vlabels = ulabels
+        u = rows if ulabels is None else label_array(list(ulabels))[rows]
+        v = cols if vlabels is None else label_array(list(vlabels))[cols]
+        if weight_type is None:
+            weight_type = float if data.dtype.kind == 'f' else int
+        graph = cls(weight_type=weight_type)
+        graph._store.extend(u, v, data)
+        return graph
+
+    @classmethod
+    def from_edgelist_file(cls, path, sep=None, weight_type=int, numeric=False,
+                           comments='#'):
+        """Construct a graph from a file with one edge per line
+
+        Each line holds two node labels optionally followed by a weight,
+        separated by ``sep`` (any whitespace by default). Files are opened with
+        ``pymaptools.io.open_gz`` (so they can be compressed) and parsed in
+        chunks of about ``READ_CHUNK_SIZE`` bytes. With ``numeric=True``, node
+        labels are integers and whitespace-separated chunks are parsed by
+        NumPy rather than split line by line; lines starting with ``comments``
+        are skipped.
+        """
+        graph = cls(weight_type=weight_type)
+        store = graph._store
+        with open_gz(path, 'r') as handle:
+            while True:
+                lines = handle.readlines(READ_CHUNK_SIZE)
+                if not lines:
+                    break
+                lines = [line for line in lines
+                         if line.strip() and not line.startswith(comments)]
+                if not lines:
+                    continue
+                if numeric and sep is None:
+                    u, v, weights = _parse_numeric_lines(lines, weight_type)
+                else:
+                    u, v, weights = _parse_lines(lines, sep, numeric, weight_type)
+                store.extend(u, v, weights)
+        return graph
+
+    @classmethod
+    def _from_store(cls, store):
+        graph = cls(weight_type=store.weight_type)
+        graph._store = store
+        return graph
+
+    @property
+    def U2V(self):
+        return AdjacencyView(self._store, 0)
+
+    @property
+    def V2U(self):
+        return AdjacencyView(self._store, 1)
+
+    @property
+    def edges(self):
+        return EdgeView(self)
+
+    @property
+    def V(self):
+        '''a list of all "right" nodes
+        '''
+        return list(self._store.vnodes.labels)
+
+    @property
+    def nbytes(self):
+        """Memory taken by edge and adjacency arrays (not node labels)
+        """
+        return self._store.nbytes
+
+    def map_edge(self, edge):
+        u, v = edge
+        if u is None or v is None:
+            raise ValueError("An edge must connect two nodes")
+        self._store.unodes.intern(u)
+        self._store.vnodes.intern(v)
+
+    def store_weight(self, edge, weight):
+        u, v = edge
+        self._store.append(u, v, weight)
+
+    store_weight_sorted = store_weight
+
+    def add_edge(self, u, v, weight=1):
+        '''Add a single edge (plus two vertices if necessary)
+        '''
+        self._store.append(u, v, weight)
+
+    def iter_edge_ids(self):
+        """Iterate over edges as triples of node ids and weights
+        """
+        store = self._store
+        store.compact()
+        for start in xrange(0, len(store.u), ITER_CHUNK_SIZE):
+            end = start + ITER_CHUNK_SIZE
+            for triple in izip(store.u[start:end].tolist(),
+                               store.v[start:end].tolist(),
+                               store.weights[start:end].tolist()):
+                yield triple
+
+    def iter_edge_weights(self):
+        store = self._store
+        ulabels = store.unodes.labels
+        vlabels = store.vnodes.labels
+        make_edge = self.make_edge
+        for a, b, weight in self.iter_edge_ids():
+            yield make_edge(ulabels[a], vlabels[b]), weight
+
+    def iter_edges(self):
+        for edge, _ in self.iter_edge_weights():
+            yield edge
+
+    def _written_edge_ids(self, max_edges):
+        """Positions of edges to write, heaviest first when capped
+        """
+        weights = self._store.weights
+        if max_edges is None:
+            return np.arange(len(weights))
+        return _top_ids(weights, max_edges)
+
+    def _written_edges(self, max_edges):
+        if max_edges is None:
+            return self.iter_edge_weights()
+        store = self._store
+        store.compact()
+        edge_ids = self._written_edge_ids(max_edges)
+        ulabels = store.unodes.labels
+        vlabels = store.vnodes.labels
+        make_edge = self.make_edge
+        return [(make_edge(ulabels[a], vlabels[b]), weight)
+                for a, b, weight in izip(store.u[edge_ids].tolist(),
+                                         store.v[edge_ids].tolist(),
+                                         store.weights[edge_ids].tolist())]
+
+    def write_binary_edgelist(self, output, max_edges=None):
+        """Write edges between integer nodes as fixed-size binary records
+
+        Same format as ``Bigraph.write_binary_edgelist``, written from edge
+        arrays in chunks of ``ITER_CHUNK_SIZE`` records
+        """
+        store = self._store
+        store.compact()
+        weight_code = EDGELIST_WEIGHT_CODES[self.weight_type]
+        ulabels = _integer_labels(store.unodes)
+        vlabels = ulabels if store.vnodes is store.unodes else _integer_labels(store.vnodes)
+        edge_ids = self._written_edge_ids(max_edges)
+        records = np.empty(min(len(edge_ids), ITER_CHUNK_SIZE), dtype=_edgelist_dtype(weight_code))
+        with _output_handle(output) as handle:
+            handle.write(EDGELIST_HEADER.pack(EDGELIST_MAGIC, 1, weight_code))
+            for start in xrange(0, len(edge_ids), ITER_CHUNK_SIZE):
+                chunk = edge_ids[start:start + ITER_CHUNK_SIZE]
+                out = records[:len(chunk)]
+                out['u'] = ulabels[store.u[chunk]]
+                out['v'] = vlabels[store.v[chunk]]
+                out['weight'] = store.weights[chunk]
+                handle.write(out.tostring())
+
+    @classmethod
+    def from_binary_edgelist(cls, path):
+        """Construct a graph from a file written by ``write_binary_edgelist``
+
+        Records are read in chunks of about ``READ_CHUNK_SIZE`` bytes and
+        added as arrays::
+
+            >>> import os, shutil, tempfile
+            >>> dirname = tempfile.mkdtemp()
+            >>> path = os.path.join(dirname, 'edges.bin')
+            >>> g = CSRBigraph.from_arrays([1, 2], [-1, -1], [0.5, 1.5])
+            >>> g.write_binary_edgelist(path, max_edges=1)
+            >>> sorted(CSRBigraph.from_binary_edgelist(path).iter_edge_weights())
+            [((2, -1), 1.5)]
+            >>> shutil.rmtree(dirname)
+        """
+        with open_gz(path, 'rb') as handle:
+            weight_type, weight_code = _read_edgelist_header(handle)
+            dtype = _edgelist_dtype(weight_code)
+            graph = cls(weight_type=weight_type)
+            chunk_size = max(1, READ_CHUNK_SIZE // dtype.itemsize) * dtype.itemsize
+            while True:
+                chunk = handle.read(chunk_size)
+                if len(chunk) % dtype.itemsize:
+                    raise ValueError("Truncated binary edge list")
+                if not chunk:
+                    break
+                records = np.frombuffer(chunk, dtype=dtype)
+                graph._store.extend(records['u'], records['v'], records['weight'])
+        return graph
+
+    def get_weight(self):
+        self._store.compact()
+        return self._store.weights.sum().item()
+
+    def _node_weight(self, side, nodes, node):
+        node_id = nodes.get(node)
+        if node_id is None:
+            return self.weight_type()
+        store = self._store
+        store.compact()
+        degrees = store._degrees[side if store.bipartite else 0]
+        if degrees is not None:
+            return degrees[1][node_id].item()
+        _, weights = store.neighbor_ids(side, node_id)
+        return weights.sum().item()
+
+    def _save_arrays(self, path, compressed=False, block_size=None):
+        """Save graph in the binary format (see ``Bigraph.save_to``)
+        """
+        store = self._store
+        store.compact()
+        num_edges = len(store.u)
+        if block_size is not None:
+            if not path.endswith('.npz'):
+                raise ValueError("Edge blocks are only used in .npz archives")
+            if block_size <= 0:
+                raise ValueError("Block size must be positive")
+        block_size = block_size if block_size and num_edges else 0
+        arrays = {
+            'meta': np.array([GRAPH_FORMAT_VERSION, self._bipartite,
+                              self.weight_type is float, num_edges, block_size]),
+            'ulabels': as_label_array(store.unodes.labels),
+        }
+        if self._bipartite:
+            arrays['vlabels'] = as_label_array(store.vnodes.labels)
+        for side in _graph_sides(self._bipartite):
+            indptr, _, edge_ids = store.adjacency(self._side_nodes(side)[0])
+            arrays[side + '_indptr'] = indptr
+            if edge_ids is not None:
+                arrays[side + '_edge_ids'] = edge_ids.astype(_id_dtype(num_edges))
+        edges = dict(izip(GRAPH_EDGES, (store.u, store.v, store.weights)))
+        if block_size:
+            for name, arr in edges.iteritems():
+                for block, start in enumerate(xrange(0, num_edges, block_size)):
+                    arrays['%s_%d' % (name, block)] = arr[start:start + block_size]
+        else:
+            arrays.update(edges)
+        save_arrays(path, arrays, compressed=compressed)
+
+    @classmethod
+    def _load_arrays(cls, path, mmap_mode=None, nodes=None, side='V'):
+        """Load graph saved in the binary format (see ``Bigraph.load_from``)
+        """
+        meta = load_arrays(path, ['meta'])['meta'].tolist()
+        version, bipartite, float_weights, num_edges, block_size = meta
+        if version != GRAPH_FORMAT_VERSION:
+            raise ValueError("Unsupported graph format version %d" % version)
+        if bool(bipartite) != cls._bipartite:
+            raise TypeError("Loaded graph not of expected type %s" % cls.__name__)
+        if mmap_mode is not None and block_size:
+            raise ValueError("Memory mapping requires edge arrays saved without blocks")
+        labels = load_arrays(path, GRAPH_LABELS[:1 + bipartite])
+        ulabels = labels['ulabels']
+        vlabels = labels.get('vlabels', ulabels)
+        graph = cls(weight_type=float if float_weights else int)
+        store = graph._store
+        if nodes is None:
+            edges = _load_edge_arrays(path, num_edges, block_size, mmap_mode=mmap_mode)
+            store.unodes = NodeIndex(ulabels.tolist())
+            store.vnodes = NodeIndex(vlabels.tolist()) if bipartite else store.unodes
+            store.u, store.v, store.weights = [edges[name] for name in GRAPH_EDGES]
+            return graph
+        if side not in _graph_sides(bipartite):
+            raise ValueError("Unknown side %r" % (side,))
+        wanted = set(nodes)
+        side_labels = ulabels if side == 'U' else vlabels
+        node_ids = np.array([node_id for node_id, label in enumerate(side_labels.tolist())
+                             if label in wanted], dtype=np.int64)
+        names = [side + '_indptr'] + ([] if side == 'U' else [side + '_edge_ids'])
+        index = load_arrays(path, names, mmap_mode=mmap_mode, mmap_names=names)
+        indptr = index[side + '_indptr']
+        starts, ends = indptr[node_ids], indptr[node_ids + 1]
+        # positions of edges incident to wanted nodes, run by run
+        lengths = ends - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        positions = offsets + np.arange(lengths.sum())
+        if side != 'U':
+            positions = index[side + '_edge_ids'][positions]
+        positions = np.unique(positions)
+        if not len(positions):
+            return graph
+        edges = _load_edge_arrays(path, num_edges, block_size, positions, mmap_mode)
+        store.extend(ulabels[edges['u']], vlabels[edges['v']], edges['weights'])
+        return graph
+
+    def _contract(self, unode_groups, vnode_groups, reduce):
+        """Contract nodes with a single sort and reduction over edge arrays
+
+        Node groups can also be arrays, see ``_group_codes``::
+
+            >>> g = CSRBigraph.from_edgelist([(1, -1, 2), (2, -1, 3), (3, -2, 5)])
+            >>> sorted(g.contract(['a', 'a', 'b'], reduce='min').iter_edge_weights())
+            [(('a', -1), 2), (('b', -2), 5)]
+        """
+        ufunc = CONTRACT_UFUNCS.get(reduce)
+        if ufunc is None:
+            raise ValueError("Unknown reduction %r" % (reduce,))
+        store = self._store
+        store.compact()
+        ucodes, ulabels = _group_codes(store.unodes, unode_groups)
+        if self._bipartite:
+            vcodes, vlabels = _group_codes(store.vnodes, vnode_groups)
+        else:
+            vcodes, vlabels = ucodes, ulabels
+        a, b = ucodes[store.u], vcodes[store.v]
+        kept = np.flatnonzero((a >= 0) & (b >= 0))
+        a, b, weights = a[kept], b[kept], store.weights[kept]
+        if not self._bipartite:
+            a, b = np.minimum(a, b), np.maximum(a, b)
+        num_vgroups = max(len(vlabels), 1)
+        keys = a * num_vgroups + b
+        order = np.argsort(keys, kind='mergesort')
+        keys = keys[order]
+        starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]])[:len(keys)])
+        result = CSREdgeStore(self.weight_type, self._bipartite)
+        result.unodes = NodeIndex(ulabels)
+        result.vnodes = NodeIndex(vlabels) if self._bipartite else result.unodes
+        result.weights = ufunc.reduceat(weights[order], starts) if len(keys) else weights
+        keys = keys[starts]
+        result.u = keys // num_vgroups
+        result.v = keys % num_vgroups
+        # groups left without edges are not nodes
+        return self._from_store(result.subset(np.arange(len(keys))))
+
+    def _side_nodes(self, side):
+        """Store side (0 or 1) and node index of nodes in U or V
+        """
+        if side == 'V':
+            return 1, self._store.vnodes
+        elif side == 'U' and self._bipartite:
+            return 0, self._store.unodes
+        raise ValueError("Unknown side %r" % (side,))
+
+    def get_node_degrees(self, side='V', nodes=None):
+        """Degrees and weighted degrees of all nodes in U or V (or of given ones)
+
+        Same as ``Bigraph.get_node_degrees`` except that degrees and weights
+        are NumPy arrays (read-only when covering all nodes)::
+
+            >>> g = CSRBigraph.from_edgelist([(1, -1, 2), (1, -2, 3), (2, -2, 1)])
+            >>> nodes, degrees, weights = g.get_node_degrees('U')
+            >>> nodes, degrees.tolist(), weights.tolist()
+            ([1, 2], [2, 1], [5, 1])
+        """
+        side_id, index = self._side_nodes(side)
+        degrees, weights = self._store.degrees(side_id)
+        if nodes is None:
+            return list(index.labels), degrees, weights
+        nodes = list(nodes)
+        node_ids = index.get_many(nodes)
+        found = node_ids >= 0
+        node_degrees = np.zeros(len(nodes), dtype=degrees.dtype)
+        node_weights = np.zeros(len(nodes), dtype=weights.dtype)
+        node_degrees[found] = degrees[node_ids[found]]
+        node_weights[found] = weights[node_ids[found]]
+        return nodes, node_degrees, node_weights
+
+    def get_top_nodes(self, k, side='V', by='weight'):
+        """Nodes in U or V with the ``k`` largest weighted degrees (or degrees)
+
+        Selected with ``numpy.argpartition`` rather than a full sort
+        """
+        side_id, index = self._side_nodes(side)
+        degrees, weights = self._store.degrees(side_id)
+        if by == 'weight':
+            values = weights
+        elif by == 'degree':
+            values = degrees
+        else:
+            raise ValueError("Nodes are ranked either by 'weight' or by 'degree'")
+        node_ids = _top_ids(values, k)
+        labels = index.labels
+        return [(labels[node_id], value) for node_id, value
+                in izip(node_ids.tolist(), values[node_ids].tolist())]
+
+    def get_vnode_weight(self, node):
+        return self._node_weight(1, self._store.vnodes, node)
+
+    def __len__(self):
+        '''Number of edges in an undirected graph
+        '''
+        return len(self._store)
+
+    def __eq__(self, other):
+        if isinstance(other, _CSRGraphMixin):
+            return dict(self.iter_edge_weights()) == dict(other.iter_edge_weights())
+        return self.edges == other.edges
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def _edge_store(self, other):
+        """Edge store of another graph (built if it is not array-backed)
+        """
+        if isinstance(other, _CSRGraphMixin):
+            return other._store
+        store = CSREdgeStore(other.weight_type, bipartite=self._bipartite)
+        for (u, v), weight in other.iter_edge_weights():
+            store.append(u, v, weight)
+        return store
+
+    @classmethod
+    def from_components(cls, components):
+        """Constructs a graph from a series of components
+
+        Edges of all components are sorted and merged once, and weights of
+        shared edges are summed. Weight type is that of the first component::
+
+            >>> g = CSRGraph.from_components([
+            ...     CSRGraph.from_edgelist([(1, 2), (2, 3)]),
+            ...     Graph.from_edgelist([(3, 2), (3, 4)])])
+            >>> sorted(g.iter_edge_weights())
+            [((1, 2), 1), ((2, 3), 2), ((3, 4), 1)]
+        """
+        graph = None
+        for component in components:
+            if graph is None:
+                graph = cls(weight_type=component.weight_type)
+            graph._store.extend_store(graph._edge_store(component))
+        return cls() if graph is None else graph
+
+    def __and__(self, other):
+        '''Get intersection of edges of two graphs (with minimum weights)
+        '''
+        store, other_store = self._store, self._edge_store(other)
+        edge_ids, other_ids = store.match(other_store)
+        result = store.subset(edge_ids)
+        result.weights = np.minimum(result.weights, other_store.weights[other_ids]) \
+            .astype(store.weight_dtype)
+        return self._from_store(result)
+
+    def __or__(self, other):
+        '''Get union of edges of two graphs (with summed weights)
+        '''
+        result = self.__class__(self, weight_type=self.weight_type)
+        result |= other
+        return result
+
+    def __sub__(self, other):
+        '''Get difference of edges of two graphs (noncommutative)
+        '''
+        store = self._store
+        edge_ids, _ = store.match(self._edge_store(other))
+        keep = np.ones(len(store), dtype=bool)
+        keep[edge_ids] = False
+        return self._from_store(store.subset(np.flatnonzero(keep)))
+
+    def __iand__(self, other):
+        '''Keep only edges shared with another graph, with minimum weights
+
+        Works on sorted edge arrays, as do the other in-place operators::
+
+            >>> g = CSRBigraph.from_edgelist([(1, -1, 3), (1, -2, 1), (2, -2, 2)])
+            >>> g &= CSRBigraph.from_edgelist([(1, -1, 2), (2, -2, 5), (3, -3, 1)])
+            >>> g |= Bigraph.from_edgelist([(2, -2, 1), (4, -4, 1)])
+            >>> g -= CSRBigraph.from_edgelist([(4, -4)])
+            >>> sorted(g.iter_edge_weights()), sorted(g.U)
+            ([((1, -1), 2), ((2, -2), 3)], [1, 2])
+        '''
+        self._store = (self & other)._store
+        return self
+
+    def __ior__(self, other):
+        '''Add edges of another graph, summing weights of shared edges
+        '''
+        self._store.merge(self._edge_store(other))
+        return self
+
+    def __isub__(self, other):
+        '''Remove edges found in another graph
+        '''
+        self._store = (self - other)._store
+        return self
+
+    def prune(self, min_edge_weight=None, min_degree=None):
+        """Return a subgraph without light edges and low-degree nodes
+
+        Works as ``Bigraph.prune``, with whole-array passes over edges; the
+        result holds copies of the remaining edge arrays only::
+
+            >>> g = CSRGraph.from_edgelist([(1, 2, 3), (2, 3, 3), (3, 1, 3), (3, 4, 1)])
+            >>> sorted(g.prune(min_degree=2).iter_edges())
+            [(1, 2), (1, 3), (2, 3)]
+        """
+        store = self._store
+        store.compact()
+        if min_edge_weight is None:
+            keep = np.ones(len(store.u), dtype=bool)
+        else:
+            keep = store.weights >= min_edge_weight
+        min_udegree, min_vdegree = _degree_bounds(min_degree)
+        if min_udegree > 0 or min_vdegree > 0:
+            keep = store.peel(keep, min_udegree, min_vdegree)
+        return self._from_store(store.subset(np.flatnonzero(keep)))
+
+    def label_components(self):
+        """Find connected components without building component subgraphs
+
+        Components are found with ``scipy.sparse.csgraph`` and numbered in the
+        order of their first (lowest-id) node::
+
+            >>> g = CSRBigraph.from_edgelist([(1, -1), (2, -2), (3, -3), (3, -1)])
+            >>> components = g.label_components()
+            >>> len(components), components.unode_components.tolist()
+            (2, [0, 1, 0])
+            >>> sorted(components[0].iter_edges())
+            [(1, -1), (3, -3), (3, -1)]
+        """
+        unode_components, vnode_components = self._store.node_components()
+        return CSRComponentLabels(self, unode_components, vnode_components)
+
+    def _component_subgraph(self, components, component_id):
+        edge_ids = components.get_edge_ids(component_id)
+        return self._from_store(self._store.subset(edge_ids))
+
+    def find_connected_components(self):
+        """Return all connected components as graphs of the same class
+
+        Components are emitted in the order of their first (lowest-id) node
+        """
+        components = self.label_components()
+        for component_id in xrange(len(components)):
+            if len(components.get_edge_ids(component_id)):
+                yield components[component_id]
+
+
+class CSRBigraph(_CSRGraphMixin, Bigraph):
+
+    """Array-backed undirected bipartite graph
+
+    Drop-in replacement for ``Bigraph`` with integer or float weights::
+
+        >>> g = CSRBigraph()
+        >>> g.add_edge("u1", "v1", 2)
+        >>> g.add_edge("u1", "v2")
+        >>> g.add_edge("u1", "v1")
+        >>> sorted(g.iter_edge_weights())
+        [(('u1', 'v1'), 3), (('u1', 'v2'), 1)]
+        >>> g.edges["u1", "v1"], g.get_unode_weight("u1"), g.V2U["v2"]
+        (3, 4, set(['u1']))
+    """
+
+    _bipartite = True
+
+    @property
+    def U(self):
+        '''a list of all "left" nodes
+        '''
+        return list(self._store.unodes.labels)
+
+    def get_unode_weight(self, node):
+        return self._node_weight(0, self._store.unodes, node)
+
+    def project(self, side='U', weighted=False, normalize=None, min_shared=1,
+                min_weight=None, top_k=None, max_chunk_nnz=None):
+        """One-mode projection onto nodes in U (or V, with ``side='V'``)
+
+        Two nodes are linked if they share neighbors, with the number of
+        shared neighbors as the weight (or, with ``weighted=True``, the sum of
+        products of weights of edges to shared neighbors). The weights form
+        the product of the biadjacency matrix B with its transpose, which is
+        computed in chunks of rows holding about ``max_chunk_nnz`` entries
+        (``PROJECT_CHUNK_NNZ`` by default).
+
+        Parameters
+        ----------
+        normalize : {None, 'jaccard', 'cosine'}
+            Divide weights by the size of the union of neighborhoods or by
+            the geometric mean of their sizes (for weighted projections, this
+            gives the Tanimoto coefficient and the cosine of weight vectors)
+        min_shared : int
+            Minimum number of shared neighbors for nodes to be linked
+        min_weight : number, optional
+            Minimum (normalized) weight of projected edges
+        top_k : int, optional
+            Keep only the ``top_k`` heaviest edges of each node (an edge is
+            kept if it is among the heaviest for either of its nodes)
+
+        Returns a ``CSRGraph`` with float weights if normalized and weights
+        of this graph otherwise. Nodes without projected edges are left out::
+
+            >>> g = CSRBigraph.from_edgelist([('a', 1), ('a', 2), ('b', 1), ('b', 2),
+            ...                               ('c', 2), ('d', 3)])
+            >>> sorted(g.project().iter_edge_weights())
+            [(('a', 'b'), 2), (('a', 'c'), 1), (('b', 'c'), 1)]
+            >>> sorted(g.project(min_shared=2).iter_edges())
+            [('a', 'b')]
+            >>> sorted(g.project('V', normalize='jaccard').iter_edge_weights())
+            [((1, 2), 0.6666666666666666)]
+        """
+        nodes, a, b, weights = _project_edges(
+            self._store, side, weighted, normalize, min_shared, min_weight, top_k,
+            max_chunk_nnz)
+        graph = CSRGraph(weight_type=float if weights.dtype.kind == 'f' else int)
+        store = graph._store
+        node_ids, ends = np.unique(np.concatenate([a, b]), return_inverse=True)
+        store.unodes = store.vnodes = nodes.subset(node_ids.tolist())
+        store.extend_ids(ends[:len(a)], ends[len(a):], weights)
+        return graph
+
+    def find_cliques(self, L=None, P=None, kernel='sets'):
+        '''Find maximal bicliques (see ``Bigraph.find_cliques``)
+
+        The search runs on integer node ids and results are translated back
+        to node labels
+        '''
+        _check_kernel(kernel)
+        store = self._store
+        unodes, vnodes = store.unodes, store.vnodes
+        u2v, v2u = store.neighbor_sets(0), store.neighbor_sets(1)
+        L = set(xrange(len(unodes)) if L is None else (unodes[u] for u in L))
+        P = range(len(vnodes)) if P is None else [vnodes[v] for v in P]
+        ulabels, vlabels = unodes.labels, vnodes.labels
+        for L_ids, R_ids in _enumerate_bicliques(u2v, v2u, L, P, kernel):
+            yield (set(ulabels[u] for u in L_ids),
+                   set(vlabels[v] for v in R_ids))
+
+    def find_cliques_parallel(self, L=None, P=None, n_jobs=-1, ordered=False,
+                              max_task_size=None, kernel='sets'):
+        '''Find maximal bicliques using a pool of processes (see
+        ``Bigraph.find_cliques_parallel``)
+        '''
+        ulabels, vlabels = self._store.unodes.labels, self._store.vnodes.labels
+        found = super(CSRBigraph, self).find_cliques_parallel(
+            L, P, n_jobs=n_jobs, ordered=ordered, max_task_size=max_task_size,
+            kernel=kernel)
+        for L_ids, R_ids in found:
+            yield (set(ulabels[u] for u in L_ids),
+                   set(vlabels[v] for v in R_ids))
+
+    def _clique_tasks_state(self, L, P):
+        store = self._store
+        unodes, vnodes = store.unodes, store.vnodes
+        components = self.label_components()
+        L = np.arange(len(unodes)) if L is None else [unodes[u] for u in L]
+        P = np.arange(len(vnodes)) if P is None else [vnodes[v] for v in P]
+        num_components = len(components)
+        searched = zip(
+            _group_ids(L, components.unode_components, num_components),
+            _group_ids(P, components.vnode_components, num_components))
+        state = dict(bipartite=True, u2v=store.neighbor_sets(0),
+                     v2u=store.neighbor_sets(1), components=searched)
+        return state, [len(P_c) for _, P_c in searched]
+
+
+class CSRGraph(_CSRGraphMixin, Graph):
+
+    """Array-backed undirected graph
+
+    Drop-in replacement for ``Graph`` with integer or float weights::
+
+        >>> g = CSRGraph()
+        >>> g.add_edge(2, 1)
+        >>> g.add_edge(1, 2)
+        >>> g.add_edge(2, 3)
+        >>> sorted(g.iter_edge_weights()), g.edges[3, 2]
+        ([((1, 2), 2), ((2, 3), 1)], 1)
+        >>> sorted(g.V2U[2])
+        [1, 3]
+    """
+
+    _bipartite = False
+
+    def __init__(self, base=None, weight_type=int):
+        super(CSRGraph, self).__init__(base=base, weight_type=weight_type)
+
+    def find_cliques(self, nodes=None, min_clique_size=3, kernel='sets'):
+        '''Return maximal cliques (see ``Graph.find_cliques``)
+
+        The search runs on integer node ids and results are translated back
+        to node labels
+        '''
+        _check_kernel(kernel)
+        store = self._store
+        v2u = store.neighbor_sets(0)
+        nodes_index = store.vnodes
+        if nodes is None:
+            search_space = np.arange(len(nodes_index))
+        else:
+            search_space = [nodes_index[v] for v in nodes]
+        search_space = set(self._core_ids(search_space, min_clique_size - 1).tolist())
+        labels = nodes_index.labels
+        for clique in _enumerate_cliques(v2u, search_space, min_clique_size, kernel):
+            yield set(labels[v] for v in clique)
+
+    def find_cliques_degeneracy(self, nodes=None, min_clique_size=3,
+                                max_clique_size=None, max_results=None,
+                                time_budget=None, min_clique_weight=None,
+                                kernel='sets'):
+        '''Return maximal cliques, searching from nodes in degeneracy order
+        (see ``Graph.find_cliques_degeneracy``)
+        '''
+        _check_kernel(kernel)
+        store = self._store
+        nodes_index = store.vnodes
+        if nodes is None:
+            search_space = np.arange(len(nodes_index))
+        else:
+            search_space = [nodes_index[v] for v in set(nodes) if v in nodes_index]
+        search_space = self._core_ids(search_space, min_clique_size - 1).tolist()
+        labels = nodes_index.labels
+        cliques = _find_cliques_degeneracy(
+            store.neighbor_sets(0), search_space, min_clique_size,
+            max_clique_size, time_budget, kernel)
+        cliques = (set(labels[v] for v in clique) for clique in cliques)
+        return _limit_cliques(cliques, self.get_clique_weight,
+                              min_clique_weight, max_results)
+
+    def find_cliques_parallel(self, nodes=None, min_clique_size=3, n_jobs=-1,
+                              ordered=False, max_task_size=None, kernel='sets'):
+        '''Find maximal cliques using a pool of processes (see
+        ``Graph.find_cliques_parallel``)
+        '''
+        labels = self._store.vnodes.labels
+        found = super(CSRGraph, self).find_cliques_parallel(
+            nodes, min_clique_size, n_jobs=n_jobs, ordered=ordered,
+            max_task_size=max_task_size, kernel=kernel)
+        for clique in found:
+            yield set(labels[v] for v in clique)
+
+    def _clique_tasks_state(self, nodes, min_clique_size):
+        store = self._store
+        nodes_index = store.vnodes
+        components = self.label_components()
+        indptr, _, _ = store.adjacency(0)
+        if nodes is None:
+            ids = np.arange(len(nodes_index))
+        else:
+            ids = [nodes_index[v] for v in nodes]
+        ids = self._core_ids(ids, min_clique_size - 1)
+        # lower-degree nodes go first
+        ids = ids[np.argsort(np.diff(indptr)[ids], kind='mergesort')]
+        searched = _group_ids(ids, components.vnode_components, len(components))
+        v2u = store.neighbor_sets(0)
+        state = dict(bipartite=False, u2v=v2u, v2u=v2u, components=searched,
+                     min_clique_size=min_clique_size)
+        return state, [len(component) for component in searched]
+
+    def get_core_numbers(self):
+        """Return a dict of core numbers of nodes (see ``Graph.get_core_numbers``)
+        """
+        store = self._store
+        _, cores = _degeneracy_ordering(store.neighbor_sets(0), xrange(len(store.vnodes)))
+        labels = store.vnodes.labels
+        return dict((labels[node_id], core) for node_id, core in cores.iteritems())
+
+    def _core_ids(self, node_ids, k):
+        """Sorted ids of nodes of the k-core of the subgraph induced by node ids
+        """
+        node_ids = np.unique(np.asarray(node_ids, dtype=np.int64))
+        if k <= 0:
+            return node_ids
+        store = self._store
+        store.compact()
+        inside = np.zeros(len(store.vnodes), dtype=bool)
+        inside[node_ids] = True
+        keep = store.peel(inside[store.u] & inside[store.v], k, k)
+        live = keep & (store.u != store.v)
+        degrees = np.bincount(store.u[live], minlength=len(inside)) + \
+            np.bincount(store.v[live], minlength=len(inside))
+        return np.flatnonzero(degrees >= k)
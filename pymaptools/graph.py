@@ -49,13 +49,36 @@ References
         <http://dx.doi.org/10.1109/HICSS.2008.507>`_
 """
 
-import operator
+import time
+import heapq
+import struct
+import logging
+import zipfile
 from copy import deepcopy
-from collections import defaultdict
-from itertools import chain, product
+from collections import defaultdict, Mapping, MutableMapping
+from itertools import chain, product, izip, islice
+from multiprocessing import Pool
+from joblib import cpu_count
 from StringIO import StringIO
-from contextlib import closing
-from pymaptools.io import SimplePicklableMixin
+from operator import itemgetter, add
+from contextlib import closing, contextmanager
+from xml.sax.saxutils import escape, quoteattr
+from pymaptools.io import SimplePicklableMixin, open_gz
+from pymaptools.unionfind import UnionFind, label_disjoint_sets
+from pymaptools.bitwise import popcount, iter_set_bits, from_indices
+
+
+# binary edge lists start with a magic string, a format version and the type
+# code of weights, followed by records of two node ids and a weight
+EDGELIST_MAGIC = 'PMEL'
+EDGELIST_HEADER = struct.Struct('<4sBc2x')
+EDGELIST_WEIGHT_CODES = {int: 'q', long: 'q', float: 'd'}
+
+# ways of combining weights of edges merged by graph contraction
+CONTRACT_REDUCTIONS = {'sum': add, 'max': max, 'min': min}
+
+# formats of Bigraph.save_to (see csrgraph for the binary array format)
+SAVE_FORMATS = ('pickle', 'arrays')
 
 
 class SkipEdge(Exception):
@@ -74,6 +97,54 @@ def rename_store_weight(cls):
     return cls
 
 
+class ComponentLabels(object):
+
+    """Connected component membership of graph nodes
+
+    ``unode_labels`` and ``vnode_labels`` map nodes to integer component ids
+    (for graphs that are not bipartite, both refer to the same mapping).
+    Component subgraphs are only built when accessed by id or iterated over,
+    and reflect the graph at the time the labels were computed::
+
+        >>> g = Graph.from_edgelist([(1, 2), (3, 4), (2, 5)])
+        >>> components = g.label_components()
+        >>> len(components), components.vnode_labels[5]
+        (2, 0)
+        >>> sorted(components[1].iter_edges())
+        [(3, 4)]
+    """
+
+    def __init__(self, graph, unode_labels, vnode_labels, num_components):
+        self.graph = graph
+        self.unode_labels = unode_labels
+        self.vnode_labels = vnode_labels
+        self.num_components = num_components
+        self._members = None
+
+    def __len__(self):
+        return self.num_components
+
+    def __getitem__(self, component_id):
+        if not 0 <= component_id < self.num_components:
+            raise IndexError("Component id out of range: %r" % component_id)
+        return self.graph._component_subgraph(self, component_id)
+
+    def __iter__(self):
+        for component_id in xrange(self.num_components):
+            yield self[component_id]
+
+    def get_members(self, component_id):
+        """Return left and right nodes belonging to a component
+        """
+        if self._members is None:
+            members = [([], []) for _ in xrange(self.num_components)]
+            for side, labels in enumerate([self.unode_labels, self.vnode_labels]):
+                for node, label in labels.iteritems():
+                    members[label][side].append(node)
+            self._members = members
+        return self._members[component_id]
+
+
 @rename_store_weight
 class Bigraph(SimplePicklableMixin):
     """Undirected bipartite graph G = (U & V, E)
@@ -86,6 +157,10 @@ class Bigraph(SimplePicklableMixin):
     Weights by default are assumed to be integers, and the default
     instances serve as edge counters.
 
+    With ``track_components=True``, nodes are merged in a ``UnionFind``
+    as edges are added, so that the component of a node can be looked up
+    without traversing the graph (see ``get_component_id``).
+
     Example usage::
 
         >>> g = Bigraph()
@@ -105,8 +180,16 @@ class Bigraph(SimplePicklableMixin):
         >>> (sorted(curr.U), sorted(curr.V))
         ([5], [-5])
     """
-    def __init__(self, base=None, weight_type=int, min_edge_weight=None):
+    # union-find over nodes, maintained with track_components=True
+    track_components = False
+    _components = None
+    # degrees and weighted degrees of nodes, cleared whenever edges change
+    _node_degrees = None
+
+    def __init__(self, base=None, weight_type=int, min_edge_weight=None,
+                 track_components=False):
         self.weight_type = weight_type
+        self.track_components = track_components
         if base is None:
             # new empty object
             self.U2V = defaultdict(set)  # left to rigt mapping dict
@@ -132,12 +215,20 @@ class Bigraph(SimplePicklableMixin):
                     if weight >= min_edge_weight:
                         u, v = edge
                         self.add_edge(u, v, weight=deepcopy(weight))
+        if track_components and base is None:
+            self._components = UnionFind()
 
     @classmethod
     def from_components(cls, components):
         """Constructs a graph from a series of components
+
+        Components are added to one graph in turn (so that the cost is linear
+        in the total number of edges), and weights of shared edges are summed
         """
-        return reduce(operator.or_, components, cls())
+        g = cls()
+        for component in components:
+            g |= component
+        return g
 
     @classmethod
     def from_edgelist(cls, edgelist):
@@ -151,6 +242,98 @@ class Bigraph(SimplePicklableMixin):
             g.add_edge(*edge)
         return g
 
+    def _new_graph(self, *args, **kwargs):
+        """Create an empty graph of the type that derived graphs are built as
+        """
+        return self.__class__(*args, **kwargs)
+
+    def save_to(self, filename, format=None, **kwargs):
+        """Save graph to a file or directory
+
+        Graphs are pickled unless ``format='arrays'`` is given or ``filename``
+        ends in ``.npz``, in which case a binary format (interned node labels
+        and sorted edge arrays, see ``pymaptools.csrgraph``) is used that is
+        written and read much faster than pickles. The binary format holds
+        int or float weights only and no component tracking state, so other
+        graphs saved to ``.npz`` paths are pickled (and options of the binary
+        format are rejected with ``ValueError``). Edge arrays of
+        directories (paths not ending in ``.npz``) are raw ``.npy`` files
+        that can be memory-mapped, while ``.npz`` archives can be
+        ``compressed`` and split into blocks of ``block_size`` edges, so that
+        partial loads only decompress the blocks they need::
+
+            >>> import os, shutil, tempfile
+            >>> dirname = tempfile.mkdtemp()
+            >>> path = os.path.join(dirname, 'graph.npz')
+            >>> g = Bigraph.from_edgelist([(1, 'a', 2), (2, 'a', 1)])
+            >>> g.save_to(path, compressed=True)
+            >>> Bigraph.load_from(path) == g
+            True
+            >>> shutil.rmtree(dirname)
+        """
+        if format is None:
+            format = 'arrays' if filename.endswith('.npz') and \
+                self._array_compatible() else 'pickle'
+        if _check_format(format) == 'pickle':
+            _check_pickle_options(kwargs, "the graph is pickled")
+            return super(Bigraph, self).save_to(filename)
+        if self.track_components:
+            raise ValueError("Component tracking state cannot be saved as arrays")
+        self._save_arrays(filename, **kwargs)
+
+    @classmethod
+    def load_from(cls, filename, format=None, **kwargs):
+        """Load graph saved with ``save_to``
+
+        The format is chosen as in ``save_to`` (``.npz`` files holding
+        pickles are recognized). With the binary format, ``mmap_mode='r'``
+        memory-maps edge arrays of directories (for ``CSRBigraph`` and
+        ``CSRGraph``), and ``nodes`` loads only edges of given nodes in U or V
+        (chosen by ``side``), reading just the parts of edge arrays that hold
+        them::
+
+            >>> import os, shutil, tempfile
+            >>> dirname = tempfile.mkdtemp()
+            >>> path = os.path.join(dirname, 'graph')
+            >>> g = Graph.from_edgelist([(1, 2), (2, 3), (3, 4)])
+            >>> g.save_to(path, format='arrays')
+            >>> sorted(Graph.load_from(path, format='arrays', nodes=[2]).iter_edges())
+            [(1, 2), (2, 3)]
+            >>> shutil.rmtree(dirname)
+        """
+        if format is None:
+            format = 'arrays' if filename.endswith('.npz') and \
+                zipfile.is_zipfile(filename) else 'pickle'
+        if _check_format(format) == 'pickle':
+            _check_pickle_options(kwargs, "the file holds a pickle")
+            return super(Bigraph, cls).load_from(filename)
+        return cls._load_arrays(filename, **kwargs)
+
+    def _array_compatible(self):
+        """Whether the graph can be saved in the binary format as is
+        """
+        return self.weight_type in (int, float) and not self.track_components
+
+    @classmethod
+    def _array_class(cls):
+        """Array-backed graph class used for the binary format
+        """
+        from pymaptools.csrgraph import CSRBigraph
+        return CSRBigraph
+
+    def _save_arrays(self, path, **kwargs):
+        array_class = self._array_class()
+        array_class(self, weight_type=self.weight_type)._save_arrays(path, **kwargs)
+
+    @classmethod
+    def _load_arrays(cls, path, **kwargs):
+        loaded = cls._array_class()._load_arrays(path, **kwargs)
+        graph = cls(weight_type=loaded.weight_type)
+        add_edge = graph.add_edge
+        for (u, v), weight in loaded.iter_edge_weights():
+            add_edge(u, v, weight)
+        return graph
+
     def iter_edges(self):
         return self.edges.iterkeys()
 
@@ -160,8 +343,10 @@ class Bigraph(SimplePicklableMixin):
     def rename_nodes(self, unode_renamer=None, vnode_renamer=None):
         """Factory method that produces another graph just like current one
         except with renamed nodes (can be used for reducing a graph)
+
+        See ``contract`` for renaming nodes with mappings
         """
-        new_graph = self.__class__()
+        new_graph = self._new_graph()
         for (u, v), weight in self.iter_edge_weights():
             try:
                 u = unode_renamer(u)
@@ -171,10 +356,64 @@ class Bigraph(SimplePicklableMixin):
             new_graph.add_edge(u, v, weight)
         return new_graph
 
+    def contract(self, unode_groups=None, vnode_groups=None, reduce='sum'):
+        """Contract nodes into groups, merging edges between the same groups
+
+        Groups of nodes in U and V are given as mappings from nodes to group
+        labels; nodes missing from a mapping are dropped along with their
+        edges, while nodes on a side without a mapping are kept as they are.
+        Weights of merged edges are combined by ``reduce`` (one of
+        ``CONTRACT_REDUCTIONS``). Array-backed graphs also take arrays of
+        group labels aligned with ``U`` and ``V``, in which masked entries
+        (of ``numpy.ma`` arrays) drop nodes::
+
+            >>> g = Bigraph.from_edgelist([(1, -1, 2), (2, -1, 3), (2, -2, 1), (3, -2, 5)])
+            >>> sorted(g.contract({1: 'a', 2: 'a'}).iter_edge_weights())
+            [(('a', -2), 1), (('a', -1), 5)]
+            >>> sorted(g.contract(vnode_groups={-1: 0, -2: 0}, reduce='max').iter_edge_weights())
+            [((1, 0), 2), ((2, 0), 3), ((3, 0), 5)]
+        """
+        return self._contract(unode_groups, vnode_groups, reduce)
+
+    def _contract(self, unode_groups, vnode_groups, reduce):
+        combine = CONTRACT_REDUCTIONS.get(reduce)
+        if combine is None:
+            raise ValueError("Unknown reduction %r" % (reduce,))
+        ugroups = {} if unode_groups is None else unode_groups
+        vgroups = {} if vnode_groups is None else vnode_groups
+        for groups in [ugroups, vgroups]:
+            if not isinstance(groups, Mapping):
+                raise TypeError("Node groups must be given as mappings")
+        # nodes on sides without mappings are their own groups
+        uget = ugroups.get if unode_groups is not None else (lambda node, default: node)
+        vget = vgroups.get if vnode_groups is not None else (lambda node, default: node)
+        make_edge = self.make_edge
+        dropped = object()
+        merged = {}
+        for (u, v), weight in self.iter_edge_weights():
+            u = uget(u, dropped)
+            v = vget(v, dropped)
+            if u is dropped or v is dropped:
+                continue
+            edge = make_edge(u, v)
+            other = merged.get(edge)
+            merged[edge] = weight if other is None else combine(other, weight)
+        graph = self._new_graph(weight_type=self.weight_type)
+        # same as map_edge on a new graph (for graphs that are not bipartite,
+        # both mappings are the same and get both directions of edges)
+        u2v, v2u = graph.U2V, graph.V2U
+        for u, v in merged:
+            u2v[u].add(v)
+            v2u[v].add(u)
+        graph.edges.update(merged)
+        return graph
+
     def get_weight(self):
         return sum(self.edges.itervalues())
 
     def get_vnode_weight(self, node):
+        if self._node_degrees and 'V' in self._node_degrees:
+            return self._node_degrees['V'][1].get(node, self.weight_type())
         neighbors = self.V2U[node]
         node_weight = self.weight_type()
         for neighbor in neighbors:
@@ -183,6 +422,8 @@ class Bigraph(SimplePicklableMixin):
         return node_weight
 
     def get_unode_weight(self, node):
+        if self._node_degrees and 'U' in self._node_degrees:
+            return self._node_degrees['U'][1].get(node, self.weight_type())
         neighbors = self.U2V[node]
         node_weight = self.weight_type()
         for neighbor in neighbors:
@@ -190,23 +431,90 @@ class Bigraph(SimplePicklableMixin):
             node_weight += self.edges[edge]
         return node_weight
 
+    def _count_degrees(self, side):
+        """Degrees and weighted degrees of nodes on one side, in one pass over edges
+        """
+        if side == 'U':
+            adjacency, end = self.U2V, 0
+        elif side == 'V':
+            adjacency, end = self.V2U, 1
+        else:
+            raise ValueError("Unknown side %r" % (side,))
+        weights = defaultdict(self.weight_type)
+        for edge, weight in self.iter_edge_weights():
+            weights[edge[end]] += weight
+        return dict((node, len(neighbors)) for node, neighbors in adjacency.iteritems()), weights
+
+    def _side_degrees(self, side):
+        """Degrees and weighted degrees of nodes on one side, kept until edges change
+        """
+        tables = self._node_degrees
+        if tables is None:
+            tables = self._node_degrees = {}
+        degrees = tables.get(side)
+        if degrees is None:
+            degrees = tables[side] = self._count_degrees(side)
+        return degrees
+
+    def get_node_degrees(self, side='V', nodes=None):
+        """Degrees and weighted degrees of all nodes in U or V (or of given ones)
+
+        Returns a list of nodes and parallel lists of their degrees and
+        weighted degrees (zero for unknown nodes). Results are computed in
+        one pass over edges and cached until edges change, so that ranking
+        all nodes does not take a lookup per edge per node::
+
+            >>> g = Bigraph.from_edgelist([(1, -1, 2), (1, -2, 3), (2, -2, 1)])
+            >>> nodes, degrees, weights = g.get_node_degrees('U')
+            >>> sorted(zip(nodes, degrees, weights))
+            [(1, 2, 5), (2, 1, 1)]
+            >>> g.get_node_degrees('V', nodes=[-2, -5])
+            ([-2, -5], [2, 0], [4, 0])
+        """
+        degrees, weights = self._side_degrees(side)
+        if nodes is None:
+            nodes = list(degrees)
+        else:
+            nodes = list(nodes)
+        zero = self.weight_type()
+        return (nodes, [degrees.get(node, 0) for node in nodes],
+                [weights.get(node, zero) for node in nodes])
+
+    def get_top_nodes(self, k, side='V', by='weight'):
+        """Nodes in U or V with the ``k`` largest weighted degrees (or degrees)
+
+        Returns a list of pairs of nodes and weighted degrees (or degrees),
+        largest first::
+
+            >>> g = Bigraph.from_edgelist([(1, -1, 2), (1, -2, 3), (2, -2, 1)])
+            >>> g.get_top_nodes(1, 'U'), g.get_top_nodes(1, 'V', by='degree')
+            ([(1, 5)], [(-2, 2)])
+        """
+        degrees, weights = self._side_degrees(side)
+        if by == 'weight':
+            values = weights
+        elif by == 'degree':
+            values = degrees
+        else:
+            raise ValueError("Nodes are ranked either by 'weight' or by 'degree'")
+        return heapq.nlargest(k, values.iteritems(), key=itemgetter(1))
+
     def __and__(self, other):
         '''Get intersection of edges of two graphs
 
         This operation chooses the minimum edge weight and is commutative
         '''
-        g = self.__class__()  # create another instance of this class
-        dict1, dict2 = self.edges, other.edges
-        edge_intersection = set(dict1.keys()) & set(dict2.keys())
-        # compile edges into dicts and store weights
+        g = self._new_graph(weight_type=self.weight_type)
+        # probe the larger edge mapping with edges of the smaller one
+        smaller, larger = (self, other) if len(self) <= len(other) else (other, self)
+        larger_edges = larger.edges
         g_map_edge = g.map_edge
         g_store_weight = g.store_weight
-        this_zero = self.weight_type()
-        other_zero = other.weight_type()
-        for e in edge_intersection:
-            g_map_edge(e)
-            val = min(dict1.get(e, this_zero), dict2.get(e, other_zero))
-            g_store_weight(e, val)
+        for e, weight in smaller.iter_edge_weights():
+            other_weight = larger_edges.get(e)
+            if other_weight is not None:
+                g_map_edge(e)
+                g_store_weight(e, min(weight, other_weight))
         return g
 
     def __or__(self, other):
@@ -214,37 +522,92 @@ class Bigraph(SimplePicklableMixin):
 
         This operation involves summing edge weights and is commutative
         '''
-        g = self.__class__()
-        dict1, dict2 = self.edges, other.edges
-        edge_union = set(dict1.keys()) | set(dict2.keys())
-        # compile edges into dicts and store weights
-        g_map_edge = g.map_edge
-        g_store_weight = g.store_weight
-        this_zero = self.weight_type()
-        other_zero = other.weight_type()
-        for e in edge_union:
-            g_map_edge(e)
-            val = dict1.get(e, this_zero) + dict2.get(e, other_zero)
-            g_store_weight(e, val)
+        g = self._new_graph(weight_type=self.weight_type)
+        g |= self
+        g |= other
         return g
 
     def __sub__(self, other):
         '''Get difference of edges of two graphs (noncommutative)
         '''
-        g = self.__class__()  # create another instance of this class
-        dict1, dict2 = self.edges, other.edges
-        edge_difference = set(dict1.keys()) - set(dict2.keys())
-        # hash edges into dicts and store weights
+        g = self._new_graph(weight_type=self.weight_type)
+        other_edges = other.edges
         g_map_edge = g.map_edge
         g_store_weight = g.store_weight
-        for e in edge_difference:
-            g_map_edge(e)
-            g_store_weight(e, dict1[e])
+        for e, weight in self.iter_edge_weights():
+            if e not in other_edges:
+                g_map_edge(e)
+                g_store_weight(e, weight)
         return g
 
+    def __iand__(self, other):
+        '''Keep only edges shared with another graph, with minimum weights
+
+        Nodes left without edges are removed::
+
+            >>> g = Bigraph.from_edgelist([(1, -1, 3), (1, -2, 1), (2, -2, 2)])
+            >>> g &= Bigraph.from_edgelist([(1, -1, 2), (2, -2, 5), (3, -3, 1)])
+            >>> sorted(g.iter_edge_weights()), sorted(g.U)
+            ([((1, -1), 2), ((2, -2), 2)], [1, 2])
+        '''
+        edges, other_edges = self.edges, other.edges
+        dropped = []
+        for e, weight in edges.iteritems():
+            other_weight = other_edges.get(e)
+            if other_weight is None:
+                dropped.append(e)
+            elif other_weight < weight:
+                edges[e] = other_weight
+                self._node_degrees = None
+        for e in dropped:
+            self._discard_edge(e)
+        return self
+
+    def __ior__(self, other):
+        '''Add edges of another graph, summing weights of shared edges
+        '''
+        map_edge = self.map_edge
+        store_weight = self.store_weight
+        for e, weight in other.iter_edge_weights():
+            map_edge(e)
+            store_weight(e, weight)
+        return self
+
+    def __isub__(self, other):
+        '''Remove edges found in another graph
+
+        Nodes left without edges are removed
+        '''
+        edges = self.edges
+        if len(other) < len(self):
+            dropped = [e for e in other.iter_edges() if e in edges]
+        else:
+            other_edges = other.edges
+            dropped = [e for e in edges.iterkeys() if e in other_edges]
+        for e in dropped:
+            self._discard_edge(e)
+        return self
+
+    def _discard_edge(self, edge):
+        """Remove an existing edge and any nodes left without neighbors
+        """
+        # union-find cannot split sets, so it is rebuilt when next needed
+        self._components = None
+        self._node_degrees = None
+        del self.edges[edge]
+        u, v = edge
+        for adjacency, node, neighbor in [(self.U2V, u, v), (self.V2U, v, u)]:
+            neighbors = adjacency[node]
+            neighbors.discard(neighbor)
+            if not neighbors:
+                del adjacency[node]
+
     def get_dot(self, name="bipartite graph", bipartite=True, unode_decorator=None,
                 vnode_decorator=None, edge_decorator=None, **kwargs):
         """Get a Graphviz representation
+
+        This builds the whole graph in memory; see ``write_dot`` for a way to
+        write large graphs to files
         """
         import pygraphviz as pgv
         if unode_decorator is None:
@@ -269,14 +632,240 @@ class Bigraph(SimplePicklableMixin):
             g.add_edge(*edge, **attrs)
         return g
 
+    def _written_edges(self, max_edges):
+        """Edges with weights to write, or the heaviest ``max_edges`` of them
+        """
+        if max_edges is None:
+            return self.iter_edge_weights()
+        return heapq.nlargest(max_edges, self.iter_edge_weights(), key=itemgetter(1))
+
+    def _written_nodes(self, edges):
+        """Names of sides and nodes on them to write, given written edges
+
+        Unless edges are capped (and given as a list), all nodes are written
+        """
+        if not isinstance(edges, list):
+            return [('U', self.U), ('V', self.V)]
+        return [('U', set(u for (u, _), _ in edges)),
+                ('V', set(v for (_, v), _ in edges))]
+
+    def write_dot(self, output, name="bipartite graph", bipartite=True,
+                  unode_decorator=None, vnode_decorator=None, edge_decorator=None,
+                  max_edges=None, **kwargs):
+        """Write a Graphviz (DOT) representation in a single pass
+
+        Works like ``get_dot`` but needs no pygraphviz and writes nodes and
+        edges directly to ``output``, a file handle or a path (opened with
+        ``pymaptools.io.open_gz``, so that files ending in ``.gz`` or ``.bz2``
+        are compressed). Keyword arguments become graph attributes. With
+        ``max_edges``, only the heaviest edges and their nodes are written::
+
+            >>> import sys
+            >>> g = Bigraph.from_edgelist([(1, -1, 5), (2, -1, 1), (2, -2, 3)])
+            >>> g.write_dot(sys.stdout, max_edges=2, rankdir="LR",
+            ...             edge_decorator=lambda g, u, v, w: ((u, v), {'label': w}))
+            graph "bipartite graph" {
+                rankdir="LR";
+                subgraph "cluster_U" {
+                    style="dotted";
+                    "1";
+                    "2";
+                }
+                subgraph "cluster_V" {
+                    style="dotted";
+                    "-2";
+                    "-1";
+                }
+                "1" -- "-1" [label="5"];
+                "2" -- "-2" [label="3"];
+            }
+        """
+        decorators = {'U': unode_decorator, 'V': vnode_decorator}
+        edges = self._written_edges(max_edges)
+        cluster_prefix = 'cluster_' if bipartite else ''
+        # node names repeat across edges, so each is quoted and encoded once
+        ids = _QuoteCache(lambda node: _encode(_dot_id(node)))
+        with _output_handle(output) as handle:
+            write = handle.write
+            write(_encode(u'graph %s {\n' % _dot_id(name)))
+            for key, value in sorted(kwargs.iteritems()):
+                write(_encode(u'    %s=%s;\n' % (key, _dot_id(value))))
+            nested = not isinstance(self, Graph)
+            indent = '        ' if nested else '    '
+            for side, nodes in self._written_nodes(edges):
+                if nested:
+                    write(_encode(u'    subgraph %s {\n        style="dotted";\n'
+                                  % _dot_id(cluster_prefix + side)))
+                decorator = decorators[side]
+                for node in sorted(nodes):
+                    if decorator is None:
+                        write('%s%s;\n' % (indent, ids[node]))
+                    else:
+                        node_name, attrs = decorator(self, node)
+                        write('%s%s%s;\n' % (indent, ids[node_name], _encode(_dot_attrs(attrs))))
+                if nested:
+                    write('    }\n')
+            for (u, v), weight in edges:
+                if edge_decorator is None:
+                    write('    %s -- %s;\n' % (ids[u], ids[v]))
+                else:
+                    (u, v), attrs = edge_decorator(self, u, v, weight)
+                    write('    %s -- %s%s;\n' % (ids[u], ids[v], _encode(_dot_attrs(attrs))))
+            write('}\n')
+
+    def write_graphml(self, output, name="G", unode_decorator=None, vnode_decorator=None,
+                      edge_decorator=None, node_keys=(), edge_keys=(), max_edges=None):
+        """Write a GraphML representation in a single pass
+
+        Output and decorators work as in ``write_dot``. Edges carry their
+        weights, nodes of bipartite graphs carry the index of their side as
+        ``bipartite`` (0 for U and 1 for V). Since keys must be declared
+        before the graph, names of other attributes returned by decorators
+        have to be listed in ``node_keys`` and ``edge_keys`` (their values
+        are written as strings)::
+
+            >>> import sys
+            >>> g = Graph.from_edgelist([('a', 'b', 2)])
+            >>> g.write_graphml(sys.stdout, node_keys=['color'],
+            ...                 vnode_decorator=lambda g, v: (v, {'color': 'red'}))
+            <?xml version="1.0" encoding="UTF-8"?>
+            <graphml xmlns="http://graphml.graphdrawing.org/xmlns">
+              <key id="d0" for="edge" attr.name="weight" attr.type="long"/>
+              <key id="d1" for="node" attr.name="color" attr.type="string"/>
+              <graph id="G" edgedefault="undirected">
+                <node id="a"><data key="d1">red</data></node>
+                <node id="b"><data key="d1">red</data></node>
+                <edge source="a" target="b"><data key="d0">2</data></edge>
+              </graph>
+            </graphml>
+        """
+        decorators = {'U': unode_decorator, 'V': vnode_decorator}
+        bipartite = not isinstance(self, Graph)
+        weight_type = {int: 'long', long: 'long', float: 'double'}.get(self.weight_type, 'string')
+        declared = [('edge', 'weight', weight_type)]
+        if bipartite:
+            declared.append(('node', 'bipartite', 'int'))
+        declared.extend(('node', key, 'string') for key in node_keys)
+        declared.extend(('edge', key, 'string') for key in edge_keys)
+        key_ids = dict(((domain, key), 'd%d' % idx)
+                       for idx, (domain, key, _) in enumerate(declared))
+
+        def data(domain, attrs):
+            items = []
+            for key, value in sorted(attrs.iteritems()):
+                key_id = key_ids.get((domain, key))
+                if key_id is None:
+                    raise ValueError("Undeclared GraphML %s attribute: %r" % (domain, key))
+                items.append(u'<data key="%s">%s</data>' % (key_id, escape(unicode(value))))
+            return _encode(u''.join(items))
+
+        # repr keeps all digits of floats
+        format_weight = repr if self.weight_type is float else \
+            (lambda weight: _encode(escape(unicode(weight))))
+        ids = _QuoteCache(lambda node: _encode(quoteattr(unicode(node))))
+        edges = self._written_edges(max_edges)
+        with _output_handle(output) as handle:
+            write = handle.write
+            write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                  '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+            for domain, key, attr_type in declared:
+                write(_encode(u'  <key id="%s" for="%s" attr.name=%s attr.type="%s"/>\n'
+                              % (key_ids[domain, key], domain, quoteattr(key), attr_type)))
+            write(_encode(u'  <graph id=%s edgedefault="undirected">\n'
+                          % quoteattr(unicode(name))))
+            for side_idx, (side, nodes) in enumerate(self._written_nodes(edges)):
+                decorator = decorators[side]
+                side_data = '<data key="d1">%d</data>' % side_idx if bipartite else ''
+                for node in sorted(nodes):
+                    if decorator is None:
+                        write('    <node id=%s>%s</node>\n' % (ids[node], side_data))
+                    else:
+                        node_name, attrs = decorator(self, node)
+                        if bipartite:
+                            attrs = dict(attrs, bipartite=side_idx)
+                        write('    <node id=%s>%s</node>\n' % (ids[node_name], data('node', attrs)))
+            for (u, v), weight in edges:
+                extra = ''
+                if edge_decorator is not None:
+                    (u, v), attrs = edge_decorator(self, u, v, weight)
+                    extra = data('edge', attrs)
+                write('    <edge source=%s target=%s><data key="d0">%s</data>%s</edge>\n'
+                      % (ids[u], ids[v], format_weight(weight), extra))
+            write('  </graph>\n</graphml>\n')
+
+    def write_binary_edgelist(self, output, max_edges=None):
+        """Write edges between integer nodes as fixed-size binary records
+
+        The file starts with ``EDGELIST_HEADER`` (holding ``EDGELIST_MAGIC``,
+        a format version and the type code of weights), followed by one
+        record per edge of two little-endian 64-bit node ids and a 64-bit
+        integer or float weight. Output works as in ``write_dot``; see
+        ``from_binary_edgelist`` for reading
+        """
+        weight_code = EDGELIST_WEIGHT_CODES.get(self.weight_type)
+        if weight_code is None:
+            raise ValueError("Cannot write %s weights" % self.weight_type)
+        record = struct.Struct('<qq' + weight_code)
+        pack = record.pack
+        with _output_handle(output) as handle:
+            handle.write(EDGELIST_HEADER.pack(EDGELIST_MAGIC, 1, weight_code))
+            chunk = []
+            for (u, v), weight in self._written_edges(max_edges):
+                try:
+                    chunk.append(pack(u, v, weight))
+                except struct.error:
+                    raise ValueError("Cannot write edge %r: nodes must be integers"
+                                     % ((u, v),))
+                if len(chunk) >= 4096:
+                    handle.write(''.join(chunk))
+                    del chunk[:]
+            handle.write(''.join(chunk))
+
+    @classmethod
+    def from_binary_edgelist(cls, path):
+        """Construct a graph from a file written by ``write_binary_edgelist``
+
+        ::
+
+            >>> import os, shutil, tempfile
+            >>> dirname = tempfile.mkdtemp()
+            >>> path = os.path.join(dirname, 'edges.bin.gz')
+            >>> g = Graph.from_edgelist([(1, 2, 3), (2, 5, 1)])
+            >>> g.write_binary_edgelist(path)
+            >>> Graph.from_binary_edgelist(path) == g
+            True
+            >>> shutil.rmtree(dirname)
+        """
+        with open_gz(path, 'rb') as handle:
+            weight_type, weight_code = _read_edgelist_header(handle)
+            record = struct.Struct('<qq' + weight_code)
+            graph = cls(weight_type=weight_type)
+            add_edge = graph.add_edge
+            size = record.size
+            unpack_from = record.unpack_from
+            while True:
+                chunk = handle.read(size * 4096)
+                if len(chunk) % size:
+                    raise ValueError("Truncated binary edge list")
+                if not chunk:
+                    break
+                for offset in xrange(0, len(chunk), size):
+                    add_edge(*unpack_from(chunk, offset))
+        return graph
+
     def map_edge(self, edge):
         u, v = edge
         if u is None or v is None:
             raise ValueError("An edge must connect two nodes")
+        self._node_degrees = None
         self.U2V[u].add(v)
         self.V2U[v].add(u)
+        components = self._components
+        if components is not None:
+            components.union(self._component_key(u, 'U'), self._component_key(v, 'V'))
 
     def store_weight(self, edge, weight):
+        self._node_degrees = None
         self.edges[edge] += weight
 
     def add_clique(self, clique, weight=1):
@@ -338,6 +927,131 @@ class Bigraph(SimplePicklableMixin):
         else:
             return None
 
+    def prune(self, min_edge_weight=None, min_degree=None):
+        """Return a subgraph without light edges and low-degree nodes
+
+        Edges lighter than ``min_edge_weight`` are dropped first. Then nodes
+        with fewer than ``min_degree`` neighbors are removed repeatedly, which
+        leaves the k-core of the graph for ``min_degree=k``. For bipartite
+        graphs, ``min_degree`` can also be a pair of separate bounds for nodes
+        in U and in V. Unlike ``Bigraph(base, min_edge_weight=...)``, weights
+        are shared rather than copied and edges are not added one by one::
+
+            >>> g = Bigraph.from_edgelist([(1, -1, 2), (1, -2, 5), (2, -2, 5), (3, -3, 9)])
+            >>> sorted(g.prune(min_edge_weight=5).iter_edge_weights())
+            [((1, -2), 5), ((2, -2), 5), ((3, -3), 9)]
+            >>> sorted(g.prune(min_degree=(1, 2)).iter_edges())
+            [(1, -2), (2, -2)]
+        """
+        loops = self.U2V is self.V2U
+        min_udegree, min_vdegree = _degree_bounds(min_degree)
+        edges = self.edges
+        if min_edge_weight is None:
+            u2v = dict((u, set(vs)) for u, vs in self.U2V.iteritems())
+            v2u = u2v if loops else dict((v, set(us)) for v, us in self.V2U.iteritems())
+        else:
+            u2v = defaultdict(set)
+            v2u = u2v if loops else defaultdict(set)
+            for (u, v), weight in edges.iteritems():
+                if weight >= min_edge_weight:
+                    u2v[u].add(v)
+                    v2u[v].add(u)
+        if min_udegree > 0 or min_vdegree > 0:
+            _peel_nodes(u2v, v2u, min_udegree, min_vdegree)
+        result = self._new_graph(weight_type=self.weight_type)
+        result.U2V = defaultdict(set, u2v)
+        result.V2U = result.U2V if loops else defaultdict(set, v2u)
+        result.edges = defaultdict(self.weight_type, (
+            (edge, weight) for edge, weight in edges.iteritems()
+            if edge[1] in u2v.get(edge[0], ())))
+        return result
+
+    def _component_key(self, node, side):
+        if side == 'U':
+            return (0, node)
+        elif side == 'V':
+            return (1, node)
+        raise ValueError("Side must be either 'U' or 'V'")
+
+    def _tracked_component(self, node, side):
+        """Union-find over nodes and the key of a node in it
+        """
+        if not self.track_components:
+            raise ValueError("Components are only tracked with track_components=True")
+        components = self._components
+        if components is None:
+            # first use on a copied graph or after edges were removed
+            components = UnionFind()
+            key = self._component_key
+            for u, v in self.iter_edges():
+                components.union(key(u, 'U'), key(v, 'V'))
+            self._components = components
+        key = self._component_key(node, side)
+        if key not in components:
+            raise KeyError(node)
+        return components, key
+
+    def get_component_id(self, node, side='V'):
+        """Id of the connected component of a node in U or V
+
+        Requires ``track_components=True``. Ids are representative members
+        of components and stay the same until components are merged.
+        Lookups take nearly constant time, except for the first one after
+        edges have been removed, which rebuilds the union-find::
+
+            >>> g = Bigraph(track_components=True)
+            >>> g.add_edge(1, -1)
+            >>> g.add_edge(2, -2)
+            >>> g.get_component_id(1, 'U') == g.get_component_id(-1)
+            True
+            >>> g.add_clique(([1, 2], [-3]))
+            >>> g.get_component_size(-2)
+            5
+            >>> [sorted(nodes) for nodes in g.get_component_members(-3)]
+            [[1, 2], [-3, -2, -1]]
+        """
+        components, key = self._tracked_component(node, side)
+        return components[key]
+
+    def get_component_size(self, node, side='V'):
+        """Number of nodes in the connected component of a node
+        """
+        components, key = self._tracked_component(node, side)
+        return components.size(key)
+
+    def get_component_members(self, node, side='V'):
+        """Nodes in U and in V of the connected component of a node
+
+        Takes time proportional to the size of the component
+        """
+        components, key = self._tracked_component(node, side)
+        members = ([], [])
+        for idx, member in components.members(key):
+            members[idx].append(member)
+        return members
+
+    def project(self, side='U', **kwargs):
+        """One-mode projection onto nodes in U (or V, with ``side='V'``)
+
+        Nodes are linked by the number of neighbors they share. The projection
+        is computed as a sparse matrix product with ``CSRBigraph.project``
+        (which requires SciPy and lists the options) and returned as a
+        ``Graph``::
+
+            >>> g = Bigraph.from_edgelist([(1, -1), (2, -1), (2, -2), (3, -2)])
+            >>> sorted(g.project().iter_edge_weights())
+            [((1, 2), 1), ((2, 3), 1)]
+            >>> sorted(g.project('V', normalize='cosine').iter_edge_weights())
+            [((-2, -1), 0.5)]
+        """
+        from pymaptools.csrgraph import CSRBigraph
+        projected = CSRBigraph(self, weight_type=self.weight_type).project(side, **kwargs)
+        graph = Graph(weight_type=projected.weight_type)
+        add_edge = graph.add_edge
+        for (u, v), weight in projected.iter_edge_weights():
+            add_edge(u, v, weight)
+        return graph
+
     def find_connected_components(self):
         """Return all connected components as a list of sets
         """
@@ -356,7 +1070,7 @@ class Bigraph(SimplePicklableMixin):
             (lambda x, y: (y, x))
         )
         while remaining:
-            component = self.__class__()
+            component = self._new_graph()
             # pick a vertex at random and add it to the stack
             stack.append(remaining.pop())
             while stack:
@@ -382,12 +1096,50 @@ class Bigraph(SimplePicklableMixin):
             # stack is empty: done with one component
             yield component
 
-    def find_cliques(self, L=None, P=None):
+    def label_components(self):
+        """Find connected components without building component subgraphs
+
+        Returns a ``ComponentLabels`` instance mapping nodes to component ids::
+
+            >>> g = Bigraph.from_edgelist([(1, -1), (2, -2), (2, -1), (3, -3)])
+            >>> components = g.label_components()
+            >>> len(components)
+            2
+            >>> components.unode_labels[1] == components.vnode_labels[-2]
+            True
+        """
+        unodes = list(self.U)
+        vnodes = list(self.V)
+        num_unodes = len(unodes)
+        uids = dict(izip(unodes, xrange(num_unodes)))
+        vids = dict(izip(vnodes, xrange(num_unodes, num_unodes + len(vnodes))))
+        labels = label_disjoint_sets(num_unodes + len(vnodes),
+                                     ((uids[u], vids[v]) for u, v in self.iter_edges()))
+        return ComponentLabels(self, dict(izip(unodes, labels[:num_unodes])),
+                               dict(izip(vnodes, labels[num_unodes:])),
+                               max(labels) + 1 if labels else 0)
+
+    def _component_subgraph(self, components, component_id):
+        unodes, _ = components.get_members(component_id)
+        component = self._new_graph()
+        u2v, edges = self.U2V, self.edges
+        for u in unodes:
+            for v in u2v[u]:
+                component.add_edge(u, v, edges[(u, v)])
+        return component
+
+    def find_cliques(self, L=None, P=None, kernel='sets'):
         '''Find cliques (maximally connected components)
 
         Enumerate all maximal bicliques in an undirected bipartite graph.
         Adapted from [1]_.
 
+        With ``kernel='bitset'``, the search starts from each vertex of ``P``
+        in turn, and sets of vertices in U are stored as bits of integers over
+        the neighbors of the starting vertex, so that intersections and
+        subset tests take a few word operations. This is usually faster on
+        dense graphs. The default ``kernel='sets'`` uses Python sets.
+
         Terminology of variables and parameters:
 
         = ===============================================================
@@ -406,56 +1158,62 @@ class Bigraph(SimplePicklableMixin):
                HICSS (p. 473). IEEE.
                <http://dx.doi.org/10.1109/HICSS.2008.507>`_
         '''
-        v2u = self.V2U
+        _check_kernel(kernel)
+        L = set(self.U) if L is None else set(L)
+        P = list(self.V) if P is None else list(P)
+        return _enumerate_bicliques(self.U2V, self.V2U, L, P, kernel)
+
+    def find_cliques_parallel(self, L=None, P=None, n_jobs=-1, ordered=False,
+                              max_task_size=None, kernel='sets'):
+        """Find maximal bicliques using a pool of processes
+
+        Connected components are searched independently, and components with
+        more than ``max_task_size`` nodes in ``P`` are further split into
+        subproblems rooted at individual nodes. By default, tasks are sized
+        so that there are at least four per worker. Bicliques are yielded as
+        tasks complete, or in the order of components if ``ordered`` is set.
+        Negative ``n_jobs`` values follow ``joblib`` convention (-1 means all
+        CPUs). ``kernel`` is as in ``find_cliques``::
+
+            >>> g = Bigraph()
+            >>> g.add_clique(([1, 2, 3], [-1, -2, -3]))
+            >>> g.add_clique(([4], [-4, -5]))
+            >>> g.add_edge(4, -1)
+            >>> found = g.find_cliques_parallel(n_jobs=2, max_task_size=1)
+            >>> sorted((sorted(L), sorted(R)) for L, R in found)
+            [([1, 2, 3], [-3, -2, -1]), ([1, 2, 3, 4], [-1]), ([4], [-5, -4, -1])]
+        """
+        _check_kernel(kernel)
+        state, sizes = self._clique_tasks_state(L, P)
+        state['kernel'] = kernel
+        return _find_cliques_parallel(state, sizes, n_jobs, ordered, max_task_size)
+
+    def _clique_tasks_state(self, L, P):
+        """Adjacency and per-component search sets for parallel enumeration
+        """
+        components = self.label_components()
+        vnode_labels = components.vnode_labels
         L = set(self.U) if L is None else set(L)
         P = list(self.V) if P is None else list(P)
-        stack = [(L, set(), P, set())]
-        while stack:
-            L, R, P, Q = stack.pop()
-            while P:
-                x = P.pop()
-                # extend biclique
-                R_prime = R | {x}
-                L_prime = v2u[x] & L
-                # create new sets
-                P_prime = []
-                Q_prime = set()
-                # check maximality
-                is_maximal = True
-                for v in Q:
-                    # checks whether L_prime is a subset of all adjacent nodes
-                    # of v in Q
-                    Nv = v2u[v] & L_prime
-                    if len(Nv) == len(L_prime):
-                        is_maximal = False
-                        break
-                    elif Nv:
-                        # some vertices in L_prime are not adjacent to v:
-                        # keep vertices adjacent to some vertex in L_prime
-                        Q_prime.add(v)
-                if is_maximal:
-                    for v in P:
-                        # get the neighbors of v in L_prime
-                        Nv = v2u[v] & L_prime
-                        if len(Nv) == len(L_prime):
-                            R_prime.add(v)
-                        elif Nv:
-                            # some vertices in L_prime are not adjacent to v:
-                            # keep vertices adjacent to some vertex in L_prime
-                            P_prime.append(v)
-                    yield (L_prime, R_prime)  # report maximal biclique
-                    if P_prime:
-                        stack.append((L_prime, R_prime, P_prime, Q_prime))
-                # move x to former candidate set
-                Q.add(x)
+        searched = [([], []) for _ in xrange(len(components))]
+        for u, label in components.unode_labels.iteritems():
+            if u in L:
+                searched[label][0].append(u)
+        for v in P:
+            label = vnode_labels.get(v)
+            if label is not None:
+                searched[label][1].append(v)
+        state = dict(bipartite=True, u2v=self.U2V, v2u=self.V2U,
+                     components=searched)
+        return state, [len(P_c) for _, P_c in searched]
 
 
 class Graph(Bigraph):
     """
     undirected graph G = (V, E).
     """
-    def __init__(self, base=None, weight_type=int):
-        super(Graph, self).__init__()
+    def __init__(self, base=None, weight_type=int, track_components=False):
+        super(Graph, self).__init__(track_components=track_components)
         self.weight_type = weight_type
         if base is None:
             # creating from scratch
@@ -476,22 +1234,52 @@ class Graph(Bigraph):
             self.edges = edge_map
         else:
             raise TypeError("Base object has incorrect type")
+        if base is not None:
+            # built from edges of the base graph on first use
+            self._components = None
 
     def rename_nodes(self, vnode_renamer=None, **kwargs):
         """Factory method that produces another graph just like current one
         except with renamed nodes (can be used for reducing a graph)
         """
-        new_graph = self.__class__()
+        new_graph = self._new_graph()
         for (u, v), weight in self.iter_edge_weights():
             u = vnode_renamer(u)
             v = vnode_renamer(v)
             new_graph.add_edge(u, v, weight)
         return new_graph
 
+    def contract(self, vnode_groups=None, reduce='sum'):
+        """Contract nodes into groups, merging edges between the same groups
+
+        Works like ``Bigraph.contract``; edges within groups become loops::
+
+            >>> g = Graph.from_edgelist([(1, 2, 2), (2, 3, 1), (3, 4, 4)])
+            >>> sorted(g.contract({1: 'a', 2: 'a', 3: 'b'}).iter_edge_weights())
+            [(('a', 'a'), 2), (('a', 'b'), 1)]
+        """
+        return self._contract(vnode_groups, vnode_groups, reduce)
+
     def store_weight_sorted(self, edge, weight):
         # Storing weights is antisymmetric -- order the tuple
+        self._node_degrees = None
         self.edges[self.make_edge(*edge)] += weight
 
+    @classmethod
+    def _array_class(cls):
+        from pymaptools.csrgraph import CSRGraph
+        return CSRGraph
+
+    def _count_degrees(self, side):
+        if side != 'V':
+            raise ValueError("Unknown side %r" % (side,))
+        weights = defaultdict(self.weight_type)
+        for (u, v), weight in self.iter_edge_weights():
+            weights[u] += weight
+            if u != v:
+                weights[v] += weight
+        return dict((v, len(us)) for v, us in self.V2U.iteritems()), weights
+
     @property
     def U(self):
         raise NotImplementedError("Set U is only for a bipartite graph")
@@ -521,24 +1309,52 @@ class Graph(Bigraph):
     def make_edge(u, v):
         return tuple(sorted((u, v)))
 
+    def _component_key(self, node, side):
+        return node
+
+    def _written_nodes(self, edges):
+        if not isinstance(edges, list):
+            return [('V', self.V)]
+        return [('V', set(chain.from_iterable(edge for edge, _ in edges)))]
+
+    def get_component_members(self, node, side='V'):
+        """List of nodes in the connected component of a node
+
+        Requires ``track_components=True`` (see ``Bigraph.get_component_id``)
+        and takes time proportional to the size of the component::
+
+            >>> g = Graph(track_components=True)
+            >>> g.add_edge(1, 2)
+            >>> g.add_edge(3, 4)
+            >>> g.get_component_id(1) == g.get_component_id(4)
+            False
+            >>> g.add_edge(2, 3)
+            >>> g.get_component_size(4), sorted(g.get_component_members(1))
+            (4, [1, 2, 3, 4])
+        """
+        components, key = self._tracked_component(node, side)
+        return components.members(key)
+
     def find_connected_components(self):
         """Return all connected components as a list of sets
         """
         stack = []
         # create a modifiable copy of the set of all vertices
         remaining = set(self.V)
-        v2u = self.V2U
+        v2u, edges, make_edge = self.V2U, self.edges, self.make_edge
         while remaining:
             # pick a vertex at random and add it to the stack
-            component = self.__class__()
+            component = self._new_graph()
             stack.append(remaining.pop())
             while stack:
                 # pick an element from the stack and add it to the current component
                 v = stack.pop()
                 # expand stack to all unvisited neighbors of the element
                 for u in v2u[v]:
-                    edge_weight = self.edges[(u, v)]
-                    component.add_edge(u, v, edge_weight)
+                    edge = make_edge(u, v)
+                    # each edge is reached from both of its nodes
+                    if edge[0] == v:
+                        component.add_edge(u, v, edges[edge])
                     try:
                         remaining.remove(u)
                     except KeyError:
@@ -550,6 +1366,42 @@ class Graph(Bigraph):
             # stack is empty: done with one component
             yield component
 
+    def label_components(self):
+        """Find connected components without building component subgraphs
+        """
+        nodes = list(self.V)
+        ids = dict(izip(nodes, xrange(len(nodes))))
+        labels = label_disjoint_sets(len(nodes),
+                                     ((ids[u], ids[v]) for u, v in self.iter_edges()))
+        node_labels = dict(izip(nodes, labels))
+        return ComponentLabels(self, node_labels, node_labels,
+                               max(labels) + 1 if labels else 0)
+
+    def _component_subgraph(self, components, component_id):
+        _, nodes = components.get_members(component_id)
+        component = self._new_graph()
+        v2u, edges, make_edge = self.V2U, self.edges, self.make_edge
+        for v in nodes:
+            for u in v2u[v]:
+                edge = make_edge(u, v)
+                # each edge is reached from both of its nodes
+                if edge[0] == v:
+                    component.add_edge(u, v, edges[edge])
+        return component
+
+    def get_core_numbers(self):
+        """Return a dict of core numbers of nodes
+
+        The core number of a node is the largest ``k`` such that the node
+        belongs to the k-core (see ``prune``)::
+
+            >>> g = Graph.from_edgelist([(1, 2), (2, 3), (3, 1), (3, 4)])
+            >>> sorted(g.get_core_numbers().items())
+            [(1, 2), (2, 2), (3, 2), (4, 1)]
+        """
+        _, cores = _degeneracy_ordering(self.V2U, self.V)
+        return cores
+
     def get_dot(self, name="graph", edge_decorator=None, vnode_decorator=None,
                 **kwargs):
         import pygraphviz as pgv
@@ -567,10 +1419,13 @@ class Graph(Bigraph):
             g.add_edge(*edge, **attrs)
         return g
 
-    def find_cliques(self, nodes=None, min_clique_size=3):
+    def find_cliques(self, nodes=None, min_clique_size=3, kernel='sets'):
         '''Return maximal cliques in a graph
 
-        Implements Bron-Kerbosch algorithm [1]_.
+        Implements Bron-Kerbosch algorithm [1]_. With ``kernel='bitset'``,
+        the search starts from each node in turn, with neighbors of the
+        starting node relabeled to bits of integers (see also
+        ``Bigraph.find_cliques``).
 
         .. codeauthor:: Oleksii Kuchaiev
         .. codeauthor:: Eugene Scherba
@@ -581,46 +1436,1077 @@ class Graph(Bigraph):
         .. [1] `Wikipedia entry for Bron-Kerbosch algorithm
                <https://en.wikipedia.org/wiki/Bron-Kerbosch_algorithm>`_
         '''
-        # subset to search
-        search_space = set(self.V) if nodes is None else set(nodes)
-        disc_num = len(search_space)
-        stack = [(set(), search_space, set(), None, disc_num)]
+        _check_kernel(kernel)
+        # subset to search: only nodes of the (min_clique_size - 1)-core can
+        # belong to cliques that are large enough
+        search_space = _core_nodes(self.V2U, self.V if nodes is None else nodes,
+                                   min_clique_size - 1)
+        return _enumerate_cliques(self.V2U, search_space, min_clique_size, kernel)
+
+    def find_cliques_parallel(self, nodes=None, min_clique_size=3, n_jobs=-1,
+                              ordered=False, max_task_size=None, kernel='sets'):
+        """Find maximal cliques using a pool of processes
+
+        Works as ``Bigraph.find_cliques_parallel``; nodes of components that
+        are split into rooted subproblems are ordered by degree, so that
+        high-degree nodes are searched from their lower-degree neighbors::
+
+            >>> g = Graph.from_edgelist([(1, 2), (2, 3), (1, 3), (3, 4), (4, 5), (5, 3)])
+            >>> found = g.find_cliques_parallel(n_jobs=2, max_task_size=2)
+            >>> sorted(sorted(clique) for clique in found)
+            [[1, 2, 3], [3, 4, 5]]
+        """
+        _check_kernel(kernel)
+        state, sizes = self._clique_tasks_state(nodes, min_clique_size)
+        state['kernel'] = kernel
+        return _find_cliques_parallel(state, sizes, n_jobs, ordered, max_task_size)
+
+    def _clique_tasks_state(self, nodes, min_clique_size):
+        components = self.label_components()
+        labels = components.vnode_labels
         v2u = self.V2U
-        while stack:
-            (c_compsub, c_candidates, c_not, c_nd, c_disc_num) = stack.pop()
-            if not c_candidates and not c_not and len(c_compsub) >= min_clique_size:
-                yield c_compsub
+        search_space = _core_nodes(v2u, self.V if nodes is None else nodes,
+                                   min_clique_size - 1)
+        searched = [[] for _ in xrange(len(components))]
+        for v in sorted(search_space, key=lambda node: len(v2u.get(node, ()))):
+            label = labels.get(v)
+            if label is not None:
+                searched[label].append(v)
+        state = dict(bipartite=False, u2v=v2u, v2u=v2u, components=searched,
+                     min_clique_size=min_clique_size)
+        return state, [len(component) for component in searched]
+
+    def find_cliques_degeneracy(self, nodes=None, min_clique_size=3,
+                                max_clique_size=None, max_results=None,
+                                time_budget=None, min_clique_weight=None,
+                                kernel='sets'):
+        """Return maximal cliques, searching from nodes in degeneracy order
+
+        Implements the algorithm of Eppstein, Loeffler and Strash [1]_: each
+        node is searched only together with its neighbors that come later in
+        degeneracy order (of which there are at most as many as the largest
+        core number), using Bron-Kerbosch search with Tomita pivoting. This
+        keeps large sparse graphs with a few dense cores tractable.
+
+        The search can be bounded. Only maximal cliques of at most
+        ``max_clique_size`` nodes are found, and branches that can only lead
+        to larger ones are pruned. At most ``max_results`` cliques are
+        returned. The search stops (logging a warning) when ``time_budget``
+        seconds elapse. Cliques with total edge weight below
+        ``min_clique_weight`` (see ``get_clique_weight``) are skipped.
+        ``kernel`` is as in ``find_cliques``::
+
+            >>> g = Graph()
+            >>> g.add_clique([1, 2, 3, 4])
+            >>> g.add_clique([4, 5, 6])
+            >>> g.add_edge(6, 7)
+            >>> sorted(sorted(c) for c in g.find_cliques_degeneracy(min_clique_size=2))
+            [[1, 2, 3, 4], [4, 5, 6], [6, 7]]
+            >>> sorted(sorted(c) for c in g.find_cliques_degeneracy(max_clique_size=3))
+            [[4, 5, 6]]
+
+        References
+        ----------
+
+        .. [1] `Eppstein, D., Loeffler, M., & Strash, D. (2010). Listing all
+               maximal cliques in sparse graphs in near-optimal time. In
+               ISAAC (pp. 403-414). Springer.
+               <http://arxiv.org/abs/1006.5440>`_
+        """
+        _check_kernel(kernel)
+        search_space = self.V if nodes is None else [v for v in set(nodes) if v in self.V2U]
+        cliques = _find_cliques_degeneracy(
+            self.V2U, search_space, min_clique_size, max_clique_size,
+            time_budget, kernel)
+        return _limit_cliques(cliques, self.get_clique_weight,
+                              min_clique_weight, max_results)
+
+    def get_clique_weight(self, clique):
+        """Total weight of edges among a set of nodes (including self-loops)
+
+        ::
+
+            >>> g = Graph.from_edgelist([(1, 2, 3), (2, 3, 1), (3, 1, 2), (3, 4, 5)])
+            >>> g.get_clique_weight([1, 2, 3])
+            6
+        """
+        edges = self.edges
+        make_edge = self.make_edge
+        nodes = list(clique)
+        weight = self.weight_type()
+        for idx, u in enumerate(nodes):
+            for v in nodes[idx:]:
+                weight += edges.get(make_edge(u, v), 0)
+        return weight
+
+
+class AdjacencyOverlay(Mapping):
+
+    """Mapping of nodes to neighbor sets layered over another such mapping
+
+    Neighbor sets of the base mapping are shared until a node is written to
+    through ``writable()`` or ``discard()``, at which point its set is copied
+    into the overlay. Nodes left without neighbors are dropped::
+
+        >>> base = {1: set([2]), 2: set([1])}
+        >>> adjacency = AdjacencyOverlay(base)
+        >>> adjacency.writable(3).add(4)
+        >>> adjacency.discard(1, 2)
+        >>> sorted(adjacency.iteritems()), base[1]
+        ([(2, set([1])), (3, set([4]))], set([2]))
+    """
+
+    def __init__(self, base):
+        self._base = base
+        self._local = {}
+        self._removed = set()
+        self._num_added = 0
+
+    def __getitem__(self, node):
+        neighbors = self._local.get(node)
+        if neighbors is not None:
+            return neighbors
+        if node in self._removed:
+            raise KeyError(node)
+        # avoid __getitem__ so that defaultdict bases are not extended
+        neighbors = self._base.get(node)
+        if neighbors is None:
+            raise KeyError(node)
+        return neighbors
+
+    def __contains__(self, node):
+        return node in self._local or \
+            (node not in self._removed and node in self._base)
+
+    def __iter__(self):
+        base, removed = self._base, self._removed
+        for node in base:
+            if node not in removed:
+                yield node
+        for node in self._local:
+            if node not in base:
+                yield node
+
+    def __len__(self):
+        return len(self._base) - len(self._removed) + self._num_added
+
+    def writable(self, node):
+        """Return a neighbor set of a node that can be modified in place
+        """
+        neighbors = self._local.get(node)
+        if neighbors is not None:
+            return neighbors
+        if node in self._removed:
+            self._removed.remove(node)
+            neighbors = set()
+        else:
+            neighbors = self._base.get(node)
+            if neighbors is None:
+                self._num_added += 1
+                neighbors = set()
+            else:
+                neighbors = set(neighbors)
+        self._local[node] = neighbors
+        return neighbors
+
+    def discard(self, node, neighbor):
+        """Remove a neighbor of a node, dropping the node if it has no others
+        """
+        neighbors = self.writable(node)
+        neighbors.discard(neighbor)
+        if not neighbors:
+            del self._local[node]
+            if node in self._base:
+                self._removed.add(node)
+            else:
+                self._num_added -= 1
+
+    def __deepcopy__(self, memo):
+        return defaultdict(set, ((node, set(neighbors))
+                                 for node, neighbors in self.iteritems()))
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, dict(self.iteritems()))
+
+
+class EdgeOverlay(MutableMapping):
+
+    """Mapping of edges to weights recording changes to another such mapping
+
+    Only added, reweighted and removed edges are stored. Like the
+    ``defaultdict`` used by ``Bigraph``, missing edges read as zero weight
+    (but are not inserted), so that ``edges[edge] += weight`` works::
+
+        >>> base = {(1, 2): 5, (2, 3): 1}
+        >>> edges = EdgeOverlay(base, int)
+        >>> edges[(1, 2)] += 1
+        >>> edges[(3, 4)] += 2
+        >>> del edges[(2, 3)]
+        >>> sorted(edges.iteritems()), len(edges), len(base)
+        ([((1, 2), 6), ((3, 4), 2)], 2, 2)
+    """
+
+    def __init__(self, base, default_factory):
+        self._base = base
+        self.default_factory = default_factory
+        self._added = {}
+        self._reweighted = {}
+        self._removed = set()
+
+    def get(self, edge, default=None):
+        weight = self._added.get(edge)
+        if weight is not None:
+            return weight
+        weight = self._reweighted.get(edge)
+        if weight is not None:
+            return weight
+        if edge in self._removed:
+            return default
+        return self._base.get(edge, default)
+
+    def __getitem__(self, edge):
+        weight = self.get(edge)
+        return self.default_factory() if weight is None else weight
+
+    def __setitem__(self, edge, weight):
+        if edge in self._added:
+            self._added[edge] = weight
+        elif edge in self._base:
+            self._removed.discard(edge)
+            self._reweighted[edge] = weight
+        else:
+            self._added[edge] = weight
+
+    def __delitem__(self, edge):
+        if edge in self._added:
+            del self._added[edge]
+        elif edge in self._base and edge not in self._removed:
+            self._reweighted.pop(edge, None)
+            self._removed.add(edge)
+        else:
+            raise KeyError(edge)
+
+    def __contains__(self, edge):
+        return edge in self._added or \
+            (edge not in self._removed and edge in self._base)
+
+    def __iter__(self):
+        removed = self._removed
+        for edge in self._base:
+            if edge not in removed:
+                yield edge
+        for edge in self._added:
+            yield edge
+
+    def __len__(self):
+        return len(self._base) - len(self._removed) + len(self._added)
+
+    def iterkeys(self):
+        return iter(self)
+
+    def iteritems(self):
+        removed, reweighted = self._removed, self._reweighted
+        for edge, weight in self._base.iteritems():
+            if edge in removed:
                 continue
-            for u in list(c_candidates):
-                Nu = v2u[u]                             # all neighbors of node u
-                if c_nd is None or c_nd not in Nu:
-                    c_candidates.remove(u)
-                    new_compsub = set(c_compsub)
-                    new_compsub.add(u)
-                    new_candidates = c_candidates & Nu  # candidates that are neighbors of node u
-                    new_not = c_not & Nu                # already seen neighbors of node u
-                    if c_nd is None:
-                        stack.append((new_compsub, new_candidates, new_not, c_nd, c_disc_num))
-                    elif c_nd in new_not:
-                        new_disc_num = c_disc_num - 1
-                        if new_disc_num > 0:
-                            stack.append((new_compsub, new_candidates, new_not, c_nd, new_disc_num))
-                    else:
-                        new_disc_num = disc_num
-                        new_nd = c_nd
-                        for cand_nd in new_not:
-                            cand_disc_num = len(new_candidates - v2u[cand_nd])
-                            if cand_disc_num < new_disc_num:
-                                new_disc_num = cand_disc_num
-                                new_nd = cand_nd
-                        stack.append((new_compsub, new_candidates, new_not, new_nd, new_disc_num))
-                    c_not.add(u)
-                    # find the number of candidates that are not adjacent to u
-                    new_disc_num = len(c_candidates - Nu)
-                    if 0 < new_disc_num < c_disc_num:
-                        stack.append((c_compsub, c_candidates, c_not, u, new_disc_num))
-                    else:
-                        stack.append((c_compsub, c_candidates, c_not, c_nd, c_disc_num))
+            if reweighted:
+                weight = reweighted.get(edge, weight)
+            yield edge, weight
+        for item in self._added.iteritems():
+            yield item
+
+    def itervalues(self):
+        for _, weight in self.iteritems():
+            yield weight
+
+    def __deepcopy__(self, memo):
+        return defaultdict(self.default_factory, (
+            (edge, deepcopy(weight, memo)) for edge, weight in self.iteritems()))
+
+    def __repr__(self):
+        return "%s(%r)" % (self.__class__.__name__, dict(self.iteritems()))
+
+
+class _OverlayGraphMixin(object):
+
+    """Methods shared by copy-on-write bipartite and general graphs
+    """
+
+    _bipartite = True
+
+    def __init__(self, base=None, weight_type=int):
+        if base is None:
+            base = self._new_graph(weight_type=weight_type)
+        elif not isinstance(base, Bigraph if self._bipartite else Graph):
+            raise TypeError("Base object has incorrect type")
+        elif weight_type is not base.weight_type:
+            raise ValueError("Cannot convert %s weights to %s"
+                             % (base.weight_type, weight_type))
+        self.weight_type = weight_type
+        self._set_base(base)
+
+    def _set_base(self, base):
+        self.base = base
+        self.U2V = AdjacencyOverlay(base.U2V)
+        self.V2U = self.U2V if base.U2V is base.V2U else AdjacencyOverlay(base.V2U)
+        self.edges = EdgeOverlay(base.edges, self.weight_type)
+
+    def _new_graph(self, *args, **kwargs):
+        cls = Bigraph if self._bipartite else Graph
+        return cls(*args, **kwargs)
+
+    def map_edge(self, edge):
+        u, v = edge
+        if u is None or v is None:
+            raise ValueError("An edge must connect two nodes")
+        self._node_degrees = None
+        # only copy neighbor sets that change
+        if v not in self.U2V.get(u, ()):
+            self.U2V.writable(u).add(v)
+            self.V2U.writable(v).add(u)
+
+    def store_weight(self, edge, weight):
+        self._node_degrees = None
+        edges = self.edges
+        edges[edge] = edges[edge] + weight
+
+    def set_weight(self, u, v, weight):
+        """Set the weight of an edge, adding the edge if necessary
+        """
+        edge = self.make_edge(u, v)
+        self.map_edge(edge)
+        self.edges[edge] = weight
+
+    def remove_edge(self, u, v):
+        """Remove an edge, along with any nodes it leaves without neighbors
+        """
+        self._discard_edge(self.make_edge(u, v))
+
+    def _discard_edge(self, edge):
+        self._node_degrees = None
+        del self.edges[edge]
+        u, v = edge
+        self.U2V.discard(u, v)
+        self.V2U.discard(v, u)
+
+    def freeze(self):
+        """Return a standalone graph with the current edges
+
+        The result shares no storage with this graph or its base (apart
+        from weight objects, which are normally immutable numbers)
+        """
+        loops = self.U2V is self.V2U
+        graph = self._new_graph(weight_type=self.weight_type)
+        graph.U2V = defaultdict(set, ((u, set(vs)) for u, vs in self.U2V.iteritems()))
+        graph.V2U = graph.U2V if loops else \
+            defaultdict(set, ((v, set(us)) for v, us in self.V2U.iteritems()))
+        graph.edges = defaultdict(self.weight_type, self.edges.iteritems())
+        return graph
+
+    def compact(self):
+        """Fold recorded changes into private storage, detaching from the base
+
+        Lookups no longer go through the base graph, and the base graph can
+        be modified or released afterwards
+        """
+        self._set_base(self.freeze())
+
+
+class OverlayBigraph(_OverlayGraphMixin, Bigraph):
+
+    """Copy-on-write bipartite graph layered over another bipartite graph
+
+    Unlike ``Bigraph(base)``, which copies all of the base graph, the
+    overlay shares the storage of the base graph and only records added,
+    removed and reweighted edges (and the neighbor sets of nodes they touch).
+    The base graph must not be modified while the overlay is in use, unless
+    the overlay is first detached with ``compact()``. Graphs derived from an
+    overlay (by set operations, pruning, component search etc.) are plain
+    ``Bigraph`` instances::
+
+        >>> g = Bigraph.from_edgelist([(1, -1, 2), (1, -2, 1), (2, -2, 3)])
+        >>> h = OverlayBigraph(g)
+        >>> h.remove_edge(1, -2)
+        >>> h.set_weight(2, -2, 7)
+        >>> h.add_edge(3, -3)
+        >>> sorted(h.iter_edge_weights())
+        [((1, -1), 2), ((2, -2), 7), ((3, -3), 1)]
+        >>> sorted(g.iter_edge_weights())
+        [((1, -2), 1), ((1, -1), 2), ((2, -2), 3)]
+        >>> type(h.freeze()).__name__, type(h & g).__name__
+        ('Bigraph', 'Bigraph')
+    """
+
+    pass
+
+
+class OverlayGraph(_OverlayGraphMixin, Graph):
+
+    """Copy-on-write graph layered over another graph
+
+    See ``OverlayBigraph``::
+
+        >>> g = Graph.from_edgelist([(1, 2), (2, 3), (3, 1)])
+        >>> h = OverlayGraph(g)
+        >>> h.remove_edge(3, 1)
+        >>> sorted(h.iter_edges()), sorted(h.V), len(g)
+        ([(1, 2), (2, 3)], [1, 2, 3], 3)
+    """
+
+    _bipartite = False
+
+    def store_weight_sorted(self, edge, weight):
+        self.store_weight(self.make_edge(*edge), weight)
+
+
+def _mbea_extend(v2u, L, R, P, Q, x):
+    """Extend biclique ``(L, R)`` with vertex ``x`` (one step of ``_mbea``)
+
+    Returns the search state ``(L', R', P', Q')`` of the new biclique, or
+    None if it is not maximal. ``P`` and ``Q`` must no longer hold ``x``.
+    Sets of vertices in U can be either Python sets or bitsets (integers).
+    """
+    R_prime = R | {x}
+    L_prime = v2u[x] & L
+    # create new sets
+    P_prime = []
+    Q_prime = set()
+    # check maximality
+    for v in Q:
+        # checks whether L_prime is a subset of all adjacent nodes
+        # of v in Q
+        Nv = v2u[v] & L_prime
+        if Nv == L_prime:
+            return None
+        elif Nv:
+            # some vertices in L_prime are not adjacent to v:
+            # keep vertices adjacent to some vertex in L_prime
+            Q_prime.add(v)
+    for v in P:
+        # get the neighbors of v in L_prime
+        Nv = v2u[v] & L_prime
+        if Nv == L_prime:
+            R_prime.add(v)
+        elif Nv:
+            # some vertices in L_prime are not adjacent to v:
+            # keep vertices adjacent to some vertex in L_prime
+            P_prime.append(v)
+    return L_prime, R_prime, P_prime, Q_prime
+
+
+def _mbea_search(v2u, stack):
+    """Enumerate maximal bicliques reachable from a stack of search states
+    """
+    while stack:
+        L, R, P, Q = stack.pop()
+        while P:
+            x = P.pop()
+            state = _mbea_extend(v2u, L, R, P, Q, x)
+            if state is not None:
+                yield state[:2]  # report maximal biclique
+                if state[2]:
+                    stack.append(state)
+            # move x to former candidate set
+            Q.add(x)
+
+
+def _mbea(v2u, L, P):
+    """Enumerate maximal bicliques (see ``Bigraph.find_cliques``)
+
+    ``v2u`` maps each vertex in V to the set of its neighbors in U; it can be
+    any container indexable by vertex (e.g. a list of sets for vertices
+    numbered from zero)
+    """
+    return _mbea_search(v2u, [(L, set(), P, set())])
+
+
+def _mbea_rooted(u2v, v2u, L, P, rank, index, kernel='sets'):
+    """Maximal bicliques found by ``_mbea(v2u, L, P)`` at the top-level step
+    that extends the empty biclique with ``P[index]``
+
+    ``rank`` maps vertices of ``P`` to their positions. Only vertices within
+    two hops of ``P[index]`` can affect the step, so the remaining candidates
+    are not scanned.
+    """
+    x = P[index]
+    L_prime = v2u[x] & L
+    if not L_prime:
+        return _mbea_step(v2u, L, P[:index], set(P[index + 1:]), x)
+    two_hop = set()
+    for u in L_prime:
+        two_hop.update(u2v[u])
+    ranked = [(rank[v], v) for v in two_hop if v in rank]
+    ranked.sort()
+    P_rest = [v for pos, v in ranked if pos < index]
+    Q_rest = set(v for pos, v in ranked if pos > index)
+    if kernel == 'bitset':
+        return _mbea_bitset_step(v2u, L_prime, P_rest, Q_rest, x)
+    return _mbea_step(v2u, L, P_rest, Q_rest, x)
+
+
+def _mbea_step(v2u, L, P, Q, x):
+    """Maximal bicliques found by extending the empty biclique with ``x``
+    """
+    state = _mbea_extend(v2u, L, set(), P, Q, x)
+    if state is not None:
+        yield state[:2]
+        if state[2]:
+            for biclique in _mbea_search(v2u, [state]):
+                yield biclique
+
+
+def _mbea_bitset_step(v2u, L_prime, P, Q, x):
+    """Bitset variant of ``_mbea_step`` given ``L_prime``, the neighbors of
+    ``x`` in L
+
+    Every biclique found lies within ``L_prime``, so its vertices are
+    relabeled to ``0 .. len(L_prime) - 1`` and sets of them become bitsets.
+    """
+    members = list(L_prime)
+    size = len(members)
+    positions = dict(izip(members, xrange(size)))
+    masks = {}
+    for v in chain([x], P, Q):
+        masks[v] = from_indices([positions[u] for u in v2u[v] & L_prime], size)
+    for L_bits, R in _mbea_step(masks, (1 << size) - 1, P, Q, x):
+        yield set(members[idx] for idx in iter_set_bits(L_bits)), R
+
+
+def _bron_kerbosch(v2u, search_space, min_clique_size, compsub=None, excluded=None):
+    """Enumerate maximal cliques (see ``Graph.find_cliques``)
+
+    ``v2u`` maps each vertex to the set of its neighbors, as in ``_mbea``.
+    Optionally, the search can start from a partial clique ``compsub`` with
+    ``search_space`` and ``excluded`` holding its candidate and already
+    processed common neighbors.
+    """
+    disc_num = len(search_space)
+    stack = [(set() if compsub is None else compsub, search_space,
+              set() if excluded is None else excluded, None, disc_num)]
+    while stack:
+        (c_compsub, c_candidates, c_not, c_nd, c_disc_num) = stack.pop()
+        if not c_candidates and not c_not and len(c_compsub) >= min_clique_size:
+            yield c_compsub
+            continue
+        for u in list(c_candidates):
+            Nu = v2u[u]                             # all neighbors of node u
+            if c_nd is None or c_nd not in Nu:
+                c_candidates.remove(u)
+                new_compsub = set(c_compsub)
+                new_compsub.add(u)
+                new_candidates = c_candidates & Nu  # candidates that are neighbors of node u
+                new_not = c_not & Nu                # already seen neighbors of node u
+                if c_nd is None:
+                    stack.append((new_compsub, new_candidates, new_not, c_nd, c_disc_num))
+                elif c_nd in new_not:
+                    new_disc_num = c_disc_num - 1
+                    if new_disc_num > 0:
+                        stack.append((new_compsub, new_candidates, new_not, c_nd, new_disc_num))
+                else:
+                    new_disc_num = disc_num
+                    new_nd = c_nd
+                    for cand_nd in new_not:
+                        cand_disc_num = len(new_candidates - v2u[cand_nd])
+                        if cand_disc_num < new_disc_num:
+                            new_disc_num = cand_disc_num
+                            new_nd = cand_nd
+                    stack.append((new_compsub, new_candidates, new_not, new_nd, new_disc_num))
+                c_not.add(u)
+                # find the number of candidates that are not adjacent to u
+                new_disc_num = len(c_candidates - Nu)
+                if 0 < new_disc_num < c_disc_num:
+                    stack.append((c_compsub, c_candidates, c_not, u, new_disc_num))
+                else:
+                    stack.append((c_compsub, c_candidates, c_not, c_nd, c_disc_num))
+
+
+def _bron_kerbosch_bitset(v2u, search_space, min_clique_size, compsub=None,
+                         excluded=None, max_clique_size=None, deadline=None):
+    """Bitset variant of ``_bron_kerbosch``
+
+    Vertices of ``search_space`` and ``excluded`` are relabeled to
+    ``0 .. n - 1`` and sets of them become bitsets (integers). Branches are
+    pruned with a pivot covering the most candidates [1]_. Limits are as in
+    ``_bron_kerbosch_pivot``.
+
+    References
+    ----------
+
+    .. [1] `Tomita, E., Tanaka, A., & Takahashi, H. (2006). The worst-case time
+           complexity for generating all maximal cliques and computational
+           experiments. Theoretical Computer Science, 363(1), 28-42.
+           <http://dx.doi.org/10.1016/j.tcs.2006.06.015>`_
+    """
+    compsub = set() if compsub is None else compsub
+    excluded = set() if excluded is None else excluded
+    nodes = list(search_space)
+    nodes.extend(node for node in excluded if node not in search_space)
+    size = len(nodes)
+    positions = dict(izip(nodes, xrange(size)))
+    node_set = set(nodes)
+    masks = [from_indices([positions[u] for u in v2u[node] & node_set if u != node], size)
+             for node in nodes]
+    required = min_clique_size - len(compsub)
+    allowed = None if max_clique_size is None else max_clique_size - len(compsub)
+    candidates = (1 << len(search_space)) - 1
+    stack = [((), candidates, ((1 << size) - 1) ^ candidates)]
+    while stack:
+        if deadline is not None and time.time() > deadline:
+            return
+        R, P, X = stack.pop()
+        if not P:
+            if not X and len(R) >= required:
+                clique = set(compsub)
+                clique.update(nodes[idx] for idx in R)
+                yield clique
+            continue
+        if len(R) + popcount(P) < required or (allowed is not None and len(R) >= allowed):
+            continue
+        pivot_mask = max((masks[idx] for idx in iter_set_bits(P | X)),
+                         key=lambda mask: popcount(P & mask))
+        for idx in iter_set_bits(P & ~pivot_mask):
+            mask = masks[idx]
+            stack.append((R + (idx,), P & mask, X & mask))
+            bit = 1 << idx
+            P ^= bit
+            X |= bit
+
+
+def _bron_kerbosch_pivot(v2u, search_space, min_clique_size, compsub=None,
+                        excluded=None, max_clique_size=None, deadline=None):
+    """Bron-Kerbosch search with the pivot covering the most candidates [1]_
+
+    Arguments are as in ``_bron_kerbosch``. Branches that cannot produce a
+    maximal clique of at most ``max_clique_size`` nodes are pruned, and the
+    search stops once ``time.time()`` passes ``deadline``.
+
+    References
+    ----------
+
+    .. [1] `Tomita, E., Tanaka, A., & Takahashi, H. (2006). The worst-case time
+           complexity for generating all maximal cliques and computational
+           experiments. Theoretical Computer Science, 363(1), 28-42.
+           <http://dx.doi.org/10.1016/j.tcs.2006.06.015>`_
+    """
+    stack = [(set() if compsub is None else compsub, set(search_space),
+              set() if excluded is None else excluded)]
+    while stack:
+        if deadline is not None and time.time() > deadline:
+            return
+        R, P, X = stack.pop()
+        if not P:
+            if not X and len(R) >= min_clique_size:
+                yield R
+            continue
+        if len(R) + len(P) < min_clique_size or \
+                (max_clique_size is not None and len(R) >= max_clique_size):
+            continue
+        pivot = max(chain(P, X), key=lambda u: len(P & v2u[u]))
+        extensions = P - v2u[pivot]
+        if pivot in P:
+            # a self-loop makes the pivot its own neighbor
+            extensions.add(pivot)
+        for v in extensions:
+            Nv = v2u[v]
+            new_P = P & Nv
+            new_P.discard(v)
+            stack.append((R | {v}, new_P, X & Nv))
+            P.remove(v)
+            X.add(v)
+
+
+def _degeneracy_ordering(v2u, nodes):
+    """Order nodes by repeatedly removing one of minimum remaining degree [1]_
+
+    Returns the order and a dict of core numbers (the largest ``k`` such that
+    a node belongs to a subgraph where all nodes have degree ``k`` or more).
+    Only neighbors among ``nodes`` are counted, and self-loops are ignored::
+
+        >>> v2u = {1: {2, 3}, 2: {1, 3}, 3: {1, 2, 4}, 4: {3}}
+        >>> order, cores = _degeneracy_ordering(v2u, [1, 2, 3, 4])
+        >>> order[0], sorted(cores.items())
+        (4, [(1, 2), (2, 2), (3, 2), (4, 1)])
+
+    References
+    ----------
+
+    .. [1] `Batagelj, V., & Zaversnik, M. (2003). An O(m) algorithm for cores
+           decomposition of networks. arXiv:cs/0310049.
+           <http://arxiv.org/abs/cs/0310049>`_
+    """
+    node_set = set(nodes)
+    degrees = {}
+    for node in node_set:
+        neighbors = v2u[node]
+        degrees[node] = len(neighbors & node_set) - (node in neighbors)
+    buckets = [set() for _ in xrange(max(degrees.itervalues()) + 1 if degrees else 0)]
+    for node, degree in degrees.iteritems():
+        buckets[degree].add(node)
+    order = []
+    cores = {}
+    core = 0
+    lowest = 0
+    for _ in xrange(len(degrees)):
+        while not buckets[lowest]:
+            lowest += 1
+        node = buckets[lowest].pop()
+        core = max(core, lowest)
+        cores[node] = core
+        order.append(node)
+        del degrees[node]
+        for u in v2u[node]:
+            degree = degrees.get(u)
+            if degree:
+                buckets[degree].remove(u)
+                buckets[degree - 1].add(u)
+                degrees[u] = degree - 1
+        # degrees drop by at most one per removed node
+        lowest = max(0, lowest - 1)
+    return order, cores
+
+
+def _degree_bounds(min_degree):
+    """Split a degree bound into bounds for U and V nodes
+    """
+    if min_degree is None:
+        return 0, 0
+    elif isinstance(min_degree, tuple):
+        min_udegree, min_vdegree = min_degree
+        return min_udegree or 0, min_vdegree or 0
+    return min_degree, min_degree
+
+
+def _core_nodes(v2u, nodes, k):
+    """Return the set of nodes of the k-core of the subgraph induced by nodes
+
+    Self-loops do not count towards degrees::
+
+        >>> v2u = {1: {2, 3}, 2: {1, 3}, 3: {1, 2, 4}, 4: {3, 4}}
+        >>> sorted(_core_nodes(v2u, [1, 2, 3, 4], 2)), sorted(_core_nodes(v2u, [1, 3, 4], 2))
+        ([1, 2, 3], [])
+    """
+    node_set = set(nodes)
+    if k <= 0:
+        return node_set
+    degrees = {}
+    for node in node_set:
+        neighbors = v2u.get(node, ())
+        degrees[node] = len(node_set.intersection(neighbors)) - (node in neighbors)
+    stack = [node for node, degree in degrees.iteritems() if degree < k]
+    removed = set(stack)
+    while stack:
+        for u in v2u.get(stack.pop(), ()):
+            if u in degrees and u not in removed:
+                degrees[u] -= 1
+                if degrees[u] < k:
+                    removed.add(u)
+                    stack.append(u)
+    return node_set - removed
+
+
+def _peel_nodes(u2v, v2u, min_udegree, min_vdegree):
+    """Repeatedly remove nodes having fewer neighbors than required
+
+    Works in place on mappings of nodes to sets of neighbors. Nodes left
+    without neighbors are removed too, whatever the bound on their side. For
+    graphs that are not bipartite, ``u2v`` and ``v2u`` are the same mapping,
+    and self-loops do not count as neighbors.
+    """
+    loops = u2v is v2u
+    sides = (u2v, v2u)
+    min_degrees = (min_udegree, min_vdegree)
+
+    def is_weak(side, node, neighbors):
+        return len(neighbors) - (loops and node in neighbors) < min_degrees[side]
+
+    stack = [(side, node) for side in ((0,) if loops else (0, 1))
+             for node, neighbors in sides[side].iteritems()
+             if is_weak(side, node, neighbors)]
+    while stack:
+        side, node = stack.pop()
+        neighbors = sides[side].pop(node, None)
+        if neighbors is None:
+            continue
+        other_side = 1 - side
+        others = sides[other_side]
+        for neighbor in neighbors:
+            if loops and neighbor == node:
+                continue
+            other_neighbors = others[neighbor]
+            other_neighbors.discard(node)
+            if not other_neighbors or is_weak(other_side, neighbor, other_neighbors):
+                stack.append((other_side, neighbor))
+
+
+def _bron_kerbosch_rooted(search, v2u, rank, node, min_clique_size, **limits):
+    """Maximal cliques whose first node in the order given by ``rank`` is
+    ``node``, found with a given search function
+    """
+    node_rank = rank[node]
+    candidates = set()
+    excluded = set()
+    for u in v2u[node]:
+        u_rank = rank.get(u)
+        if u_rank is None or u == node:
+            continue
+        elif u_rank > node_rank:
+            candidates.add(u)
+        else:
+            excluded.add(u)
+    return search(v2u, candidates, min_clique_size, compsub={node},
+                  excluded=excluded, **limits)
+
+
+def _find_cliques_degeneracy(v2u, nodes, min_clique_size, max_clique_size,
+                             time_budget, kernel):
+    """Maximal cliques rooted at nodes in degeneracy order (see
+    ``Graph.find_cliques_degeneracy``)
+    """
+    start = time.time()
+    deadline = None if time_budget is None else start + time_budget
+    order, cores = _degeneracy_ordering(v2u, nodes)
+    if min_clique_size > 1:
+        # nodes outside the (min_clique_size - 1)-core are not searched
+        order = [node for node in order if cores[node] >= min_clique_size - 1]
+    rank = dict(izip(order, xrange(len(order))))
+    search = _bron_kerbosch_bitset if kernel == 'bitset' else _bron_kerbosch_pivot
+    for node in order:
+        if deadline is not None and time.time() > deadline:
+            logging.warning("Clique search stopped after %.3f sec time budget "
+                            "with %d of %d nodes searched", time_budget,
+                            rank[node], len(order))
+            return
+        for clique in _bron_kerbosch_rooted(
+                search, v2u, rank, node, min_clique_size,
+                max_clique_size=max_clique_size, deadline=deadline):
+            yield clique
+
+
+def _limit_cliques(cliques, clique_weight, min_clique_weight, max_results):
+    """Filter cliques by weight and stop after a number of results
+    """
+    if min_clique_weight is not None:
+        cliques = (clique for clique in cliques
+                   if clique_weight(clique) >= min_clique_weight)
+    if max_results is not None:
+        cliques = islice(cliques, max_results)
+    return cliques
+
+
+# kernels of clique search (see ``Bigraph.find_cliques``)
+CLIQUE_KERNELS = ('sets', 'bitset')
+
+
+def _check_kernel(kernel):
+    if kernel not in CLIQUE_KERNELS:
+        raise ValueError("Unknown clique search kernel %r (use one of %s)"
+                         % (kernel, ", ".join(CLIQUE_KERNELS)))
+
+
+def _enumerate_bicliques(u2v, v2u, L, P, kernel):
+    """Maximal bicliques with vertices in ``L`` (a set) and ``P`` (a list)
+    """
+    if kernel != 'bitset':
+        return _mbea(v2u, L, P)
+    rank = dict(izip(P, xrange(len(P))))
+    # roots in the order in which ``_mbea`` would visit them
+    return (biclique for index in reversed(xrange(len(P)))
+            for biclique in _mbea_rooted(u2v, v2u, L, P, rank, index, kernel))
+
+
+def _enumerate_cliques(v2u, nodes, min_clique_size, kernel):
+    """Maximal cliques with vertices in ``nodes``
+    """
+    if kernel != 'bitset':
+        return _bron_kerbosch(v2u, set(nodes), min_clique_size)
+    nodes = list(nodes)
+    rank = dict(izip(nodes, xrange(len(nodes))))
+    return (clique for node in nodes
+            for clique in _bron_kerbosch_rooted(
+                _bron_kerbosch_bitset, v2u, rank, node, min_clique_size))
+
+
+# state shared by clique enumeration tasks within a worker process
+_clique_state = None
+
+
+def _init_clique_worker(state):
+    global _clique_state
+    _clique_state = dict(state, ranks={})
+
+
+def _clique_task(task):
+    return _run_clique_task(_clique_state, task)
+
+
+def _run_clique_task(state, task):
+    """Enumerate cliques of a component or of a batch of its rooted subproblems
+    """
+    task_index, component_index, roots = task
+    u2v, v2u, kernel = state['u2v'], state['v2u'], state.get('kernel', 'sets')
+    component = state['components'][component_index]
+    if state['bipartite']:
+        L, P = component
+        if roots is None:
+            found = list(_enumerate_bicliques(u2v, v2u, set(L), list(P), kernel))
+        else:
+            ranks = state['ranks']
+            if component_index not in ranks:
+                ranks[component_index] = (set(L), dict(izip(P, xrange(len(P)))))
+            L_set, rank = ranks[component_index]
+            found = [biclique for index in roots
+                     for biclique in _mbea_rooted(u2v, v2u, L_set, P, rank, index, kernel)]
+    else:
+        min_clique_size = state['min_clique_size']
+        search = _bron_kerbosch_bitset if kernel == 'bitset' else _bron_kerbosch
+        if roots is None:
+            found = list(_enumerate_cliques(v2u, component, min_clique_size, kernel))
+        else:
+            ranks = state['ranks']
+            if component_index not in ranks:
+                ranks[component_index] = dict(izip(component, xrange(len(component))))
+            rank = ranks[component_index]
+            found = [clique for index in roots
+                     for clique in _bron_kerbosch_rooted(
+                         search, v2u, rank, component[index], min_clique_size)]
+    return task_index, found
+
+
+def _plan_clique_tasks(sizes, num_workers, max_task_size):
+    """Split components into tasks, largest first
+
+    Components with more search nodes than ``max_task_size`` are split into
+    batches of rooted subproblems. Roots are dealt to batches in turn, since
+    the cost of a rooted subproblem depends on its position in the order.
+    Returns tasks as ``(task_index, component_index, roots)`` triples, with
+    task indices following component order.
+    """
+    total = sum(sizes)
+    if max_task_size is None:
+        max_task_size = max(1, total // (4 * num_workers))
+    tasks = []
+    for component_index, size in enumerate(sizes):
+        if size <= max_task_size:
+            tasks.append((size, component_index, None))
+        else:
+            num_batches = -(-size // max_task_size)
+            for batch in xrange(num_batches):
+                roots = range(batch, size, num_batches)
+                tasks.append((len(roots), component_index, roots))
+    order = sorted(xrange(len(tasks)), key=lambda idx: -tasks[idx][0])
+    return [(idx,) + tasks[idx][1:] for idx in order]
+
+
+def _find_cliques_parallel(state, sizes, n_jobs, ordered, max_task_size):
+    """Run clique enumeration tasks on a pool of processes
+
+    Workers take the next pending task as soon as they are done with the
+    previous one, so that a few expensive tasks do not hold up the rest, and
+    cliques are streamed back one task at a time. With ``ordered``, results
+    are emitted in component order regardless of when tasks finish.
+    """
+    num_workers = cpu_count() + 1 + n_jobs if n_jobs < 0 else n_jobs
+    num_workers = max(1, num_workers)
+    tasks = _plan_clique_tasks(sizes, num_workers, max_task_size)
+    if num_workers == 1:
+        state = dict(state, ranks={})
+        for task in sorted(tasks):
+            _, found = _run_clique_task(state, task)
+            for clique in found:
+                yield clique
+        return
+    pool = Pool(num_workers, _init_clique_worker, (state,))
+    try:
+        pending = {}
+        next_index = 0
+        for task_index, found in pool.imap_unordered(_clique_task, tasks):
+            if not ordered:
+                for clique in found:
+                    yield clique
+                continue
+            pending[task_index] = found
+            while next_index in pending:
+                for clique in pending.pop(next_index):
+                    yield clique
+                next_index += 1
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _check_pickle_options(kwargs, reason):
+    """Reject options of the binary format when a graph is pickled
+    """
+    if kwargs:
+        raise ValueError("Options %s apply to the binary format only (%s)"
+                         % (', '.join(sorted(kwargs)), reason))
+
+
+def _check_format(format):
+    if format not in SAVE_FORMATS:
+        raise ValueError("Unknown format %r (use one of %s)"
+                         % (format, ', '.join(SAVE_FORMATS)))
+    return format
+
+
+@contextmanager
+def _output_handle(output, mode='wb'):
+    """Use a file handle as is, or open a file (compressed by extension)
+    """
+    if isinstance(output, basestring):
+        with open_gz(output, mode) as handle:
+            yield handle
+    else:
+        yield output
+
+
+class _QuoteCache(dict):
+
+    """Quoted forms of node names, computed on first use
+    """
+
+    def __init__(self, quote):
+        super(_QuoteCache, self).__init__()
+        self.quote = quote
+
+    def __missing__(self, node):
+        quoted = self[node] = self.quote(node)
+        return quoted
+
+
+def _encode(text):
+    return text.encode('utf-8')
+
+
+def _dot_id(value):
+    """Quoted DOT identifier
+    """
+    if not isinstance(value, unicode):
+        value = str(value).decode('utf-8')
+    return u'"%s"' % value.replace(u'"', u'\\"')
+
+
+def _dot_attrs(attrs):
+    if not attrs:
+        return u''
+    return u' [%s]' % u', '.join(u'%s=%s' % (key, _dot_id(value))
+                                 for key, value in sorted(attrs.iteritems()))
+
+
+def _read_edgelist_header(handle):
+    """Weight type and weight type code from the header of a binary edge list
+    """
+    header = handle.read(EDGELIST_HEADER.size)
+    if len(header) < EDGELIST_HEADER.size:
+        raise ValueError("Not a binary edge list")
+    magic, version, weight_code = EDGELIST_HEADER.unpack(header)
+    if magic != EDGELIST_MAGIC or version != 1:
+        raise ValueError("Not a binary edge list")
+    weight_types = {'q': int, 'd': float}
+    if weight_code not in weight_types:
+        raise ValueError("Unknown weight type code: %r" % weight_code)
+    return weight_types[weight_code], weight_code
 
 
 def describe_graph(g, graph_name=None):
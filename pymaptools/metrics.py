@@ -0,0 +1,262 @@
+"""
+Clustering agreement metrics computed directly from contingency tables
+
+All metrics here take a ``CrossTab`` instance (rows corresponding to true
+classes, columns to predicted clusters) and work on arrays of nonzero cell
+counts and margins, never expanding the table back into label arrays. For
+``SparseCrossTab`` instances the arrays are read straight from the underlying
+sparse matrix, and for other tables they are gathered in a single pass.
+Tables updated incrementally with ``CrossTab.add`` or ``CrossTab.add_batch``
+keep running sums (``CrossTab.live_stats``) from which all metrics are
+computed in constant time.
+
+.. code-block:: python
+
+    >>> from pymaptools.sparse import SparseCrossTab
+    >>> t = SparseCrossTab.from_labels([0, 0, 0, 1, 1, 1], [0, 0, 1, 1, 2, 2])
+    >>> print "%.4f" % adjusted_rand_score(t)
+    0.2424
+    >>> print "%.4f %.4f %.4f" % homogeneity_completeness_v_measure(t)
+    0.6667 0.4206 0.5158
+
+The private helpers operate along the last axis of their array arguments, so
+they also accept stacks of tables with a common cell layout (one table per
+row), which is what bootstrap estimates need.
+"""
+
+import numpy as np
+from pymaptools.sparse import SparseCrossTab
+
+
+def contingency_arrays(table):
+    """Return nonzero cells, row margin, column margin and grand total
+
+    All arrays are of floating-point type to avoid integer overflow in
+    pair-counting sums::
+
+        >>> from pymaptools.containers import CrossTab
+        >>> cells, a, b, n = contingency_arrays(CrossTab(rows=[(1, 5), (4, 0)]))
+        >>> sorted(cells.tolist()), sorted(a.tolist()), sorted(b.tolist()), n
+        ([1.0, 4.0, 5.0], [4.0, 6.0], [5.0, 5.0], 10.0)
+    """
+    if isinstance(table, SparseCrossTab):
+        cells = table.csr.data
+        row_margin = table.row_margin
+        col_margin = table.col_margin
+    else:
+        cells = np.fromiter(table.itervalues(), dtype=np.float64)
+        cells = cells[cells != 0]
+        row_margin = np.fromiter(table.iter_row_totals(), dtype=np.float64)
+        col_margin = np.fromiter(table.iter_col_totals(), dtype=np.float64)
+    cells = np.asarray(cells, dtype=np.float64)
+    row_margin = np.asarray(row_margin, dtype=np.float64)
+    col_margin = np.asarray(col_margin, dtype=np.float64)
+    return cells, row_margin, col_margin, row_margin.sum()
+
+
+def _sum_comb2(counts):
+    """Sum of ``n choose 2`` over the last axis
+    """
+    return (counts * (counts - 1.0)).sum(axis=-1) / 2.0
+
+
+def _sum_xlogx(counts):
+    """Sum of ``n log n`` over the last axis (with ``0 log 0 = 0``)
+    """
+    safe = np.where(counts > 0, counts, 1.0)
+    return (counts * np.log(safe)).sum(axis=-1)
+
+
+def _stats_from_arrays(cells, row_margin, col_margin, n):
+    """Sufficient statistics in the layout of ``CrossTab.live_stats``
+    """
+    return (n,
+            _sum_comb2(cells), _sum_comb2(row_margin), _sum_comb2(col_margin),
+            _sum_xlogx(cells), _sum_xlogx(row_margin), _sum_xlogx(col_margin))
+
+
+def sufficient_stats(table):
+    """Sums from which all metrics in this module are computed
+
+    Returns the grand total followed by sums of ``n choose 2`` and of
+    ``n log n`` over cells, row totals, and column totals (see
+    ``CrossTab.live_stats``). Running sums of incrementally updated tables
+    are used when available::
+
+        >>> from pymaptools.containers import CrossTab
+        >>> t = CrossTab(rows=[(1, 5), (4, 0)])
+        >>> sufficient_stats(t)[:4]
+        (10.0, 16.0, 21.0, 20.0)
+        >>> t.add(1, 1, 2)
+        >>> sufficient_stats(t)[:4] == sufficient_stats(CrossTab(rows=[(1, 5), (4, 2)]))[:4]
+        True
+    """
+    live_stats = table.live_stats
+    if live_stats is not None:
+        return tuple(np.float64(x) for x in live_stats)
+    return _stats_from_arrays(*contingency_arrays(table))
+
+
+def _pair_counts(stats):
+    """Unordered point pairs as (TP, FP, FN, TN)
+
+    TP pairs are together in both partitions, FP pairs are together only in
+    the predicted partition (columns), and FN pairs are together only in the
+    true partition (rows).
+    """
+    n, comb2_cells, comb2_rows, comb2_cols = stats[:4]
+    tp = comb2_cells
+    fp = comb2_cols - tp
+    fn = comb2_rows - tp
+    tn = n * (n - 1.0) / 2.0 - tp - fp - fn
+    return tp, fp, fn, tn
+
+
+def _entropies(stats):
+    """Row entropy, column entropy, and mutual information (in nats)
+    """
+    n = stats[0]
+    xlogx_cells, xlogx_rows, xlogx_cols = stats[4:]
+    safe_n = np.where(n > 0, n, 1.0)
+    n_log_n = n * np.log(safe_n)
+    h_rows = np.maximum((n_log_n - xlogx_rows) / safe_n, 0.0)
+    h_cols = np.maximum((n_log_n - xlogx_cols) / safe_n, 0.0)
+    mi = (xlogx_cells - xlogx_rows - xlogx_cols + n_log_n) / safe_n
+    return h_rows, h_cols, np.maximum(mi, 0.0)
+
+
+def _adjusted_rand(tp, fp, fn, tn):
+    total = tp + fp + fn + tn
+    sum_rows = tp + fn
+    sum_cols = tp + fp
+    safe_total = np.where(total > 0, total, 1.0)
+    expected = sum_rows * sum_cols / safe_total
+    max_index = (sum_rows + sum_cols) / 2.0
+    denominator = max_index - expected
+    # special cases (all points in one cluster or each point in its own)
+    # are considered perfect matches
+    safe_denominator = np.where(denominator != 0, denominator, 1.0)
+    return np.where(denominator != 0, (tp - expected) / safe_denominator, 1.0)
+
+
+def _v_measure(h_rows, h_cols, mi, beta=1.0):
+    safe_rows = np.where(h_rows > 0, h_rows, 1.0)
+    safe_cols = np.where(h_cols > 0, h_cols, 1.0)
+    homogeneity = np.where(h_rows > 0, mi / safe_rows, 1.0)
+    completeness = np.where(h_cols > 0, mi / safe_cols, 1.0)
+    denominator = beta * homogeneity + completeness
+    safe_denominator = np.where(denominator > 0, denominator, 1.0)
+    v_measure = np.where(
+        denominator > 0,
+        (1.0 + beta) * homogeneity * completeness / safe_denominator, 0.0)
+    return homogeneity, completeness, v_measure
+
+
+def _fowlkes_mallows(tp, fp, fn):
+    denominator = np.sqrt((tp + fp) * (tp + fn))
+    safe_denominator = np.where(denominator > 0, denominator, 1.0)
+    return np.where(denominator > 0, tp / safe_denominator, 0.0)
+
+
+def _as_result(value):
+    """Convert 0-d arrays to Python floats, leave batches alone
+    """
+    value = np.asarray(value)
+    return value.item() if value.ndim == 0 else value
+
+
+def pair_confusion_matrix(table):
+    """Pair-counting confusion matrix
+
+    Counts unordered pairs of points, arranged as ``[[TN, FP], [FN, TP]]``,
+    where "positive" means that a pair falls in the same predicted cluster
+    and "true" means that it falls in the same true class::
+
+        >>> from pymaptools.sparse import SparseCrossTab
+        >>> t = SparseCrossTab.from_labels([0, 0, 0, 1, 1, 1], [0, 0, 1, 1, 2, 2])
+        >>> pair_confusion_matrix(t).tolist()
+        [[8.0, 1.0], [4.0, 2.0]]
+    """
+    tp, fp, fn, tn = _pair_counts(sufficient_stats(table))
+    return np.array([[tn, fp], [fn, tp]])
+
+
+def rand_score(table):
+    """Rand index (fraction of point pairs on which partitions agree)
+    """
+    tp, fp, fn, tn = _pair_counts(sufficient_stats(table))
+    total = tp + fp + fn + tn
+    safe_total = np.where(total > 0, total, 1.0)
+    return _as_result(np.where(total > 0, (tp + tn) / safe_total, 1.0))
+
+
+def adjusted_rand_score(table):
+    """Rand index adjusted for chance (Hubert and Arabie)
+
+    ::
+
+        >>> from pymaptools.containers import CrossTab
+        >>> adjusted_rand_score(CrossTab(rows=[(3, 0), (0, 2)]))
+        1.0
+    """
+    return _as_result(_adjusted_rand(*_pair_counts(sufficient_stats(table))))
+
+
+def fowlkes_mallows_score(table):
+    """Geometric mean of pair-counting precision and recall
+
+    ::
+
+        >>> from pymaptools.sparse import SparseCrossTab
+        >>> t = SparseCrossTab.from_labels([0, 0, 0, 1, 1, 1], [0, 0, 1, 1, 2, 2])
+        >>> print "%.4f" % fowlkes_mallows_score(t)
+        0.4714
+    """
+    tp, fp, fn, _ = _pair_counts(sufficient_stats(table))
+    return _as_result(_fowlkes_mallows(tp, fp, fn))
+
+
+def mutual_info_score(table):
+    """Mutual information between row and column variables (in nats)
+
+    ::
+
+        >>> from pymaptools.sparse import SparseCrossTab
+        >>> t = SparseCrossTab.from_labels([0, 0, 1, 1], [0, 0, 1, 1])
+        >>> print "%.4f" % mutual_info_score(t)
+        0.6931
+    """
+    _, _, mi = _entropies(sufficient_stats(table))
+    return _as_result(mi)
+
+
+def normalized_mutual_info_score(table):
+    """Mutual information normalized by the arithmetic mean of entropies
+
+    With this normalization, the score is equal to V-measure with ``beta=1``
+    """
+    h_rows, h_cols, mi = _entropies(sufficient_stats(table))
+    mean_h = (h_rows + h_cols) / 2.0
+    return _as_result(np.where(mean_h > 0, mi / np.where(mean_h > 0, mean_h, 1.0), 1.0))
+
+
+def homogeneity_completeness_v_measure(table, beta=1.0):
+    """Homogeneity, completeness, and V-measure (Rosenberg and Hirschberg)
+
+    Homogeneity is maximal when each predicted cluster (column) contains
+    members of a single true class (row); completeness is maximal when all
+    members of a class fall in a single cluster::
+
+        >>> from pymaptools.containers import CrossTab
+        >>> t = CrossTab(rows=[(2, 0, 0), (0, 1, 1)])
+        >>> print "%.4f %.4f %.4f" % homogeneity_completeness_v_measure(t)
+        1.0000 0.6667 0.8000
+    """
+    h_rows, h_cols, mi = _entropies(sufficient_stats(table))
+    return tuple(_as_result(x) for x in _v_measure(h_rows, h_cols, mi, beta=beta))
+
+
+def v_measure_score(table, beta=1.0):
+    """Weighted harmonic mean of homogeneity and completeness
+    """
+    return homogeneity_completeness_v_measure(table, beta=beta)[2]
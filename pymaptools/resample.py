@@ -0,0 +1,240 @@
+"""
+Bootstrap and permutation resampling of contingency tables
+
+Resampling works on cell counts rather than on label lists: a bootstrap
+replicate of a table with ``n`` observations is a multinomial draw of ``n``
+observations over its nonzero cells, so a whole batch of replicates is drawn
+in one NumPy call. Replicates are reduced to sufficient statistics (see
+``pymaptools.metrics.sufficient_stats``) and wrapped in ``ReplicateStats``,
+which any metric from ``pymaptools.metrics`` evaluates over all replicates at
+once::
+
+    >>> from pymaptools import metrics
+    >>> from pymaptools.sparse import SparseCrossTab
+    >>> t = SparseCrossTab.from_labels([0, 0, 0, 1, 1, 1], [0, 0, 1, 1, 2, 2])
+    >>> scores = bootstrap(t, metrics.adjusted_rand_score, 1000, random_state=0)
+    >>> scores.shape
+    (1000,)
+    >>> low, high = percentile_interval(scores)
+    >>> bool(low < metrics.adjusted_rand_score(t) < high)
+    True
+
+Batches of replicates can be distributed across a pool of processes with
+``n_jobs``; random seeds are assigned per batch, so results for a given
+``random_state`` do not depend on the number of workers.
+"""
+
+import numpy as np
+from joblib import Parallel, delayed
+from scipy.sparse import csr_matrix
+from pymaptools.sparse import SparseCrossTab, table_to_coo
+from pymaptools.metrics import _sum_comb2, _sum_xlogx
+
+
+# upper bound on array elements allocated per batch of replicates
+BATCH_ELEMENTS = 1 << 22
+
+
+class ReplicateStats(object):
+
+    """Sufficient statistics of a stack of tables
+
+    Behaves as a table with running sums (``CrossTab.live_stats``) as far as
+    ``pymaptools.metrics`` is concerned, except that each sum is an array with
+    one element per replicate, and so are metric values computed from it::
+
+        >>> from pymaptools import metrics
+        >>> stats = ReplicateStats([[10.0, 10.0], [16.0, 20.0], [21.0, 20.0],
+        ...                         [20.0, 20.0], [0.0] * 2, [0.0] * 2, [0.0] * 2])
+        >>> metrics.pair_confusion_matrix(stats)[1, 1].tolist()
+        [16.0, 20.0]
+    """
+
+    def __init__(self, live_stats):
+        self.live_stats = [np.asarray(x, dtype=np.float64) for x in live_stats]
+
+    def __len__(self):
+        return len(self.live_stats[0])
+
+    @classmethod
+    def concatenate(cls, batches):
+        """Join statistics of several batches of replicates
+        """
+        return cls([np.concatenate(arrays) for arrays in zip(*batches)])
+
+
+def cell_arrays(table):
+    """Return nonzero cell counts with their row and column indices
+
+    ::
+
+        >>> from pymaptools.containers import CrossTab
+        >>> cells, ri, ci, shape = cell_arrays(CrossTab(rows=[(1, 5), (4, 0)]))
+        >>> cells.tolist(), ri.tolist(), ci.tolist(), shape
+        ([1, 5, 4], [0, 0, 1], [0, 1, 0], (2, 2))
+    """
+    if isinstance(table, SparseCrossTab):
+        matrix = table.csr.tocoo()
+    else:
+        _, _, matrix = table_to_coo(table.rows)
+    nonzero = matrix.data != 0
+    cells = np.asarray(matrix.data[nonzero], dtype=np.int64)
+    return cells, matrix.row[nonzero], matrix.col[nonzero], matrix.shape
+
+
+def _indicator(indices, size):
+    """Sparse (cells x rows) or (cells x columns) membership matrix
+    """
+    return csr_matrix(
+        (np.ones(len(indices)), (np.arange(len(indices)), indices)),
+        shape=(len(indices), size))
+
+
+def _bootstrap_batch(cells, row_idx, col_idx, shape, num_replicates, seed):
+    """Draw replicates and reduce them to sufficient statistics
+    """
+    rng = np.random.RandomState(seed)
+    n = cells.sum()
+    counts = rng.multinomial(n, cells / float(n), size=num_replicates)
+    row_margins = _indicator(row_idx, shape[0]).T.dot(counts.T).T
+    col_margins = _indicator(col_idx, shape[1]).T.dot(counts.T).T
+    # cell counts are small integers, so n log n is looked up rather than
+    # computed for every cell of every replicate
+    values = np.arange(counts.max() + 1, dtype=np.float64)
+    xlogx = values * np.log(np.maximum(values, 1.0))
+    return (np.repeat(float(n), num_replicates),
+            (counts * (counts - 1)).sum(axis=-1) / 2.0,
+            _sum_comb2(row_margins), _sum_comb2(col_margins),
+            xlogx[counts].sum(axis=-1),
+            _sum_xlogx(row_margins), _sum_xlogx(col_margins))
+
+
+def _permutation_batch(cells, row_idx, col_idx, shape, num_replicates, seed):
+    """Draw tables with fixed margins and reduce them to sufficient statistics
+
+    Column assignments of individual observations are shuffled independently
+    for each replicate, and the shuffled cells of all replicates are counted
+    in one pass by giving each replicate its own range of cell codes.
+    """
+    rng = np.random.RandomState(seed)
+    rows = np.repeat(row_idx.astype(np.int64), cells)
+    cols = np.repeat(col_idx.astype(np.int64), cells)
+    num_cells = shape[0] * shape[1]
+    shuffled = cols[rng.rand(num_replicates, len(cols)).argsort(axis=1)]
+    codes = shuffled + rows * shape[1] \
+        + np.arange(num_replicates, dtype=np.int64)[:, np.newaxis] * num_cells
+    codes, counts = np.unique(codes.ravel(), return_counts=True)
+    replicates = codes // num_cells
+    counts = counts.astype(np.float64)
+    row_margins = np.bincount(row_idx, weights=cells, minlength=shape[0])
+    col_margins = np.bincount(col_idx, weights=cells, minlength=shape[1])
+    ones = np.ones(num_replicates)
+    return (ones * cells.sum(),
+            np.bincount(replicates, weights=counts * (counts - 1.0) / 2.0,
+                        minlength=num_replicates),
+            ones * _sum_comb2(row_margins),
+            ones * _sum_comb2(col_margins),
+            np.bincount(replicates, weights=counts * np.log(counts),
+                        minlength=num_replicates),
+            ones * _sum_xlogx(row_margins),
+            ones * _sum_xlogx(col_margins))
+
+
+def _resample(batch_func, table, num_replicates, batch_size, n_jobs, random_state,
+              elements_per_replicate):
+    arrays = cell_arrays(table)
+    if batch_size is None:
+        batch_size = max(1, BATCH_ELEMENTS // max(1, elements_per_replicate(arrays[0])))
+    rng = random_state if isinstance(random_state, np.random.RandomState) \
+        else np.random.RandomState(random_state)
+    sizes = [min(batch_size, num_replicates - start)
+             for start in xrange(0, num_replicates, batch_size)]
+    seeds = rng.randint(0, np.iinfo(np.int32).max, size=len(sizes))
+    batches = Parallel(n_jobs=n_jobs)(
+        delayed(batch_func)(*(arrays + (size, seed)))
+        for size, seed in zip(sizes, seeds))
+    return ReplicateStats.concatenate(batches)
+
+
+def bootstrap_stats(table, num_replicates=1000, batch_size=None, n_jobs=1,
+                    random_state=None):
+    """Sufficient statistics of bootstrap replicates of a table
+
+    Parameters
+    ----------
+    table : CrossTab
+        Table to resample (any ``CrossTab`` instance)
+    num_replicates : int
+        Number of replicates to draw
+    batch_size : int, optional
+        Number of replicates drawn per NumPy call (by default, chosen so that
+        a batch takes about ``BATCH_ELEMENTS`` array elements)
+    n_jobs : int
+        Number of worker processes (``joblib`` convention)
+    random_state : int or numpy.random.RandomState, optional
+        Seed or random number generator
+
+    Returns
+    -------
+    ReplicateStats
+    """
+    return _resample(_bootstrap_batch, table, num_replicates, batch_size,
+                     n_jobs, random_state, len)
+
+
+def permutation_stats(table, num_replicates=1000, batch_size=None, n_jobs=1,
+                      random_state=None):
+    """Sufficient statistics of tables drawn under the null hypothesis
+
+    Replicates keep row and column totals of the original table but pair
+    rows with columns at random (as in shuffling one of the label arrays).
+    Drawing a replicate takes time proportional to the grand total. Other
+    parameters are as in ``bootstrap_stats``.
+    """
+    return _resample(_permutation_batch, table, num_replicates, batch_size,
+                     n_jobs, random_state, lambda cells: cells.sum())
+
+
+def bootstrap(table, metric, num_replicates=1000, **kwargs):
+    """Values of a metric over bootstrap replicates of a table
+
+    The metric is called once, on all replicates together, so it must be
+    computed from sufficient statistics (as all metrics in
+    ``pymaptools.metrics`` are). Keyword arguments are passed to
+    ``bootstrap_stats``.
+    """
+    return metric(bootstrap_stats(table, num_replicates, **kwargs))
+
+
+def permutation_test(table, metric, num_replicates=1000, **kwargs):
+    """Test whether a metric value is higher than expected by chance
+
+    Returns the observed value, a one-sided p-value, and the values of the
+    metric on replicates drawn under the null hypothesis of independent
+    rows and columns. Keyword arguments are passed to ``permutation_stats``::
+
+        >>> from pymaptools import metrics
+        >>> from pymaptools.containers import CrossTab
+        >>> t = CrossTab(rows=[(20, 1), (2, 30)])
+        >>> observed, pvalue, null = permutation_test(
+        ...     t, metrics.mutual_info_score, 200, random_state=0)
+        >>> pvalue < 0.01
+        True
+    """
+    observed = metric(table)
+    null_values = metric(permutation_stats(table, num_replicates, **kwargs))
+    pvalue = (1.0 + np.sum(null_values >= observed)) / (1.0 + len(null_values))
+    return observed, pvalue, null_values
+
+
+def percentile_interval(values, confidence=0.95):
+    """Percentile confidence interval from resampled metric values
+
+    ::
+
+        >>> percentile_interval(np.arange(101), confidence=0.5)
+        (25.0, 75.0)
+    """
+    tail = 50.0 * (1.0 - confidence)
+    low, high = np.percentile(values, [tail, 100.0 - tail])
+    return float(low), float(high)
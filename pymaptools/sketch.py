@@ -0,0 +1,301 @@
+"""
+Approximate contingency tables for very high-cardinality labels
+
+``SketchCrossTab`` keeps exact row and column margins, but instead of storing
+individual cells it maintains two linear sketches of the cell counts:
+
+- a count sketch [1]_, used for point estimates of individual cells and for
+  estimating the second moment of cell counts (which pair-counting metrics
+  such as adjusted Rand index depend on);
+- a projection on maximally skewed stable random variables [2]_, used for
+  estimating joint entropy (which mutual information and V-measure depend on).
+
+Both sketches are linear, so tables built on separate shards can be merged
+by adding them up, and observations can be removed by adding negative counts.
+Metrics from ``pymaptools.metrics`` accept ``SketchCrossTab`` instances
+directly::
+
+    >>> from pymaptools import metrics
+    >>> t = SketchCrossTab.from_labels([0, 0, 0, 1, 1, 1], [0, 0, 1, 1, 2, 2])
+    >>> print "%.4f" % metrics.adjusted_rand_score(t)
+    0.2424
+
+Cells are identified by Python hashes of ``(row_label, col_label)`` tuples, so
+tables to be merged must be built by processes using the same hash seed (the
+default for Python 2 unless ``-R`` or ``PYTHONHASHSEED`` are used).
+
+References
+----------
+
+.. [1] `Charikar, M., Chen, K., & Farach-Colton, M. (2004). Finding frequent
+        items in data streams. Theoretical Computer Science, 312(1), 3-15.
+        <http://dx.doi.org/10.1016/S0304-3975(03)00400-6>`_
+.. [2] `Clifford, P., & Cosma, I. (2013). A simple sketching algorithm for
+        entropy estimation over streaming data. In AISTATS (pp. 196-206).
+        <http://proceedings.mlr.press/v31/clifford13a.html>`_
+"""
+
+import numpy as np
+from math import ceil, log
+from itertools import izip
+from collections import Counter
+from pymaptools.sparse import SparseCrossTab
+
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def mix64(keys):
+    """SplitMix64 finalizer applied to an array of unsigned 64-bit integers
+    """
+    keys = keys + _GOLDEN
+    keys = (keys ^ (keys >> np.uint64(30))) * _MIX1
+    keys = (keys ^ (keys >> np.uint64(27))) * _MIX2
+    return keys ^ (keys >> np.uint64(31))
+
+
+def _to_unit_interval(keys):
+    """Map hashes to uniform floats in the open interval (0, 1)
+    """
+    return ((keys >> np.uint64(11)).astype(np.float64) + 0.5) / float(1 << 53)
+
+
+def skewed_stable(keys):
+    """Maximally skewed 1-stable variables derived from hashes
+
+    Generates ``X ~ S(alpha=1, beta=-1, gamma=pi/2, delta=0)`` with the
+    Chambers-Mallows-Stuck method, using two hash-derived uniforms per key.
+    Such variables satisfy ``E[exp(t X)] = exp(t log t)`` for ``t > 0``.
+    """
+    uniform = np.pi * (_to_unit_interval(keys) - 0.5)
+    exponential = -np.log(_to_unit_interval(mix64(keys)))
+    half_pi = np.pi / 2.0
+    shifted = half_pi - uniform
+    standard = (shifted * np.tan(uniform) +
+                np.log(half_pi * exponential * np.cos(uniform) / shifted)) / half_pi
+    return half_pi * standard - log(half_pi)
+
+
+def _seeds(seed, num):
+    return mix64(np.arange(num, dtype=np.uint64) + np.uint64(seed) * np.uint64(num + 1))
+
+
+class SketchCrossTab(object):
+
+    """Approximate contingency table with exact margins
+
+    ::
+
+        >>> t = SketchCrossTab.from_labels(['a', 'a', 'b'], ['x', 'y', 'y'])
+        >>> t['a', 'y'], t.grand_total, t.shape
+        (1, 3, (2, 2))
+        >>> t['a', 'z']
+        Traceback (most recent call last):
+        KeyError: ('a', 'z')
+
+    Parameters
+    ----------
+    depth : int
+        Number of hash rows in the count sketch (failure probability of
+        estimates decreases exponentially with depth)
+    width : int
+        Number of counters per hash row (relative error of second moment
+        estimates decreases as ``1 / sqrt(width)``)
+    num_projections : int
+        Number of stable projections for entropy estimation (error of entropy
+        estimates decreases as ``1 / sqrt(num_projections)``)
+    seed : int
+        Hash seed (tables must share it to be merged)
+    """
+
+    def __init__(self, depth=5, width=1 << 14, num_projections=512, seed=0):
+        self.depth = depth
+        self.width = width
+        self.num_projections = num_projections
+        self.seed = seed
+        self.row_totals = Counter()
+        self.col_totals = Counter()
+        self.grand_total = 0
+        self._counts = np.zeros((depth, width), dtype=np.int64)
+        self._projections = np.zeros(num_projections, dtype=np.float64)
+        self._row_seeds = _seeds(seed, depth)
+        self._projection_seeds = _seeds(seed + 1, num_projections)
+
+    @classmethod
+    def from_error_bounds(cls, epsilon=0.05, delta=0.01, seed=0):
+        """Size the sketches for a relative error and a failure probability
+
+        Width and number of projections grow as ``O(1 / epsilon ** 2)`` and
+        depth as ``O(log(1 / delta))``::
+
+            >>> t = SketchCrossTab.from_error_bounds(epsilon=0.1, delta=0.05)
+            >>> t.depth, t.width, t.num_projections
+            (3, 800, 400)
+        """
+        size = int(ceil(4.0 / epsilon ** 2))
+        return cls(depth=int(ceil(log(1.0 / delta))),
+                   width=2 * size, num_projections=size, seed=seed)
+
+    @classmethod
+    def from_labels(cls, labels_true, labels_pred, **kwargs):
+        """Instantiate from two arrays of observations (labels)
+        """
+        table = cls(**kwargs)
+        table.add_batch(labels_true, labels_pred)
+        return table
+
+    @property
+    def nbytes(self):
+        """Memory taken by cell sketches (margins not included)
+        """
+        return self._counts.nbytes + self._projections.nbytes
+
+    @property
+    def shape(self):
+        return len(self.row_totals), len(self.col_totals)
+
+    def _hash_cells(self, row_labels, col_labels):
+        return np.array(
+            [hash(key) for key in izip(row_labels, col_labels)],
+            dtype=np.int64).view(np.uint64)
+
+    def _update_cells(self, keys, weights):
+        width = np.uint64(self.width)
+        for row_idx, row_seed in enumerate(self._row_seeds):
+            hashes = mix64(keys ^ row_seed)
+            buckets = (hashes % width).astype(np.intp)
+            signs = np.where(hashes >> np.uint64(63), -1.0, 1.0)
+            self._counts[row_idx] += np.rint(np.bincount(
+                buckets, weights=signs * weights,
+                minlength=self.width)).astype(np.int64)
+        # bound memory used by (keys x projections) matrices
+        chunk = max(1, (1 << 20) // self.num_projections)
+        seeds = self._projection_seeds[np.newaxis, :]
+        for start in xrange(0, len(keys), chunk):
+            variables = skewed_stable(mix64(keys[start:start + chunk, np.newaxis] ^ seeds))
+            self._projections += weights[start:start + chunk].dot(variables)
+
+    def add(self, row_label, col_label, count=1):
+        """Add (or, with a negative count, remove) observations
+        """
+        self.add_batch([row_label], [col_label], count=count)
+
+    def add_batch(self, labels_true, labels_pred, count=1):
+        """Add (or, with ``count=-1``, remove) a batch of observations
+
+        Label pairs are tabulated first, so cells are hashed once per batch
+        """
+        batch = SparseCrossTab.from_labels(labels_true, labels_pred)
+        for totals, labels, margin in (
+                (self.row_totals, batch.row_labels, batch.row_margin),
+                (self.col_totals, batch.col_labels, batch.col_margin)):
+            for label, total in izip(labels.tolist(), margin.tolist()):
+                new_total = totals[label] + count * total
+                if new_total:
+                    totals[label] = new_total
+                else:
+                    del totals[label]
+        self.grand_total += count * batch.grand_total
+        ltrue, lpred, weights = batch.to_weighted_labels()
+        keys = self._hash_cells(ltrue.tolist(), lpred.tolist())
+        self._update_cells(keys, count * weights.astype(np.float64))
+
+    def _check_compatible(self, other):
+        params = ('depth', 'width', 'num_projections', 'seed')
+        if any(getattr(self, name) != getattr(other, name) for name in params):
+            raise ValueError("Cannot merge sketches with different parameters")
+
+    def merge(self, *others):
+        """Add counts from other sketches built with the same parameters
+
+        ::
+
+            >>> t1 = SketchCrossTab.from_labels([1, 1], ['x', 'y'])
+            >>> t2 = SketchCrossTab.from_labels([1, 2], ['x', 'y'])
+            >>> t1.merge(t2)[1, 'x'], t1.grand_total, t1.shape
+            (2, 4, (2, 2))
+        """
+        for other in others:
+            self._check_compatible(other)
+            self.row_totals.update(other.row_totals)
+            self.col_totals.update(other.col_totals)
+            self.grand_total += other.grand_total
+            self._counts += other._counts
+            self._projections += other._projections
+        return self
+
+    def __iadd__(self, other):
+        return self.merge(other)
+
+    def __add__(self, other):
+        result = self.__class__(self.depth, self.width, self.num_projections, self.seed)
+        return result.merge(self, other)
+
+    def __contains__(self, item):
+        ri, ci = item
+        return ri in self.row_totals and ci in self.col_totals
+
+    def __getitem__(self, key):
+        """Point estimate of a cell count (median over hash rows)
+        """
+        if key not in self:
+            raise KeyError(key)
+        keys = self._hash_cells([key[0]], [key[1]])
+        width = np.uint64(self.width)
+        estimates = []
+        for row_idx, row_seed in enumerate(self._row_seeds):
+            hashes = mix64(keys ^ row_seed)
+            sign = -1 if hashes[0] >> np.uint64(63) else 1
+            estimates.append(sign * self._counts[row_idx, int(hashes[0] % width)])
+        estimate = int(np.median(estimates))
+        upper = min(self.row_totals[key[0]], self.col_totals[key[1]])
+        return max(0, min(estimate, upper))
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+    def estimate_f2(self):
+        """Estimate the sum of squared cell counts
+        """
+        return float(np.median((self._counts.astype(np.float64) ** 2).sum(axis=1)))
+
+    def estimate_entropy(self):
+        """Estimate joint entropy of row and column variables (in nats)
+        """
+        n = self.grand_total
+        if n <= 0:
+            return 0.0
+        scaled = self._projections / n
+        # log-mean-exp computed stably
+        top = scaled.max()
+        return -(top + log(np.exp(scaled - top).mean()))
+
+    @property
+    def live_stats(self):
+        """Estimated sums in the layout of ``CrossTab.live_stats``
+
+        Margin sums are exact; the cell sums are estimated from the
+        sketches and clipped to the range allowed by the margins.
+        """
+        n = float(self.grand_total)
+        rows = np.fromiter(self.row_totals.itervalues(), dtype=np.float64)
+        cols = np.fromiter(self.col_totals.itervalues(), dtype=np.float64)
+        comb2_rows = (rows * (rows - 1.0)).sum() / 2.0
+        comb2_cols = (cols * (cols - 1.0)).sum() / 2.0
+        xlogx_rows = (rows * np.log(np.maximum(rows, 1.0))).sum()
+        xlogx_cols = (cols * np.log(np.maximum(cols, 1.0))).sum()
+        comb2_cells = min(max((self.estimate_f2() - n) / 2.0, 0.0),
+                          comb2_rows, comb2_cols)
+        if n > 0:
+            n_log_n = n * log(n)
+            h_rows = (n_log_n - xlogx_rows) / n
+            h_cols = (n_log_n - xlogx_cols) / n
+            # joint entropy is bounded by marginal entropies
+            entropy = min(max(self.estimate_entropy(), h_rows, h_cols), h_rows + h_cols)
+            xlogx_cells = n_log_n - n * entropy
+        else:
+            xlogx_cells = 0.0
+        return [n, comb2_cells, comb2_rows, comb2_cols,
+                xlogx_cells, xlogx_rows, xlogx_cols]
@@ -1,10 +1,14 @@
+import os
 import numpy as np
 from functools import partial
 from itertools import izip
 from tqdm import tqdm
-from scipy.sparse import coo_matrix
-from pymaptools.containers import DefaultOrderedDict
-from collections import defaultdict
+from scipy.sparse import coo_matrix, csr_matrix, issparse
+from pymaptools.containers import CrossTab, DefaultOrderedDict, SLICE_ALL, \
+    _pack_values, _canonical_digest
+from pymaptools._cyordereddict import OrderedDict
+from pymaptools.iter import iter_items
+from collections import defaultdict, Mapping
 
 
 def dd2coo(dd, dtype=np.float32):
@@ -78,3 +82,1012 @@ def iter_csr(mat, transpose=False, show_progress=False):
     if show_progress:
         iterator = tqdm(iterator, total=mat.nnz)
     return iterator
+
+
+# arrays making up the on-disk format of SparseCrossTab
+CROSSTAB_LABELS = ('row_labels', 'col_labels')
+CROSSTAB_MARGINS = ('row_margin', 'col_margin')
+CROSSTAB_CELLS = ('indptr', 'indices', 'data')
+
+
+def save_arrays(path, arrays, compressed=False):
+    """Save named arrays to an .npz file or to a directory of .npy files
+    """
+    if path.endswith('.npz'):
+        savez = np.savez_compressed if compressed else np.savez
+        savez(path, **arrays)
+    else:
+        if not os.path.exists(path):
+            os.makedirs(path)
+        for name, arr in arrays.iteritems():
+            np.save(os.path.join(path, name + '.npy'), arr)
+
+
+def load_arrays(path, names, mmap_mode=None, mmap_names=()):
+    """Load named arrays saved with ``save_arrays``
+
+    Arrays listed in ``mmap_names`` are memory-mapped when ``mmap_mode`` is
+    given, which is only possible with the directory format. Members of .npz
+    files are read only when requested, so loading a subset of names does not
+    read the others.
+    """
+    if path.endswith('.npz'):
+        if mmap_mode is not None:
+            raise ValueError("Memory mapping requires the directory format")
+        npz = np.load(path, allow_pickle=True)
+        try:
+            return {name: npz[name] for name in names}
+        finally:
+            npz.close()
+    result = {}
+    for name in names:
+        fname = os.path.join(path, name + '.npy')
+        if name in mmap_names and mmap_mode is not None:
+            result[name] = np.load(fname, mmap_mode=mmap_mode)
+        else:
+            result[name] = np.load(fname, allow_pickle=True)
+    return result
+
+
+def _pack_array(values):
+    """Pack an array like ``containers._pack_values`` packs a list
+
+    Numeric arrays are packed from their buffers without leaving NumPy
+    """
+    kind = values.dtype.kind
+    if kind == 'f' and np.all(np.mod(values, 1) == 0):
+        kind = 'i'
+    if kind in 'iu':
+        return 'q', values.astype('<i8').tobytes()
+    if kind == 'f':
+        return 'd', values.astype('<f8').tobytes()
+    return _pack_values(values.tolist())
+
+
+def label_array(labels):
+    """Pack a sequence of hashable labels into a 1-D array
+
+    NumPy arrays are passed through as is; other sequences are packed into
+    object arrays so that tuples and mixed-type labels survive intact::
+
+        >>> label_array([('a', 1), ('b', 2)]).tolist()
+        [('a', 1), ('b', 2)]
+    """
+    if isinstance(labels, np.ndarray) and labels.ndim == 1:
+        return labels
+    labels = list(labels)
+    result = np.empty(len(labels), dtype=object)
+    for idx, label in enumerate(labels):
+        result[idx] = label
+    return result
+
+
+def table_to_coo(rows):
+    """Convert a table to row labels, column labels, and a COO matrix
+
+    The table can be either a mapping or a sequence of rows, and each row can
+    be either a mapping or a sequence. Column labels are listed in the order
+    of first appearance, and zero cells still register their columns::
+
+        >>> rlabels, clabels, mat = table_to_coo([{'x': 2}, {'y': 0}])
+        >>> list(rlabels), list(clabels), mat.toarray().tolist()
+        ([0, 1], ['x', 'y'], [[2, 0], [0, 0]])
+    """
+    if isinstance(rows, Mapping):
+        row_labels = label_array(rows.iterkeys())
+        row_iter = rows.itervalues()
+    else:
+        rows = list(rows)
+        row_labels = np.arange(len(rows))
+        row_iter = iter(rows)
+
+    col_map = {}
+    col_labels = []
+    row_indices = []
+    col_indices = []
+    values = []
+    for row_idx, row in enumerate(row_iter):
+        for col_label, cell in iter_items(row):
+            try:
+                col_idx = col_map[col_label]
+            except KeyError:
+                col_idx = col_map[col_label] = len(col_labels)
+                col_labels.append(col_label)
+            if cell:
+                row_indices.append(row_idx)
+                col_indices.append(col_idx)
+                values.append(cell)
+
+    if isinstance(rows, Mapping) or not rows or isinstance(rows[0], Mapping):
+        col_labels = label_array(col_labels)
+    else:
+        col_labels = np.arange(len(col_labels))
+    values = np.asarray(values) if values else np.zeros(0, dtype=np.int64)
+    matrix = coo_matrix(
+        (values, (row_indices, col_indices)),
+        shape=(len(row_labels), len(col_labels)))
+    return row_labels, col_labels, matrix
+
+
+def as_label_array(labels):
+    """Convert a sequence of labels to an array suitable for factorizing
+
+    Numeric and boolean sequences become typed arrays, anything else (strings,
+    tuples, mixed types) is packed into an object array::
+
+        >>> as_label_array([3, 1, 2]).dtype.kind
+        'i'
+        >>> as_label_array([1, 'a']).tolist()
+        [1, 'a']
+    """
+    if isinstance(labels, np.ndarray):
+        return labels.ravel()
+    labels = list(labels)
+    result = np.asarray(labels)
+    if result.ndim != 1 or result.dtype.kind not in 'biuf':
+        result = label_array(labels)
+    return result
+
+
+def factorize(labels):
+    """Encode labels as integer codes
+
+    Returns an array of unique (sorted) labels and an array of codes such that
+    ``uniques[codes]`` reconstructs the input::
+
+        >>> uniques, codes = factorize(['b', 'a', 'b', 'c'])
+        >>> uniques.tolist(), codes.tolist()
+        (['a', 'b', 'c'], [1, 0, 1, 2])
+
+    Integer labels spanning a range not much wider than their number are
+    encoded in linear time without sorting::
+
+        >>> uniques, codes = factorize([7, 5, 7, 9])
+        >>> uniques.tolist(), codes.tolist()
+        ([5, 7, 9], [1, 0, 1, 2])
+    """
+    labels = as_label_array(labels)
+    if labels.dtype.kind in 'iu' and len(labels):
+        low = labels.min()
+        span = int(labels.max()) - int(low) + 1
+        if span <= 4 * len(labels):
+            offsets = (labels - low).astype(np.intp)
+            present = np.bincount(offsets, minlength=span) > 0
+            codes = np.cumsum(present) - 1
+            uniques = (np.flatnonzero(present) + low).astype(labels.dtype)
+            return uniques, codes[offsets]
+    return np.unique(labels, return_inverse=True)
+
+
+def concat_labels(arrays):
+    """Concatenate label arrays without coercing labels to a common type
+
+    Arrays of the same kind (or all numeric) are concatenated as is,
+    otherwise the result is an object array::
+
+        >>> concat_labels([np.array([1, 2]), np.array(['a'])]).tolist()
+        [1, 2, 'a']
+    """
+    kinds = set(arr.dtype.kind for arr in arrays)
+    if len(kinds) > 1 and not kinds.issubset(set('biuf')):
+        arrays = [arr.astype(object) for arr in arrays]
+    return np.concatenate(arrays)
+
+
+def _flatten_partition(partition):
+    """Convert a partition to arrays of cluster labels and elements
+    """
+    cluster_ids = []
+    sizes = []
+    elements = []
+    for cluster_id, cluster in iter_items(partition):
+        cluster = list(cluster)
+        cluster_ids.append(cluster_id)
+        sizes.append(len(cluster))
+        elements.extend(cluster)
+    labels = np.repeat(as_label_array(cluster_ids), sizes)
+    return labels, as_label_array(elements)
+
+
+def _find_duplicate(sorted_elements):
+    """Return the first duplicate in a sorted array (None if none found)
+    """
+    dup_mask = sorted_elements[1:] == sorted_elements[:-1]
+    if dup_mask.any():
+        return sorted_elements[1:][dup_mask][0]
+    return None
+
+
+def partitions_to_label_arrays(p1, p2):
+    """Vectorized variant of ``partitions_to_labels``
+
+    Jointly encodes a pair of partitions as arrays of labels. Points are
+    ordered by element value instead of by order of appearance::
+
+        >>> Y1 = [(1, 2, 3), (4, 5, 6)]
+        >>> Y2 = [(1, 2), (3, 4, 5), (6,)]
+        >>> a, b = partitions_to_label_arrays(Y1, Y2)
+        >>> a.tolist(), b.tolist()
+        ([0, 0, 0, 1, 1, 1], [0, 0, 1, 1, 1, 2])
+
+    The same validity checks as in ``partitions_to_labels`` apply::
+
+        >>> Y1 = [(1, 2, 3), (4, 5, 6, 3)]
+        >>> partitions_to_label_arrays(Y1, Y2)
+        Traceback (most recent call last):
+        ValueError: Element '3' is in more than one cluster in p1
+
+        >>> Y1 = [(1, 2, 3), (4, 5, 6)]
+        >>> Y2 = [(1, 2), (3, 4, 5), (6, 30)]
+        >>> partitions_to_label_arrays(Y1, Y2)
+        Traceback (most recent call last):
+        ValueError: Element '30' of p2 is not in p1
+
+        >>> Y1 = [(1, 2, 3), (4, 5, 6, 30)]
+        >>> Y2 = [(1, 2), (3, 4, 5), (6,)]
+        >>> partitions_to_label_arrays(Y1, Y2)
+        Traceback (most recent call last):
+        ValueError: 1 element(s) of p1 not in p2
+    """
+    labels1, elements1 = _flatten_partition(p1)
+    labels2, elements2 = _flatten_partition(p2)
+
+    order1 = np.argsort(elements1, kind='mergesort')
+    order2 = np.argsort(elements2, kind='mergesort')
+    sorted1 = elements1[order1]
+    sorted2 = elements2[order2]
+
+    for name, sorted_elements in (('p1', sorted1), ('p2', sorted2)):
+        duplicate = _find_duplicate(sorted_elements)
+        if duplicate is not None:
+            raise ValueError("Element '%s' is in more than one cluster in %s"
+                             % (duplicate, name))
+
+    if len(sorted1) != len(sorted2) or not np.array_equal(sorted1, sorted2):
+        missing_mask = ~np.in1d(sorted2, sorted1)
+        if missing_mask.any():
+            raise ValueError("Element '%s' of p2 is not in p1"
+                             % sorted2[missing_mask][0])
+        raise ValueError("%d element(s) of p1 not in p2"
+                         % (len(sorted1) - len(sorted2)))
+
+    return labels1[order1], labels2[order2]
+
+
+def _iter_lines(matrix, labels, other_labels):
+    """Iterate over compressed rows (or columns) of a CSR (or CSC) matrix
+
+    Yields a label followed by lists of labels and values of nonzero cells
+    """
+    indptr = matrix.indptr
+    indices = matrix.indices
+    data = matrix.data
+    for label, start, end in izip(labels.tolist(), indptr[:-1].tolist(),
+                                  indptr[1:].tolist()):
+        yield label, other_labels[indices[start:end]].tolist(), \
+            data[start:end].tolist()
+
+
+class SparseCrossTab(CrossTab):
+
+    """Array-backed variant of ``CrossTab``
+
+    Row and column labels are kept in index arrays, while counts are kept in
+    a pair of SciPy sparse matrices (CSR for row access and CSC for column
+    access, the latter built on first use).  Margins, grand total, dense views
+    and iteration are computed with vectorized reductions instead of loops
+    over nested ``Counter`` objects, which matters for very large tables such
+    as the ones built when comparing two clusterings.
+
+    The interface is the same as that of ``CrossTab``::
+
+        >>> t1 = SparseCrossTab(rows=[(1, 5), (4, 6)])
+        >>> t1.to_rows()
+        [[1, 5], [4, 6]]
+        >>> t1.grand_total
+        16
+        >>> t1[1, 0]
+        4
+        >>> t1[0, :]
+        [1, 5]
+
+        >>> t2 = SparseCrossTab(cols=[(0, 1), (45, 1)])
+        >>> t2.to_rows()
+        [[0, 45], [1, 1]]
+        >>> t2[:, 1]
+        [45, 1]
+        >>> t2[1:, :]
+        [[1, 1]]
+
+        >>> t3 = SparseCrossTab(rows={'a': {'x': 2, 'y': 3}, 'b': {'x': 4}})
+        >>> t3.shape
+        (2, 2)
+        >>> t3['b', 'y']
+        0
+        >>> t3['b', 'z']
+        Traceback (most recent call last):
+        KeyError: ('b', 'z')
+        >>> t3[:, 'z']
+        Traceback (most recent call last):
+        KeyError: 'z'
+        >>> sorted(t3.items())
+        [(('a', 'x'), 2), (('a', 'y'), 3), (('b', 'x'), 4)]
+        >>> sorted(t3.iter_all_with_margins())
+        [(4, 3, 0), (4, 6, 4), (5, 3, 3), (5, 6, 2)]
+        >>> map(len, [t1, t2, t3])
+        [4, 3, 3]
+
+    Margins are also available as arrays aligned with ``row_labels`` and
+    ``col_labels``::
+
+        >>> t1.row_margin.tolist(), t1.col_margin.tolist()
+        ([6, 10], [5, 11])
+
+    Unlike ``CrossTab``, the ``rows`` and ``cols`` properties are read-only
+    views materialized from the sparse matrices on first access, and tables
+    are rebuilt by every ``add`` or ``add_batch`` call (so updates should be
+    batched).
+
+    See Also
+    --------
+    CrossTab
+    """
+
+    def __init__(self, rows=None, cols=None):
+        if rows is not None:
+            row_labels, col_labels, matrix = table_to_coo(rows)
+        elif cols is not None:
+            col_labels, row_labels, matrix = table_to_coo(cols)
+            matrix = matrix.T
+        else:
+            row_labels = col_labels = np.zeros(0, dtype=np.int64)
+            matrix = csr_matrix((0, 0), dtype=np.int64)
+        self._set_matrix(matrix, row_labels, col_labels)
+
+    @classmethod
+    def from_matrix(cls, matrix, row_labels=None, col_labels=None):
+        """Instantiate from a 2D array or a SciPy sparse matrix
+
+        If labels are not given, row and column indices are used as labels::
+
+            >>> t = SparseCrossTab.from_matrix(np.array([[1, 0], [2, 3]]),
+            ...                                col_labels=['x', 'y'])
+            >>> t[1, 'y']
+            3
+        """
+        if not issparse(matrix):
+            matrix = np.atleast_2d(np.asarray(matrix))
+        num_rows, num_cols = matrix.shape
+        if row_labels is None:
+            row_labels = np.arange(num_rows)
+        if col_labels is None:
+            col_labels = np.arange(num_cols)
+        obj = cls.__new__(cls)
+        obj._set_matrix(matrix, row_labels, col_labels)
+        return obj
+
+    @classmethod
+    def from_labels(cls, labels_true, labels_pred):
+        """Instantiate from two arrays of observations (labels)
+
+        Labels are factorized into integer codes and pairs of codes are
+        counted in a single vectorized pass, so the inputs can be large NumPy
+        arrays (any sequence works too)::
+
+            >>> a = [0, 2, 1, 1, 0, 3, 1, 3, 0, 1]
+            >>> b = [0, 1, 1, 1, 0, 2, 1, 2, 3, 1]
+            >>> SparseCrossTab.from_labels(a, b).to_rows()
+            [[2, 0, 0, 1], [0, 4, 0, 0], [0, 1, 0, 0], [0, 0, 2, 0]]
+        """
+        row_labels, row_codes = factorize(labels_true)
+        col_labels, col_codes = factorize(labels_pred)
+        num_points = len(row_codes)
+        if num_points != len(col_codes):
+            raise ValueError("Label arrays differ in length (%d vs %d)"
+                             % (num_points, len(col_codes)))
+        shape = (len(row_labels), len(col_labels))
+        num_cells = shape[0] * shape[1]
+        if num_cells <= max(num_points, 1024):
+            # dense enough to count all cells in one bincount
+            keys = row_codes * shape[1] + col_codes
+            counts = np.bincount(keys, minlength=num_cells).reshape(shape)
+            matrix = csr_matrix(counts)
+        else:
+            ones = np.ones(num_points, dtype=np.intc)
+            matrix = coo_matrix((ones, (row_codes, col_codes)), shape=shape).tocsr()
+            matrix.data = matrix.data.astype(np.int64)
+        return cls.from_matrix(matrix, row_labels, col_labels)
+
+    @classmethod
+    def from_weighted_labels(cls, labels_true, labels_pred, weights):
+        """Instantiate from arrays of labels and observation counts
+
+        ::
+
+            >>> t = SparseCrossTab.from_weighted_labels(['a', 'b', 'a'], [1, 1, 1], [5, 2, 1])
+            >>> t.to_rows()
+            [[6], [2]]
+        """
+        row_labels, row_codes = factorize(labels_true)
+        col_labels, col_codes = factorize(labels_pred)
+        weights = np.asarray(weights)
+        if not len(row_codes) == len(col_codes) == len(weights):
+            raise ValueError("Label and weight arrays differ in length")
+        matrix = coo_matrix((weights, (row_codes, col_codes)),
+                            shape=(len(row_labels), len(col_labels))).tocsr()
+        return cls.from_matrix(matrix, row_labels, col_labels)
+
+    def to_weighted_labels(self):
+        """Run-length form of ``to_labels`` as NumPy arrays
+
+        Returns arrays of row labels, column labels, and counts with one
+        entry per nonzero cell::
+
+            >>> t = SparseCrossTab.from_labels([0, 0, 0, 1, 1], [0, 0, 1, 1, 1])
+            >>> [arr.tolist() for arr in t.to_weighted_labels()]
+            [[0, 0, 1], [0, 1, 1], [2, 1, 2]]
+        """
+        csr = self._csr
+        row_ids = np.repeat(np.arange(csr.shape[0]), np.diff(csr.indptr))
+        return self._row_labels[row_ids], self._col_labels[csr.indices], csr.data.copy()
+
+    def to_label_arrays(self):
+        """Expand the table into two NumPy arrays of labels
+
+        Labels are expanded with ``np.repeat`` from the run-length form::
+
+            >>> t = SparseCrossTab.from_labels([0, 0, 0, 1, 1], [0, 0, 1, 1, 1])
+            >>> [arr.tolist() for arr in t.to_label_arrays()]
+            [[0, 0, 0, 1, 1], [0, 0, 1, 1, 1]]
+        """
+        ltrue, lpred, weights = self.to_weighted_labels()
+        return np.repeat(ltrue, weights), np.repeat(lpred, weights)
+
+    def to_labels(self):
+        """Returns a tuple ([a], [b]). Inverse of ``from_labels``
+        """
+        ltrue, lpred = self.to_label_arrays()
+        return ltrue.tolist(), lpred.tolist()
+
+    @classmethod
+    def from_partitions(cls, partitions1, partitions2):
+        """Instantiate from two partitions
+
+        ::
+
+            >>> p1 = [(1, 2, 3), (4, 5, 6)]
+            >>> p2 = [(1, 2), (3, 4, 5), (6,)]
+            >>> SparseCrossTab.from_partitions(p1, p2).to_rows()
+            [[2, 1, 0], [0, 2, 1]]
+        """
+        ltrue, lpred = partitions_to_label_arrays(partitions1, partitions2)
+        return cls.from_labels(ltrue, lpred)
+
+    @classmethod
+    def from_clusters(cls, clusters):
+        """Instantiate from class-coded clustering representation
+
+        ::
+
+            >>> clusters = [[2, 2, 0, 0, 1], [2, 2, 0], [0, 1, 1], [2]]
+            >>> SparseCrossTab.from_clusters(clusters).to_clusters()
+            [[0, 0, 1, 2, 2], [0, 2, 2], [0, 1, 1], [2]]
+        """
+        lpred, ltrue = _flatten_partition(clusters)
+        return cls.from_labels(ltrue, lpred)
+
+    def merge(self, *others):
+        """Add counts from other tables to this one (in place)
+
+        Labels of all tables are aligned in a single factorization pass, so
+        the merged table has sorted row and column labels::
+
+            >>> t1 = SparseCrossTab.from_labels([1, 1, 2], ['x', 'y', 'y'])
+            >>> t2 = SparseCrossTab.from_labels([0, 2], ['y', 'z'])
+            >>> t1.merge(t2).to_rows()
+            [[0, 1, 0], [1, 1, 0], [0, 1, 1]]
+            >>> t1.row_labels.tolist(), t1.col_labels.tolist()
+            ([0, 1, 2], ['x', 'y', 'z'])
+        """
+        self._set_matrix(*self._merged(others))
+        return self
+
+    def _merged(self, others):
+        """Matrix and labels of this table merged with others
+        """
+        tables = [self]
+        for other in others:
+            if not isinstance(other, SparseCrossTab):
+                other = SparseCrossTab(rows=other.rows)
+            tables.append(other)
+        row_labels, row_codes = factorize(concat_labels([t._row_labels for t in tables]))
+        col_labels, col_codes = factorize(concat_labels([t._col_labels for t in tables]))
+        row_indices = []
+        col_indices = []
+        values = []
+        row_offset = col_offset = 0
+        for table in tables:
+            num_rows, num_cols = table.shape
+            coo = table._csr.tocoo()
+            row_indices.append(row_codes[row_offset:row_offset + num_rows][coo.row])
+            col_indices.append(col_codes[col_offset:col_offset + num_cols][coo.col])
+            values.append(coo.data)
+            row_offset += num_rows
+            col_offset += num_cols
+        matrix = coo_matrix(
+            (np.concatenate(values), (np.concatenate(row_indices), np.concatenate(col_indices))),
+            shape=(len(row_labels), len(col_labels))).tocsr()
+        return matrix, row_labels, col_labels
+
+    def add(self, row_label, col_label, count=1):
+        """Add observations to a cell
+
+        Compressed sparse matrices cannot be updated in constant time, so
+        every call rebuilds the table. For streaming updates, use ``CrossTab``
+        (or collect observations and pass them to ``add_batch``).
+        """
+        self.add_batch([row_label], [col_label], count=count)
+
+    def add_batch(self, labels_true, labels_pred, count=1):
+        """Add (or, with ``count=-1``, remove) a batch of observations
+
+        The batch is tabulated and merged in one vectorized pass that
+        rebuilds the table once; rows and columns whose totals drop to zero
+        are removed, and a batch that would leave negative counts changes
+        nothing::
+
+            >>> t = SparseCrossTab.from_labels([1, 1, 2], ['x', 'y', 'y'])
+            >>> t.add_batch([1, 2], ['x', 'z'], count=-1)
+            Traceback (most recent call last):
+            ValueError: Update would result in negative counts
+            >>> t.add_batch([1, 1], ['x', 'y'], count=-1)
+            >>> t.to_rows(), t.row_labels.tolist(), t.col_labels.tolist()
+            ([[1]], [2], ['y'])
+        """
+        if count == 0:
+            return
+        batch = self.from_labels(labels_true, labels_pred)
+        if count != 1:
+            batch._csr.data *= count
+        matrix, row_labels, col_labels = self._merged([batch])
+        if count < 0:
+            if (matrix.data < 0).any():
+                raise ValueError("Update would result in negative counts")
+            matrix.eliminate_zeros()
+            row_mask = np.diff(matrix.indptr) != 0
+            col_mask = np.bincount(matrix.indices, minlength=matrix.shape[1]) != 0
+            if not (row_mask.all() and col_mask.all()):
+                matrix = matrix[row_mask][:, col_mask]
+                row_labels = row_labels[row_mask]
+                col_labels = col_labels[col_mask]
+        self._set_matrix(matrix, row_labels, col_labels)
+
+    def save_to(self, path, compressed=False):
+        """Save table in a columnar binary format
+
+        If ``path`` ends with ``.npz``, arrays are stored in a single (and
+        optionally compressed) NumPy archive; otherwise ``path`` is a
+        directory in which every array is stored as a raw ``.npy`` file that
+        can be memory-mapped by ``load_from``. Margins are stored alongside
+        label and CSR arrays so that they can be read without touching cell
+        data (see ``load_margins``).
+        """
+        csr = self._csr
+        arrays = {
+            'row_labels': self._row_labels,
+            'col_labels': self._col_labels,
+            'row_margin': self.row_margin,
+            'col_margin': self.col_margin,
+            'indptr': csr.indptr,
+            'indices': csr.indices,
+            'data': csr.data,
+        }
+        save_arrays(path, arrays, compressed=compressed)
+
+    @classmethod
+    def load_from(cls, path, mmap_mode=None):
+        """Load table saved with ``save_to``
+
+        With the directory format, passing ``mmap_mode='r'`` memory-maps CSR
+        and margin arrays instead of reading them, so that several worker
+        processes can share one read-only table through the OS page cache.
+        Labels are always read into memory::
+
+            >>> import tempfile, shutil
+            >>> dirname = tempfile.mkdtemp()
+            >>> t = SparseCrossTab.from_labels([1, 1, 2], ['x', 'y', 'y'])
+            >>> t.save_to(dirname)
+            >>> t2 = SparseCrossTab.load_from(dirname, mmap_mode='r')
+            >>> t2.to_rows(), t2.col_labels.tolist(), t2.grand_total
+            ([[1, 1], [0, 1]], ['x', 'y'], 3)
+            >>> shutil.rmtree(dirname)
+        """
+        names = CROSSTAB_LABELS + CROSSTAB_MARGINS + CROSSTAB_CELLS
+        arrays = load_arrays(path, names, mmap_mode=mmap_mode,
+                             mmap_names=CROSSTAB_MARGINS + CROSSTAB_CELLS)
+        row_labels = arrays['row_labels']
+        col_labels = arrays['col_labels']
+        matrix = csr_matrix(
+            (arrays['data'], arrays['indices'], arrays['indptr']),
+            shape=(len(row_labels), len(col_labels)), copy=False)
+        # saved matrices are canonical; avoid scanning cell data to find out
+        matrix.has_canonical_format = True
+        obj = cls.__new__(cls)
+        obj._csr = matrix
+        obj._row_labels = row_labels
+        obj._col_labels = col_labels
+        obj._reset_cache()
+        obj._row_margin = arrays['row_margin']
+        obj._col_margin = arrays['col_margin']
+        return obj
+
+    @staticmethod
+    def load_margins(path):
+        """Read row and column labels with margins (no cell data)
+
+        Returns a tuple ``(row_labels, row_margin, col_labels, col_margin)``::
+
+            >>> import tempfile, shutil
+            >>> dirname = tempfile.mkdtemp()
+            >>> fname = dirname + '/table.npz'
+            >>> SparseCrossTab.from_labels([1, 1, 2], ['x', 'y', 'y']).save_to(fname)
+            >>> [arr.tolist() for arr in SparseCrossTab.load_margins(fname)]
+            [[1, 2], [2, 1], ['x', 'y'], [1, 2]]
+            >>> shutil.rmtree(dirname)
+        """
+        arrays = load_arrays(path, CROSSTAB_LABELS + CROSSTAB_MARGINS)
+        return (arrays['row_labels'], arrays['row_margin'],
+                arrays['col_labels'], arrays['col_margin'])
+
+    def _set_matrix(self, matrix, row_labels, col_labels):
+        matrix = csr_matrix(matrix)
+        if not matrix.has_canonical_format:
+            matrix = matrix.copy()
+            matrix.sum_duplicates()
+        if (matrix.data == 0).any():
+            matrix = matrix.copy()
+            matrix.eliminate_zeros()
+        row_labels = label_array(row_labels)
+        col_labels = label_array(col_labels)
+        if matrix.shape != (len(row_labels), len(col_labels)):
+            raise ValueError(
+                "Matrix shape %s does not match label dimensions %s"
+                % (matrix.shape, (len(row_labels), len(col_labels))))
+        self._csr = matrix
+        self._row_labels = row_labels
+        self._col_labels = col_labels
+        self._reset_cache()
+
+    def _reset_cache(self):
+        self._csc = None
+        self._rows = None
+        self._cols = None
+        self._row_totals = None
+        self._col_totals = None
+        self._grand_total = None
+        self._row_margin = None
+        self._col_margin = None
+        self._row_index = None
+        self._col_index = None
+        self._live_stats = None
+        self._canonical = None
+        self._canonical_arrays = None
+        self._content_hash = None
+
+    @property
+    def row_labels(self):
+        """Array of row labels
+        """
+        return self._row_labels
+
+    @property
+    def col_labels(self):
+        """Array of column labels
+        """
+        return self._col_labels
+
+    @property
+    def csr(self):
+        """Counts as a CSR matrix (rows correspond to ``row_labels``)
+        """
+        return self._csr
+
+    @property
+    def csc(self):
+        """Counts as a CSC matrix (columns correspond to ``col_labels``)
+        """
+        _csc = self._csc
+        if _csc is None:
+            self._csc = _csc = self._csr.tocsc()
+        return _csc
+
+    @property
+    def row_index(self):
+        """Mapping of row labels to row indices
+        """
+        _row_index = self._row_index
+        if _row_index is None:
+            self._row_index = _row_index = \
+                {label: idx for idx, label in enumerate(self._row_labels.tolist())}
+        return _row_index
+
+    @property
+    def col_index(self):
+        """Mapping of column labels to column indices
+        """
+        _col_index = self._col_index
+        if _col_index is None:
+            self._col_index = _col_index = \
+                {label: idx for idx, label in enumerate(self._col_labels.tolist())}
+        return _col_index
+
+    @property
+    def row_margin(self):
+        """Row totals as an array aligned with ``row_labels``
+        """
+        _row_margin = self._row_margin
+        if _row_margin is None:
+            self._row_margin = _row_margin = \
+                np.asarray(self._csr.sum(axis=1)).ravel()
+        return _row_margin
+
+    @property
+    def col_margin(self):
+        """Column totals as an array aligned with ``col_labels``
+        """
+        _col_margin = self._col_margin
+        if _col_margin is None:
+            self._col_margin = _col_margin = \
+                np.asarray(self._csr.sum(axis=0)).ravel()
+        return _col_margin
+
+    @property
+    def rows(self):
+        """Table rows (read-only view of nonzero cells)
+        """
+        _rows = self._rows
+        if _rows is None:
+            self._rows = _rows = OrderedDict()
+            for ri, col_labels, cells in self._iter_rows_nonzero():
+                _rows[ri] = OrderedDict(izip(col_labels, cells))
+        return _rows
+
+    @property
+    def cols(self):
+        """Table columns (read-only view of nonzero cells)
+        """
+        _cols = self._cols
+        if _cols is None:
+            self._cols = _cols = OrderedDict()
+            for ci, row_labels, cells in _iter_lines(self.csc, self._col_labels, self._row_labels):
+                _cols[ci] = OrderedDict(izip(row_labels, cells))
+        return _cols
+
+    def _iter_rows_nonzero(self):
+        return _iter_lines(self._csr, self._row_labels, self._col_labels)
+
+    @property
+    def row_totals(self):
+        """Row totals (right margin)
+        """
+        _row_totals = self._row_totals
+        if _row_totals is None:
+            self._row_totals = _row_totals = OrderedDict(
+                izip(self._row_labels.tolist(), self.row_margin.tolist()))
+        return _row_totals
+
+    @property
+    def col_totals(self):
+        """Column totals (bottom margin)
+        """
+        _col_totals = self._col_totals
+        if _col_totals is None:
+            self._col_totals = _col_totals = OrderedDict(
+                izip(self._col_labels.tolist(), self.col_margin.tolist()))
+        return _col_totals
+
+    @property
+    def grand_total(self):
+        """Grand total of all counts
+        """
+        _grand_total = self._grand_total
+        if _grand_total is None:
+            self._grand_total = _grand_total = self._csr.data.sum().item()
+        return _grand_total
+
+    @property
+    def shape(self):
+        return self._csr.shape
+
+    def to_rows(self, rslice=SLICE_ALL, cslice=SLICE_ALL, default=0, rpad=False, cpad=False):
+        """Dense representation of the table (or of a slice of it)
+
+        ::
+
+            >>> rows = [[7, 9, 6], [10, 7, 15], [11, 11, 7], [9, 4, 4]]
+            >>> t = SparseCrossTab(rows=rows)
+            >>> t.to_rows(rpad=True)
+            [[7, 9, 6, 0], [10, 7, 15, 0], [11, 11, 7, 0], [9, 4, 4, 0]]
+            >>> t.to_rows(slice(1, 3), slice(0, 2))
+            [[10, 7], [11, 11]]
+        """
+        R, C = self.shape
+        row_ids = np.arange(max(R, C) if cpad else R)[rslice]
+        col_ids = np.arange(C)[cslice]
+        real_ids = row_ids[row_ids < R]
+        block = self._csr[real_ids][:, col_ids].toarray()
+        if len(real_ids) < len(row_ids):
+            # padding rows always come after real rows
+            padding = np.zeros((len(row_ids) - len(real_ids), len(col_ids)), dtype=block.dtype)
+            block = np.vstack([block, padding])
+        if rpad and R > C:
+            block = np.hstack([block, np.zeros((len(row_ids), R - C), dtype=block.dtype)])
+        if default != 0:
+            block = block.astype(object)
+            block[block == 0] = default
+        return block.tolist()
+
+    # Canonical form
+
+    _canonical_type = 'arrays'
+
+    def canonical_arrays(self):
+        """Cells as a CSR matrix with sorted labels and no empty lines
+
+        Returns a tuple ``(row_labels, col_labels, indptr, indices, data)``
+        with rows and columns having no nonzero cells dropped and the rest
+        sorted by label. Tables with the same cell counts have equal canonical
+        arrays regardless of how they were constructed::
+
+            >>> t = SparseCrossTab.from_matrix(
+            ...     np.array([[0, 2], [0, 0], [3, 1]]), ['b', 'c', 'a'], ['y', 'x'])
+            >>> [arr.tolist() for arr in t.canonical_arrays()]
+            [['a', 'b'], ['x', 'y'], [0, 2, 3], [0, 1, 0], [1, 3, 2]]
+        """
+        canonical = self._canonical_arrays
+        if canonical is None:
+            matrix = self._csr
+            keep_rows = np.flatnonzero(np.diff(matrix.indptr))
+            keep_cols = np.flatnonzero(
+                np.bincount(matrix.indices, minlength=matrix.shape[1]))
+            row_labels = self._row_labels[keep_rows]
+            col_labels = self._col_labels[keep_cols]
+            row_order = np.argsort(row_labels, kind='mergesort')
+            col_order = np.argsort(col_labels, kind='mergesort')
+            matrix = matrix[keep_rows[row_order]][:, keep_cols[col_order]]
+            matrix.sort_indices()
+            self._canonical_arrays = canonical = (
+                row_labels[row_order], col_labels[col_order],
+                matrix.indptr, matrix.indices, matrix.data)
+        return canonical
+
+    @property
+    def content_hash(self):
+        """SHA-1 digest (in hex) of nonzero cells (see ``CrossTab.content_hash``)
+
+        Computed from buffers of ``canonical_arrays``::
+
+            >>> t = SparseCrossTab.from_labels([1, 1, 2], ['x', 'y', 'y'])
+            >>> t.content_hash == CrossTab(rows=t.rows).content_hash
+            True
+        """
+        content_hash = self._content_hash
+        if content_hash is None:
+            self._content_hash = content_hash = _canonical_digest(
+                *map(_pack_array, self.canonical_arrays()))
+        return content_hash
+
+    def _canonical_equal(self, other):
+        return all(np.array_equal(a, b) for a, b in
+                   izip(self.canonical_arrays(), other.canonical_arrays()))
+
+    # Mapping methods
+
+    def __contains__(self, item):
+        ri, ci = item
+        return ri in self.row_index and ci in self.col_index
+
+    def _column_slice(self, ci, cslice=SLICE_ALL):
+        try:
+            col_idx = self.col_index[ci]
+        except KeyError:
+            raise KeyError(ci)
+        return self.csc[:, col_idx].toarray().ravel()[cslice].tolist()
+
+    def _row_slice(self, ri, rslice=SLICE_ALL):
+        try:
+            row_idx = self.row_index[ri]
+        except KeyError:
+            raise KeyError(ri)
+        return self._csr[row_idx].toarray().ravel()[rslice].tolist()
+
+    def __getitem__(self, key):
+        ri, ci = key
+        if isinstance(ri, slice):
+            if isinstance(ci, slice):
+                return self.to_rows(ri, ci)
+            else:
+                return self._column_slice(ci, ri)
+        elif isinstance(ci, slice):
+            return self._row_slice(ri, ci)
+        try:
+            row_idx = self.row_index[ri]
+            col_idx = self.col_index[ci]
+        except KeyError:
+            raise KeyError(key)
+        return self._csr[row_idx, col_idx]
+
+    def __len__(self):
+        return self._csr.nnz
+
+    def iterkeys(self):
+        for ri, col_labels, _ in self._iter_rows_nonzero():
+            for ci in col_labels:
+                yield ri, ci
+
+    __iter__ = iterkeys
+
+    def itervalues(self):
+        return iter(self._csr.data.tolist())
+
+    def iteritems(self):
+        for ri, col_labels, cells in self._iter_rows_nonzero():
+            for ci, cell in izip(col_labels, cells):
+                yield (ri, ci), cell
+
+    # Other
+
+    def iter_all(self):
+        """Like iteritems but goes over all cells
+        """
+        col_labels = self._col_labels.tolist()
+        csr = self._csr
+        for row_idx, ri in enumerate(self._row_labels.tolist()):
+            cells = csr[row_idx].toarray().ravel().tolist()
+            for ci, cell in izip(col_labels, cells):
+                yield (ri, ci), cell
+
+    def iter_all_with_margins(self):
+        """Iterate over all cells while emitting row and column margins
+        """
+        col_margin = self.col_margin.tolist()
+        csr = self._csr
+        for row_idx, rm in enumerate(self.row_margin.tolist()):
+            cells = csr[row_idx].toarray().ravel().tolist()
+            for cm, cell in izip(col_margin, cells):
+                yield rm, cm, cell
+
+    def iter_vals_with_margins(self):
+        """Similar to itervalues except prepend row and column margins
+
+        ::
+
+            >>> t1 = SparseCrossTab(rows=[(1, 5), (4, 6)])
+            >>> list(t1.iter_vals_with_margins())
+            [(6, 5, 1), (6, 11, 5), (10, 5, 4), (10, 11, 6)]
+        """
+        csr = self._csr
+        row_ids = np.repeat(np.arange(csr.shape[0]), np.diff(csr.indptr))
+        return izip(self.row_margin[row_ids].tolist(),
+                    self.col_margin[csr.indices].tolist(),
+                    csr.data.tolist())
+
+    def iter_cols(self):
+        csc = self.csc
+        indptr = csc.indptr.tolist()
+        data = csc.data
+        for start, end in izip(indptr[:-1], indptr[1:]):
+            yield iter(data[start:end].tolist())
+
+    def iter_rows(self):
+        csr = self._csr
+        indptr = csr.indptr.tolist()
+        data = csr.data
+        for start, end in izip(indptr[:-1], indptr[1:]):
+            yield iter(data[start:end].tolist())
+
+    def iter_col_totals(self):
+        return iter(self.col_margin.tolist())
+
+    def iter_row_totals(self):
+        return iter(self.row_margin.tolist())
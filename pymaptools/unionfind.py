@@ -33,6 +33,9 @@ class UnionFind(object):
       into a single larger set.  If any item is not yet part of a set
       in X, it is added to X as one of the members of the merged set.
 
+    Members of each set are also linked into a circular list, so that
+    X.members(item) takes time proportional to the size of the set.
+
     ::
 
         >>> uf = UnionFind()
@@ -59,21 +62,30 @@ class UnionFind(object):
         """Create a new empty union-find structure."""
         self.weights = {}
         self.parents = {}
+        self.successors = {}
 
     def __getitem__(self, obj):
         """Find and return the representative of the set containing obj.
         :rtype: object
         """
+        parents = self.parents
         # check for previously unknown obj
-        if obj not in self.parents:
-            self.parents[obj] = obj
+        root = parents.get(obj)
+        if root is None and obj not in parents:
+            parents[obj] = obj
             self.weights[obj] = 1
+            self.successors[obj] = obj
             return obj
 
+        # roots and their children need no path compression
+        last_root = parents[root]
+        if last_root == root:
+            return root
+
         # find path of objects leading to the root
         path = [obj]
         last_root = obj
-        root = self.parents[obj]
+        root = parents[obj]
         while root != last_root:
             path.append(root)
             last_root = root
@@ -93,16 +105,33 @@ class UnionFind(object):
         """
         return iter(self.parents)
 
+    def __contains__(self, obj):
+        return obj in self.parents
+
     def union(self, *objs):
         """Find the sets containing the objects and merge them all."""
         weights = self.weights
         parents = self.parents
-        found_roots = map(self.__getitem__, objs)
+        successors = self.successors
+        if len(objs) == 2:
+            # common case of merging two sets, without building a list of roots
+            root1, root2 = self[objs[0]], self[objs[1]]
+            if root1 != root2:
+                if weights[root1] < weights[root2]:
+                    root1, root2 = root2, root1
+                weights[root1] += weights[root2]
+                parents[root2] = root1
+                successors[root1], successors[root2] = successors[root2], successors[root1]
+            return
+        found_roots = set(map(self.__getitem__, objs))
         heaviest_root = max(found_roots, key=weights.__getitem__)
         for root in found_roots:
             if root != heaviest_root:
                 weights[heaviest_root] += weights[root]
                 parents[root] = heaviest_root
+                # swapping successors of two roots splices their lists
+                successors[heaviest_root], successors[root] = \
+                    successors[root], successors[heaviest_root]
 
     def sets(self):
         """Return a list of each disjoint set
@@ -118,3 +147,65 @@ class UnionFind(object):
         containing given object
         """
         return self.weights[self[obj]] - 1
+
+    def size(self, obj):
+        """Return the number of objects in the set containing given object
+        """
+        return self.weights[self[obj]]
+
+    def members(self, obj):
+        """Return a list of objects in the set containing given object
+
+        ::
+
+            >>> uf = UnionFind()
+            >>> uf.union(0, 1)
+            >>> uf.union(2, 3)
+            >>> uf.union(1, 2)
+            >>> sorted(uf.members(3)), uf.size(3)
+            ([0, 1, 2, 3], 4)
+        """
+        successors = self.successors
+        root = self[obj]
+        result = [root]
+        member = successors[root]
+        while member != root:
+            result.append(member)
+            member = successors[member]
+        return result
+
+
+def label_disjoint_sets(num_items, pairs):
+    """Label disjoint sets of integers ``0 .. num_items - 1`` joined by pairs
+
+    Array-based counterpart of ``UnionFind`` for items that are already
+    integer ids. Sets are numbered in the order of their lowest item::
+
+        >>> label_disjoint_sets(6, [(4, 2), (1, 5), (2, 0)])
+        [0, 1, 0, 2, 0, 1]
+    """
+    parent = range(num_items)
+    for a, b in pairs:
+        # find roots with path halving
+        while parent[a] != a:
+            parent[a] = a = parent[parent[a]]
+        while parent[b] != b:
+            parent[b] = b = parent[parent[b]]
+        # lowest item of a set is its root
+        if a < b:
+            parent[b] = a
+        elif b < a:
+            parent[a] = b
+    labels = [0] * num_items
+    num_sets = 0
+    for item in xrange(num_items):
+        root = item
+        while parent[root] != root:
+            parent[root] = root = parent[parent[root]]
+        if root == item:
+            labels[item] = num_sets
+            num_sets += 1
+        else:
+            # roots precede other items of their sets
+            labels[item] = labels[root]
+    return labels
@@ -0,0 +1,57 @@
+"""
+Benchmark set-based and bitset clique search kernels on dense components
+
+Example::
+
+    python scripts/clique_kernel_bench.py --num_nodes 40 --density 0.5 0.7
+"""
+import argparse
+import random
+from pymaptools.benchmark import PMTimer
+from pymaptools.graph import Bigraph, Graph
+
+
+KERNELS = ['sets', 'bitset']
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_nodes", type=int, default=40,
+                        help="number of nodes (on each side for bipartite graphs)")
+    parser.add_argument("--density", type=float, nargs='+', default=[0.3, 0.5, 0.7],
+                        help="fractions of possible edges present")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed")
+    return parser.parse_args(args)
+
+
+def random_graphs(num_nodes, density, seed):
+    rng = random.Random(seed)
+    graph = Graph()
+    for u in xrange(num_nodes):
+        for v in xrange(u + 1, num_nodes):
+            if rng.random() < density:
+                graph.add_edge(u, v)
+    bigraph = Bigraph()
+    for u in xrange(num_nodes):
+        for v in xrange(num_nodes):
+            if rng.random() < density:
+                bigraph.add_edge(u, -1 - v)
+    return graph, bigraph
+
+
+def run(args):
+    for density in args.density:
+        graph, bigraph = random_graphs(args.num_nodes, density, args.seed)
+        for name, find_cliques in [("cliques", graph.find_cliques),
+                                   ("bicliques", bigraph.find_cliques)]:
+            results = []
+            for kernel in KERNELS:
+                with PMTimer() as timer:
+                    count = sum(1 for _ in find_cliques(kernel=kernel))
+                results.append("%s=%.3fs" % (kernel, timer.wall_interval))
+            print "density=%g %s=%d %s" % (density, name, count, " ".join(results))
+
+
+if __name__ == '__main__':
+    run(parse_args())
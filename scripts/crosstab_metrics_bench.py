@@ -0,0 +1,77 @@
+"""
+Benchmark vectorized clustering metrics against per-cell iteration
+
+Example::
+
+    python scripts/crosstab_metrics_bench.py --num_points 1000000 --num_classes 10000
+"""
+import argparse
+import numpy as np
+from math import log
+from pymaptools.benchmark import PMTimer
+from pymaptools.containers import CrossTab
+from pymaptools.sparse import SparseCrossTab
+from pymaptools import metrics
+
+
+def comb2(n):
+    return n * (n - 1) / 2.0
+
+
+def per_cell_scores(table):
+    """Adjusted Rand index and mutual information via margin iterators
+    """
+    n = float(table.grand_total)
+    sum_cells = mi = 0.0
+    for rm, cm, cell in table.iter_vals_with_margins():
+        sum_cells += comb2(cell)
+        mi += cell / n * log(n * cell / (rm * cm))
+    sum_rows = sum(comb2(x) for x in table.iter_row_totals())
+    sum_cols = sum(comb2(x) for x in table.iter_col_totals())
+    expected = sum_rows * sum_cols / comb2(n)
+    ari = (sum_cells - expected) / ((sum_rows + sum_cols) / 2.0 - expected)
+    return ari, mi
+
+
+def vectorized_scores(table):
+    return metrics.adjusted_rand_score(table), metrics.mutual_info_score(table)
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_points", type=int, default=1000000,
+                        help="number of labeled points")
+    parser.add_argument("--num_classes", type=int, default=10000,
+                        help="number of true classes")
+    parser.add_argument("--noise", type=float, default=0.3,
+                        help="fraction of points with randomized predicted labels")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed")
+    return parser.parse_args(args)
+
+
+def run(args):
+    rng = np.random.RandomState(args.seed)
+    ltrue = rng.randint(0, args.num_classes, size=args.num_points)
+    lpred = ltrue.copy()
+    noisy = rng.rand(args.num_points) < args.noise
+    lpred[noisy] = rng.randint(0, args.num_classes, size=noisy.sum())
+
+    with PMTimer() as timer:
+        dict_table = CrossTab.from_labels(ltrue.tolist(), lpred.tolist())
+    print "CrossTab.from_labels:", timer
+    with PMTimer() as timer:
+        sparse_table = SparseCrossTab.from_labels(ltrue, lpred)
+    print "SparseCrossTab.from_labels:", timer
+
+    for name, table in [("CrossTab", dict_table), ("SparseCrossTab", sparse_table)]:
+        with PMTimer() as timer:
+            scores = per_cell_scores(table)
+        print "%s per-cell: %s ARI=%.6f MI=%.6f" % ((name, timer) + scores)
+        with PMTimer() as timer:
+            scores = vectorized_scores(table)
+        print "%s vectorized: %s ARI=%.6f MI=%.6f" % ((name, timer) + scores)
+
+
+if __name__ == '__main__':
+    run(parse_args())
@@ -0,0 +1,70 @@
+"""
+Benchmark accuracy and memory of SketchCrossTab against exact tables
+
+Example::
+
+    python scripts/sketch_crosstab_bench.py --num_points 1000000 --num_classes 100000
+"""
+import argparse
+import numpy as np
+from pymaptools.benchmark import PMTimer
+from pymaptools.sparse import SparseCrossTab
+from pymaptools.sketch import SketchCrossTab
+from pymaptools import metrics
+
+
+METRICS = [
+    ("ARI", metrics.adjusted_rand_score),
+    ("MI", metrics.mutual_info_score),
+    ("V", metrics.v_measure_score),
+]
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num_points", type=int, default=1000000,
+                        help="number of labeled points")
+    parser.add_argument("--num_classes", type=int, default=100000,
+                        help="number of true classes")
+    parser.add_argument("--noise", type=float, default=0.3,
+                        help="fraction of points with randomized predicted labels")
+    parser.add_argument("--epsilon", type=float, nargs='+', default=[0.2, 0.1, 0.05],
+                        help="relative error bounds to try")
+    parser.add_argument("--delta", type=float, default=0.01,
+                        help="failure probability")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="random seed")
+    return parser.parse_args(args)
+
+
+def run(args):
+    rng = np.random.RandomState(args.seed)
+    ltrue = rng.randint(0, args.num_classes, size=args.num_points)
+    lpred = ltrue.copy()
+    noisy = rng.rand(args.num_points) < args.noise
+    lpred[noisy] = rng.randint(0, args.num_classes, size=noisy.sum())
+
+    with PMTimer() as timer:
+        exact = SparseCrossTab.from_labels(ltrue, lpred)
+    csr = exact.csr
+    exact_bytes = csr.data.nbytes + csr.indices.nbytes + csr.indptr.nbytes
+    exact_scores = [func(exact) for _, func in METRICS]
+    print "exact: %s cells=%d bytes=%d %s" % (
+        timer, csr.nnz, exact_bytes,
+        " ".join("%s=%.6f" % (name, score)
+                 for (name, _), score in zip(METRICS, exact_scores)))
+
+    for epsilon in args.epsilon:
+        sketch = SketchCrossTab.from_error_bounds(epsilon, args.delta)
+        with PMTimer() as timer:
+            sketch.add_batch(ltrue, lpred)
+        errors = [abs(func(sketch) - score)
+                  for (_, func), score in zip(METRICS, exact_scores)]
+        print "epsilon=%g: %s bytes=%d %s" % (
+            epsilon, timer, sketch.nbytes,
+            " ".join("%s_err=%.6f" % (name, error)
+                     for (name, _), error in zip(METRICS, errors)))
+
+
+if __name__ == '__main__':
+    run(parse_args())
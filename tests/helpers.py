@@ -0,0 +1,13 @@
+"""Helpers shared by test modules
+"""
+
+import numpy as np
+
+
+def noisy_labels(num_points, num_classes, noise, seed=0):
+    rng = np.random.RandomState(seed)
+    ltrue = rng.randint(0, num_classes, size=num_points)
+    lpred = ltrue.copy()
+    noisy = rng.rand(num_points) < noise
+    lpred[noisy] = rng.randint(0, num_classes, size=noisy.sum())
+    return ltrue, lpred
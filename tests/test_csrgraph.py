@@ -0,0 +1,530 @@
+import os
+import gzip
+import shutil
+import tempfile
+import unittest
+import random
+import numpy as np
+from scipy.sparse import coo_matrix
+from pymaptools.graph import Bigraph, Graph
+from pymaptools.csrgraph import CSRBigraph, CSRGraph
+
+
+def normalize_paired_sets(paired_sets):
+    for L, R in paired_sets:
+        yield tuple(sorted(L)), tuple(sorted(R))
+
+
+def random_edges(num_edges, num_unodes, num_vnodes, seed=0):
+    rng = random.Random(seed)
+    return [(rng.randint(0, num_unodes - 1), -rng.randint(1, num_vnodes),
+             rng.randint(1, 5)) for _ in xrange(num_edges)]
+
+
+class TestCSRBigraph(unittest.TestCase):
+
+    def setUp(self):
+        self.edges = random_edges(300, 40, 30)
+        self.expected = Bigraph.from_edgelist(self.edges)
+        self.actual = CSRBigraph.from_edgelist(self.edges)
+
+    def test_edges(self):
+        self.assertEqual(len(self.expected), len(self.actual))
+        self.assertEqual(dict(self.expected.iter_edge_weights()),
+                         dict(self.actual.iter_edge_weights()))
+        self.assertEqual(self.expected.get_weight(), self.actual.get_weight())
+        self.assertEqual(self.expected, self.actual)
+        self.assertEqual(self.actual, self.expected)
+        for (u, v), weight in self.expected.iter_edge_weights():
+            self.assertEqual(weight, self.actual.edges[u, v])
+        self.assertNotIn((0, 0), self.actual.edges)
+
+    def test_adjacency(self):
+        self.assertEqual(sorted(self.expected.U), sorted(self.actual.U))
+        self.assertEqual(sorted(self.expected.V), sorted(self.actual.V))
+        for u in self.expected.U:
+            self.assertEqual(self.expected.U2V[u], self.actual.U2V[u])
+            self.assertEqual(self.expected.get_unode_weight(u), self.actual.get_unode_weight(u))
+        for v in self.expected.V:
+            self.assertEqual(self.expected.V2U[v], self.actual.V2U[v])
+            self.assertEqual(self.expected.get_vnode_weight(v), self.actual.get_vnode_weight(v))
+        self.assertAlmostEqual(self.expected.get_density(), self.actual.get_density())
+
+    def test_cliques(self):
+        expected = set(normalize_paired_sets(self.expected.find_cliques()))
+        actual = set(normalize_paired_sets(self.actual.find_cliques()))
+        self.assertSetEqual(expected, actual)
+        actual = list(normalize_paired_sets(self.actual.find_cliques(kernel='bitset')))
+        self.assertEqual(len(expected), len(actual))
+        self.assertSetEqual(expected, set(actual))
+
+    def test_components(self):
+        edges = random_edges(60, 100, 100, seed=1)
+        expected = Bigraph.from_edgelist(edges).find_connected_components()
+        graph = CSRBigraph.from_edgelist(edges)
+        actual = list(graph.find_connected_components())
+        self.assertTrue(all(isinstance(comp, CSRBigraph) for comp in actual))
+        self.assertEqual(
+            sorted(sorted(comp.iter_edges()) for comp in expected),
+            sorted(sorted(comp.iter_edges()) for comp in actual))
+        # edge weights are carried over from the parent graph
+        self.assertEqual(graph.get_weight(), sum(comp.get_weight() for comp in actual))
+        for comp in actual:
+            for edge, weight in comp.iter_edge_weights():
+                self.assertEqual(graph.edges[edge], weight)
+
+    def test_label_components(self):
+        edges = random_edges(60, 100, 100, seed=1)
+        expected = Bigraph.from_edgelist(edges).label_components()
+        graph = CSRBigraph.from_edgelist(edges)
+        actual = graph.label_components()
+        self.assertEqual(len(expected), len(actual))
+        # the same pairs of nodes share components
+        for labels in ['unode_labels', 'vnode_labels']:
+            exp, act = getattr(expected, labels), getattr(actual, labels)
+            self.assertEqual(sorted(exp), sorted(act))
+            pairs = dict((exp[node], act[node]) for node in exp)
+            self.assertEqual(len(set(pairs.values())), len(pairs))
+        self.assertEqual(
+            sorted(sorted(comp.iter_edge_weights()) for comp in expected),
+            sorted(sorted(comp.iter_edge_weights()) for comp in actual))
+        component = actual[actual.unode_labels[edges[0][0]]]
+        self.assertIsInstance(component, CSRBigraph)
+        self.assertIn(edges[0][:2], component.edges)
+
+    def test_cliques_parallel(self):
+        expected = set(normalize_paired_sets(self.expected.find_cliques()))
+        for kwargs in [{'n_jobs': 1}, {'n_jobs': 2, 'max_task_size': 4}]:
+            actual = list(normalize_paired_sets(self.actual.find_cliques_parallel(**kwargs)))
+            self.assertEqual(len(expected), len(actual))
+            self.assertSetEqual(expected, set(actual))
+
+    def test_prune(self):
+        for kwargs in [{'min_edge_weight': 3}, {'min_degree': 4},
+                       {'min_edge_weight': 2, 'min_degree': (3, 5)},
+                       {'min_degree': (0, 6)}, {'min_degree': (5, 0)}]:
+            expected = self.expected.prune(**kwargs)
+            actual = self.actual.prune(**kwargs)
+            self.assertIsInstance(actual, CSRBigraph)
+            self.assertEqual(dict(expected.iter_edge_weights()),
+                             dict(actual.iter_edge_weights()))
+            self.assertEqual(sorted(expected.U), sorted(actual.U))
+            self.assertEqual(sorted(expected.V), sorted(actual.V))
+        # nodes whose neighbors are all peeled off are dropped
+        edges = [(1, -1), (2, -1), (3, -2)]
+        for cls in [Bigraph, CSRBigraph]:
+            pruned = cls.from_edgelist(edges).prune(min_degree=(0, 2))
+            self.assertEqual([1, 2], sorted(pruned.U))
+            self.assertEqual([-1], sorted(pruned.V))
+
+    def test_set_operations(self):
+        other_edges = random_edges(300, 40, 30, seed=2)
+        expected_other = Bigraph.from_edgelist(other_edges)
+        actual_other = CSRBigraph.from_edgelist(other_edges)
+        for op in ['__and__', '__or__', '__sub__']:
+            expected = getattr(self.expected, op)(expected_other)
+            for other in [actual_other, expected_other]:
+                actual = getattr(self.actual, op)(other)
+                self.assertIsInstance(actual, CSRBigraph)
+                self.assertEqual(dict(expected.iter_edge_weights()),
+                                 dict(actual.iter_edge_weights()))
+                self.assertEqual(sorted(expected.U), sorted(actual.U))
+            # in-place forms
+            actual = CSRBigraph(self.actual)
+            result = getattr(actual, op.replace('__', '__i', 1))(actual_other)
+            self.assertIs(actual, result)
+            self.assertEqual(dict(expected.iter_edge_weights()),
+                             dict(actual.iter_edge_weights()))
+        self.assertEqual(len(self.actual), len(self.actual & self.actual))
+        self.assertEqual(0, len(self.actual - self.actual))
+
+    def test_from_components(self):
+        components = [random_edges(100, 40, 30, seed=seed) for seed in xrange(4)]
+        expected = Bigraph.from_components(Bigraph.from_edgelist(c) for c in components)
+        actual = CSRBigraph.from_components(CSRBigraph.from_edgelist(c) for c in components)
+        self.assertEqual(dict(expected.iter_edge_weights()),
+                         dict(actual.iter_edge_weights()))
+        self.assertEqual(0, len(CSRBigraph.from_components([])))
+
+    def project(self, side, weighted=False):
+        """Projection computed with nested loops over neighbor sets"""
+        graph = self.expected
+        adjacency = graph.U2V if side == 'U' else graph.V2U
+        other = graph.V2U if side == 'U' else graph.U2V
+        weight = (lambda node, neighbor: 1) if not weighted else \
+            (lambda node, neighbor: graph.edges[(node, neighbor) if side == 'U' else (neighbor, node)])
+        result = {}
+        for node, neighbors in adjacency.iteritems():
+            for neighbor in neighbors:
+                for node2 in other[neighbor]:
+                    if node < node2:
+                        edge = (node, node2)
+                        total, shared = result.get(edge, (0, 0))
+                        result[edge] = (total + weight(node, neighbor) * weight(node2, neighbor),
+                                        shared + 1)
+        norms = dict((node, sum(weight(node, neighbor) ** 2 for neighbor in neighbors))
+                     for node, neighbors in adjacency.iteritems())
+        return result, norms
+
+    def test_project(self):
+        for side in ['U', 'V']:
+            for weighted in [False, True]:
+                expected, norms = self.project(side, weighted)
+                for chunk in [None, 50]:
+                    actual = self.actual.project(side, weighted=weighted, max_chunk_nnz=chunk)
+                    self.assertIsInstance(actual, CSRGraph)
+                    self.assertEqual(dict((e, w) for e, (w, _) in expected.iteritems()),
+                                     dict(actual.iter_edge_weights()))
+                actual = dict(self.actual.project(side, weighted=weighted, min_shared=3)
+                              .iter_edge_weights())
+                self.assertEqual(dict((e, w) for e, (w, n) in expected.iteritems() if n >= 3),
+                                 actual)
+                actual = self.actual.project(side, weighted=weighted, normalize='jaccard')
+                for (a, b), weight in actual.iter_edge_weights():
+                    total = expected[a, b][0]
+                    self.assertAlmostEqual(float(total) / (norms[a] + norms[b] - total), weight)
+                actual = self.actual.project(side, weighted=weighted, normalize='cosine',
+                                             min_weight=0.3)
+                self.assertEqual(
+                    sorted(e for e, (w, _) in expected.iteritems()
+                           if w / (norms[e[0]] * norms[e[1]]) ** 0.5 >= 0.3),
+                    sorted(actual.iter_edges()))
+        # top-k keeps an edge if it is among the heaviest of either node
+        expected, _ = self.project('U')
+        actual = dict(self.actual.project(top_k=2, max_chunk_nnz=100).iter_edge_weights())
+        for node in self.expected.U:
+            weights = sorted((w for e, (w, _) in expected.iteritems() if node in e), reverse=True)
+            kept = [e for e in actual if node in e]
+            self.assertGreaterEqual(len(kept), min(2, len(weights)))
+            for e, (w, _) in expected.iteritems():
+                if node in e and w > weights[min(1, len(weights) - 1)]:
+                    self.assertIn(e, actual)
+        for (a, b), weight in actual.iteritems():
+            self.assertEqual(expected[a, b][0], weight)
+        # dict graphs get plain graphs back
+        projected = self.expected.project('V')
+        self.assertIs(Graph, type(projected))
+        self.assertEqual(dict((e, w) for e, (w, _) in self.project('V')[0].iteritems()),
+                         dict(projected.iter_edge_weights()))
+        with self.assertRaises(ValueError):
+            self.actual.project('W')
+        with self.assertRaises(ValueError):
+            self.actual.project(normalize='dice')
+
+    def test_copy(self):
+        copy = CSRBigraph(self.actual)
+        copy.add_edge('new', 'node')
+        self.assertEqual(len(self.actual) + 1, len(copy))
+        filtered = CSRBigraph(self.expected, min_edge_weight=5)
+        self.assertEqual(
+            sorted(edge for edge, weight in self.expected.iter_edge_weights() if weight >= 5),
+            sorted(filtered.iter_edges()))
+        with self.assertRaises(TypeError):
+            CSRBigraph(weight_type=str)
+        with self.assertRaises(ValueError):
+            CSRBigraph(self.actual, weight_type=float)
+
+    def test_binary_edgelist(self):
+        dirname = tempfile.mkdtemp()
+        try:
+            path = os.path.join(dirname, 'edges.bin.gz')
+            for graph in [self.actual, self.expected]:
+                graph.write_binary_edgelist(path)
+                for cls in [CSRBigraph, Bigraph]:
+                    self.assertEqual(self.expected, cls.from_binary_edgelist(path))
+            # top-N edges agree up to ties at the cut-off
+            self.actual.write_binary_edgelist(path, max_edges=20)
+            kept = dict(CSRBigraph.from_binary_edgelist(path).iter_edge_weights())
+            weights = sorted((w for _, w in self.expected.iter_edge_weights()), reverse=True)
+            self.assertEqual(sorted(weights[:20]), sorted(kept.values()))
+            for edge, weight in kept.iteritems():
+                self.assertEqual(self.expected.edges[edge], weight)
+            self.assertEqual(
+                sorted(self.actual._written_edges(20), key=lambda item: -item[1]),
+                self.actual._written_edges(20))
+            graph = CSRGraph.from_arrays([3, 1], [1, 2], [0.5, 2.0])
+            graph.write_binary_edgelist(path)
+            self.assertEqual(graph, CSRGraph.from_binary_edgelist(path))
+            with self.assertRaises(ValueError):
+                CSRGraph.from_edgelist([('a', 'b')]).write_binary_edgelist(path)
+        finally:
+            shutil.rmtree(dirname)
+
+    def test_node_degrees(self):
+        for side in ['U', 'V']:
+            expected = self.expected.get_node_degrees(side)
+            nodes, degrees, weights = self.actual.get_node_degrees(side)
+            self.assertIsInstance(degrees, np.ndarray)
+            self.assertEqual(dict(zip(expected[0], zip(expected[1], expected[2]))),
+                             dict(zip(nodes, zip(degrees.tolist(), weights.tolist()))))
+            self.assertFalse(weights.flags.writeable)
+            for node, weight in zip(nodes, weights.tolist()):
+                get_weight = self.actual.get_unode_weight if side == 'U' \
+                    else self.actual.get_vnode_weight
+                self.assertEqual(weight, get_weight(node))
+            for by in ['weight', 'degree']:
+                self.assertEqual([value for _, value in self.expected.get_top_nodes(5, side, by)],
+                                 [value for _, value in self.actual.get_top_nodes(5, side, by)])
+            subset = nodes[:3] + ['missing']
+            _, sub_degrees, sub_weights = self.actual.get_node_degrees(side, nodes=subset)
+            self.assertEqual(degrees[:3].tolist() + [0], sub_degrees.tolist())
+        # cached degrees are dropped when new edges are compacted
+        graph = CSRBigraph(self.actual)
+        graph.get_node_degrees('U')
+        graph.add_edge(0, -1, 1000)
+        self.assertEqual((0, self.expected.get_unode_weight(0) + 1000),
+                         graph.get_top_nodes(1, 'U')[0])
+        self.assertEqual([], graph.get_top_nodes(0, 'U'))
+        loops = CSRGraph.from_edgelist([(1, 1, 3), (1, 2, 2), (2, 3, 1)])
+        self.assertEqual([2, 2, 1], loops.get_node_degrees(nodes=[1, 2, 3])[1].tolist())
+        self.assertEqual([(1, 5), (2, 3)], loops.get_top_nodes(2))
+        with self.assertRaises(ValueError):
+            loops.get_node_degrees('U')
+
+    def test_contract(self):
+        ugroups = dict((u, 'u%d' % (u % 6)) for u in self.expected.U if u % 7)
+        vgroups = dict((v, v // 4) for v in self.expected.V)
+        for reduce in ['sum', 'max', 'min']:
+            for args in [(ugroups,), (ugroups, vgroups), (None, vgroups)]:
+                expected = self.expected.contract(*args, reduce=reduce)
+                actual = self.actual.contract(*args, reduce=reduce)
+                self.assertIsInstance(actual, CSRBigraph)
+                self.assertEqual(dict(expected.iter_edge_weights()),
+                                 dict(actual.iter_edge_weights()))
+                self.assertEqual(sorted(expected.U), sorted(actual.U))
+                self.assertEqual(sorted(expected.V), sorted(actual.V))
+        # arrays aligned with nodes, masked entries drop nodes
+        unodes = self.actual.U
+        groups = np.ma.masked_array([ugroups.get(u, '') for u in unodes],
+                                    mask=[u not in ugroups for u in unodes])
+        self.assertEqual(self.actual.contract(ugroups), self.actual.contract(groups))
+        self.assertEqual(self.actual.contract(vnode_groups=vgroups),
+                         self.actual.contract(vnode_groups=[vgroups[v] for v in self.actual.V]))
+        self.assertEqual(0, len(self.actual.contract({})))
+        with self.assertRaises(ValueError):
+            self.actual.contract([1, 2])
+        with self.assertRaises(ValueError):
+            self.actual.contract(reduce='mean')
+
+        rng = random.Random(8)
+        edges = [(rng.randint(0, 30), rng.randint(0, 30), rng.random()) for _ in xrange(200)]
+        expected = Graph(weight_type=float)
+        actual = CSRGraph(weight_type=float)
+        for edge in edges:
+            expected.add_edge(*edge)
+            actual.add_edge(*edge)
+        groups = dict((v, v // 3) for v in expected.V if v != 5)
+        for reduce in ['sum', 'max', 'min']:
+            exp = dict(expected.contract(groups, reduce=reduce).iter_edge_weights())
+            act = dict(actual.contract(groups, reduce=reduce).iter_edge_weights())
+            self.assertEqual(sorted(exp), sorted(act))
+            for edge, weight in exp.iteritems():
+                self.assertAlmostEqual(weight, act[edge])
+
+    def test_float_weights(self):
+        g = CSRBigraph(weight_type=float)
+        g.add_edge('a', 'b', 0.25)
+        g.add_edge('a', 'b', 0.5)
+        self.assertEqual(0.75, g.edges['a', 'b'])
+        self.assertIsInstance(g.get_weight(), float)
+
+
+class TestBulkIngestion(unittest.TestCase):
+
+    def setUp(self):
+        self.edges = random_edges(500, 50, 40, seed=4)
+        self.expected = Bigraph.from_edgelist(self.edges)
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_from_arrays(self):
+        u, v, w = map(np.array, zip(*self.edges))
+        for graph in [CSRBigraph.from_arrays(u, v, w),
+                      CSRBigraph.from_arrays(u.tolist(), v.tolist(), w.tolist())]:
+            self.assertEqual(dict(self.expected.iter_edge_weights()),
+                             dict(graph.iter_edge_weights()))
+        # bulk and incremental additions can be mixed
+        graph = CSRBigraph.from_arrays(u[:250], v[:250], w[:250])
+        for edge in self.edges[250:]:
+            graph.add_edge(*edge)
+        self.assertEqual(self.expected, graph)
+        unweighted = CSRGraph.from_arrays([1, 2, 2], [2, 1, 3])
+        self.assertEqual({(1, 2): 2, (2, 3): 1}, dict(unweighted.iter_edge_weights()))
+        with self.assertRaises(ValueError):
+            CSRBigraph.from_arrays([1, None], [2, 3])
+
+    def test_from_sparse_matrix(self):
+        u, v, w = zip(*self.edges)
+        matrix = coo_matrix((w, (u, [-x for x in v])))
+        graph = CSRBigraph.from_sparse_matrix(
+            matrix, vlabels=[-x for x in range(matrix.shape[1])])
+        self.assertEqual(dict(self.expected.iter_edge_weights()),
+                         dict(graph.iter_edge_weights()))
+
+    def test_from_edgelist_file(self):
+        numeric = os.path.join(self.tmpdir, 'edges.txt.gz')
+        with gzip.open(numeric, 'w') as fhandle:
+            fhandle.write('# u v weight\n')
+            for edge in self.edges:
+                fhandle.write('%d %d %d\n' % edge)
+        for kwargs in [{'numeric': True}, {'numeric': True, 'sep': ' '}]:
+            graph = CSRBigraph.from_edgelist_file(numeric, **kwargs)
+            self.assertEqual(dict(self.expected.iter_edge_weights()),
+                             dict(graph.iter_edge_weights()))
+        labeled = os.path.join(self.tmpdir, 'edges.tsv')
+        with open(labeled, 'w') as fhandle:
+            fhandle.write('a\tb c\t0.5\n')
+            fhandle.write('a\tb c\t0.25\n')
+            fhandle.write('d\te\n')
+        graph = CSRGraph.from_edgelist_file(labeled, sep='\t', weight_type=float)
+        self.assertEqual({('a', 'b c'): 0.75, ('d', 'e'): 1.0},
+                         dict(graph.iter_edge_weights()))
+
+    def test_save_load(self):
+        graph = CSRBigraph.from_edgelist(self.edges)
+        for name, kwargs in [('graph.npz', {}), ('compressed.npz', {'compressed': True}),
+                             ('blocks.npz', {'compressed': True, 'block_size': 64}),
+                             ('graph', {'format': 'arrays'})]:
+            path = os.path.join(self.tmpdir, name)
+            graph.save_to(path, **kwargs)
+            format = kwargs.get('format')
+            for cls in [CSRBigraph, Bigraph]:
+                loaded = cls.load_from(path, format=format)
+                self.assertIs(cls, type(loaded))
+                self.assertEqual(self.expected, loaded)
+            # partial loads hold all edges of given nodes and nothing else
+            for side, nodes in [('U', [0, 7, 49, 'missing']), ('V', [-1, -13])]:
+                loaded = CSRBigraph.load_from(path, format=format, nodes=nodes, side=side)
+                end = 0 if side == 'U' else 1
+                self.assertEqual(
+                    dict((e, w) for e, w in self.expected.iter_edge_weights() if e[end] in nodes),
+                    dict(loaded.iter_edge_weights()))
+        path = os.path.join(self.tmpdir, 'graph')
+        loaded = CSRBigraph.load_from(path, format='arrays', mmap_mode='r')
+        self.assertIsInstance(loaded._store.weights, np.memmap)
+        self.assertEqual(self.expected, loaded)
+        # mapped arrays are left alone by later additions
+        u, v = self.edges[0][:2]
+        loaded.add_edge(u, v, 100)
+        self.assertEqual(self.expected.edges[u, v] + 100, loaded.edges[u, v])
+        self.assertEqual(self.expected, CSRBigraph.load_from(path, format='arrays'))
+        with self.assertRaises(ValueError):
+            CSRBigraph.load_from(os.path.join(self.tmpdir, 'blocks.npz'), mmap_mode='r')
+        with self.assertRaises(ValueError):
+            graph.save_to(os.path.join(self.tmpdir, 'dir'), format='arrays', block_size=10)
+        with self.assertRaises(TypeError):
+            CSRGraph.load_from(path, format='arrays')
+        # other paths get pickles
+        path = os.path.join(self.tmpdir, 'graph.pkl')
+        graph.save_to(path)
+        self.assertEqual(self.expected, CSRBigraph.load_from(path))
+
+        # graphs that are not bipartite, labels of mixed types, empty graphs
+        rng = random.Random(9)
+        edges = [(rng.choice([1, 'a', ('b', 2), 3]), rng.randint(0, 20), rng.random())
+                 for _ in xrange(100)]
+        expected = CSRGraph(weight_type=float)
+        for edge in edges:
+            expected.add_edge(*edge)
+        path = os.path.join(self.tmpdir, 'mixed.npz')
+        expected.save_to(path, block_size=7)
+        self.assertEqual(expected, CSRGraph.load_from(path))
+        self.assertEqual(
+            sorted((e, w) for e, w in expected.iter_edge_weights() if 'a' in e or 3 in e),
+            sorted(CSRGraph.load_from(path, nodes=['a', 3]).iter_edge_weights()))
+        with self.assertRaises(ValueError):
+            CSRGraph.load_from(path, nodes=['a'], side='U')
+        self.assertEqual(0, len(CSRGraph.load_from(path, nodes=['missing'])))
+        path = os.path.join(self.tmpdir, 'empty.npz')
+        CSRGraph().save_to(path, block_size=10)
+        self.assertEqual(0, len(CSRGraph.load_from(path)))
+
+
+class TestCSRGraph(unittest.TestCase):
+
+    def test_graph(self):
+        a = CSRGraph()
+        for edge in [(1, 5), (1, 2), (2, 5), (2, 3), (3, 4), (4, 5), (10, 20)]:
+            a.add_edge(*edge)
+        cliques = list(a.find_cliques())
+        self.assertEqual([set([1, 2, 5])], cliques)
+        components = list(a.find_connected_components())
+        self.assertEqual(2, len(components))
+        self.assertSetEqual(set([1, 2, 3, 4, 5]), set(components[0].V))
+        self.assertSetEqual(set([10, 20]), set(components[1].V))
+
+        b = CSRGraph()
+        for edge in [(3, 7), (7, 8), (4, 8), (4, 3)]:
+            b.add_edge(*edge)
+        self.assertEqual([], list(b.find_cliques()))
+
+        a_and_b = a & b
+        self.assertEqual([(3, 4)], list(a_and_b.iter_edges()))
+        self.assertEqual(b | a, a | b)
+        self.assertEqual(b & a, a & b)
+        self.assertEqual([set([1, 2, 5])], list((a - b).find_cliques()))
+
+    def test_parity(self):
+        rng = random.Random(3)
+        edges = [(rng.randint(0, 30), rng.randint(0, 30), rng.randint(1, 3))
+                 for _ in xrange(200)]
+        expected = Graph.from_edgelist(edges)
+        actual = CSRGraph.from_edgelist(edges)
+        self.assertEqual(dict(expected.iter_edge_weights()),
+                         dict(actual.iter_edge_weights()))
+        self.assertEqual(sorted(expected.V), sorted(actual.V))
+        for v in expected.V:
+            self.assertEqual(expected.V2U[v], actual.V2U[v])
+            self.assertEqual(expected.get_vnode_weight(v), actual.get_vnode_weight(v))
+        self.assertEqual(
+            sorted(sorted(clique) for clique in expected.find_cliques()),
+            sorted(sorted(clique) for clique in actual.find_cliques()))
+        self.assertEqual(actual, CSRGraph(expected))
+
+        self.assertEqual(
+            sorted(sorted(clique) for clique in expected.find_cliques()),
+            sorted(sorted(clique) for clique in actual.find_cliques(kernel='bitset')))
+        for kwargs in [{}, {'max_clique_size': 3, 'kernel': 'bitset'},
+                       {'min_clique_weight': 8, 'min_clique_size': 2}]:
+            self.assertEqual(
+                sorted(sorted(clique) for clique in expected.find_cliques_degeneracy(**kwargs)),
+                sorted(sorted(clique) for clique in actual.find_cliques_degeneracy(**kwargs)))
+        for kwargs in [{'n_jobs': 2, 'max_task_size': 3}, {'nodes': range(20)},
+                       {'kernel': 'bitset', 'max_task_size': 5}]:
+            self.assertEqual(
+                sorted(sorted(clique) for clique in expected.find_cliques_parallel(**kwargs)),
+                sorted(sorted(clique) for clique in actual.find_cliques_parallel(**kwargs)))
+
+    def test_set_operations(self):
+        rng = random.Random(7)
+        edges = [[(rng.randint(0, 30), rng.randint(0, 30), rng.randint(1, 3))
+                  for _ in xrange(200)] for _ in xrange(2)]
+        expected = [Graph.from_edgelist(e) for e in edges]
+        actual = [CSRGraph.from_edgelist(e) for e in edges]
+        for op in ['__and__', '__or__', '__sub__', '__iand__', '__ior__', '__isub__']:
+            result = getattr(CSRGraph(actual[0]), op)(actual[1])
+            self.assertEqual(dict(getattr(Graph(expected[0]), op)(expected[1]).iter_edge_weights()),
+                             dict(result.iter_edge_weights()))
+
+    def test_prune(self):
+        # a long path peels one node per pass from each end
+        path = CSRGraph.from_edgelist((idx, idx + 1) for idx in xrange(2000))
+        for u, v in [(3000, 3001), (3000, 3002), (3001, 3002)]:
+            path.add_edge(u, v)
+        self.assertEqual([(3000, 3001), (3000, 3002), (3001, 3002)],
+                         sorted(path.prune(min_degree=2).iter_edges()))
+        rng = random.Random(5)
+        edges = [(rng.randint(0, 60), rng.randint(0, 60), rng.randint(1, 3))
+                 for _ in xrange(300)]
+        expected = Graph.from_edgelist(edges)
+        actual = CSRGraph.from_edgelist(edges)
+        self.assertEqual(expected.get_core_numbers(), actual.get_core_numbers())
+        for kwargs in [{'min_degree': 5}, {'min_edge_weight': 2, 'min_degree': 3}]:
+            self.assertEqual(dict(expected.prune(**kwargs).iter_edge_weights()),
+                             dict(actual.prune(**kwargs).iter_edge_weights()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,12 @@
+import os
+import pickle
+import shutil
+import tempfile
 import unittest
-from pymaptools.graph import Bigraph, Graph
+import random
+from StringIO import StringIO
+from xml.etree import ElementTree
+from pymaptools.graph import Bigraph, Graph, OverlayBigraph, OverlayGraph, SkipEdge
 
 
 def makeSetPair(graph):
@@ -173,6 +180,480 @@ class TestGraph(unittest.TestCase):
         b_and_a = b & a
         self.assertEqual(a_and_b, b_and_a)
 
+    def test_label_components(self):
+        g = Bigraph()
+        g.add_clique(([1, 2], [-1, -2]))
+        g.add_clique(([3], [-3, -4]), weight=2)
+        g.add_edge(4, -2)
+        components = g.label_components()
+        self.assertEqual(2, len(components))
+        self.assertEqual(components.unode_labels[1], components.vnode_labels[-2])
+        self.assertEqual(components.unode_labels[4], components.unode_labels[2])
+        self.assertNotEqual(components.unode_labels[1], components.unode_labels[3])
+        subgraphs = sorted(components, key=len)
+        self.assertEqual({(3, -3): 2, (3, -4): 2}, dict(subgraphs[0].iter_edge_weights()))
+        self.assertEqual(g.get_weight(), sum(sg.get_weight() for sg in subgraphs))
+        with self.assertRaises(IndexError):
+            components[2]
+
+        h = Graph.from_edgelist([(1, 2), (2, 3), (2, 3), (5, 4), (6, 6)])
+        components = h.label_components()
+        self.assertEqual(3, len(components))
+        self.assertIs(components.unode_labels, components.vnode_labels)
+        self.assertEqual(h, Graph.from_components(components))
+
+    def test_find_cliques_parallel(self):
+        rng = random.Random(0)
+        b = Bigraph.from_edgelist(
+            (rng.randint(0, 40), -rng.randint(1, 30)) for _ in xrange(150))
+        g = Graph.from_edgelist(
+            (rng.randint(0, 40), rng.randint(0, 40)) for _ in xrange(150))
+        for graph in [b, g]:
+            expected = sorted(normalize_paired_sets(graph.find_cliques())) \
+                if graph is b else sorted(sorted(c) for c in graph.find_cliques())
+            for kwargs in [{'n_jobs': 1}, {'n_jobs': 2, 'max_task_size': 3},
+                           {'n_jobs': 2, 'max_task_size': 1000}]:
+                found = list(graph.find_cliques_parallel(**kwargs))
+                actual = sorted(normalize_paired_sets(found)) \
+                    if graph is b else sorted(sorted(c) for c in found)
+                self.assertEqual(expected, actual)
+            # ordered output does not depend on the number of workers
+            self.assertEqual(
+                list(graph.find_cliques_parallel(n_jobs=1, max_task_size=5)),
+                list(graph.find_cliques_parallel(n_jobs=2, max_task_size=5, ordered=True)))
+
+    def test_bitset_kernel(self):
+        rng = random.Random(1)
+        # dense enough to have overlapping cliques of different sizes
+        b = Bigraph.from_edgelist(
+            (rng.randint(0, 15), -rng.randint(1, 12)) for _ in xrange(120))
+        self.assertEqual(
+            sorted(normalize_paired_sets(b.find_cliques())),
+            sorted(normalize_paired_sets(b.find_cliques(kernel='bitset'))))
+        subset = range(0, 16, 2), range(-1, -13, -2)
+        self.assertEqual(
+            sorted(normalize_paired_sets(b.find_cliques(*subset))),
+            sorted(normalize_paired_sets(b.find_cliques(*subset, kernel='bitset'))))
+        g = Graph.from_edgelist(
+            (rng.randint(0, 20), rng.randint(0, 20)) for _ in xrange(120))
+        for kwargs in [{}, {'min_clique_size': 4}, {'nodes': range(12)}]:
+            self.assertEqual(
+                sorted(sorted(clique) for clique in g.find_cliques(**kwargs)),
+                sorted(sorted(clique) for clique in g.find_cliques(kernel='bitset', **kwargs)))
+        self.assertEqual(
+            sorted(sorted(clique) for clique in g.find_cliques()),
+            sorted(sorted(clique) for clique in g.find_cliques_parallel(
+                n_jobs=2, max_task_size=4, kernel='bitset')))
+        with self.assertRaises(ValueError):
+            g.find_cliques(kernel='bits')
+
+    def test_find_cliques_degeneracy(self):
+        rng = random.Random(2)
+        # sparse graph with a dense core
+        g = Graph.from_edgelist(
+            (rng.randint(0, 200), rng.randint(0, 200), rng.randint(1, 3))
+            for _ in xrange(300))
+        for _ in xrange(150):
+            g.add_edge(rng.randint(0, 15), rng.randint(0, 15))
+        expected = sorted(sorted(clique) for clique in g.find_cliques(min_clique_size=2))
+        for kernel in ['sets', 'bitset']:
+            actual = list(g.find_cliques_degeneracy(min_clique_size=2, kernel=kernel))
+            self.assertEqual(expected, sorted(sorted(clique) for clique in actual))
+            actual = g.find_cliques_degeneracy(max_clique_size=4, kernel=kernel)
+            self.assertEqual([c for c in expected if 3 <= len(c) <= 4],
+                             sorted(sorted(clique) for clique in actual))
+        heavy = g.find_cliques_degeneracy(min_clique_size=2, min_clique_weight=6)
+        self.assertEqual([c for c in expected if g.get_clique_weight(c) >= 6],
+                         sorted(sorted(clique) for clique in heavy))
+        self.assertEqual(5, len(list(g.find_cliques_degeneracy(max_results=5))))
+        self.assertEqual([], list(g.find_cliques_degeneracy(time_budget=0)))
+        nodes = range(10)
+        self.assertEqual(
+            sorted(sorted(c) for c in g.find_cliques(nodes=nodes)),
+            sorted(sorted(c) for c in g.find_cliques_degeneracy(nodes=nodes + [1000])))
+
+    def test_prune(self):
+        rng = random.Random(3)
+        b = Bigraph.from_edgelist(
+            (rng.randint(0, 30), -rng.randint(1, 30), rng.randint(1, 4)) for _ in xrange(150))
+        original = dict(b.iter_edge_weights())
+        self.assertEqual(Bigraph(b, min_edge_weight=3), b.prune(min_edge_weight=3))
+        pruned = b.prune(min_edge_weight=2, min_degree=(2, 3))
+        for u in pruned.U:
+            self.assertGreaterEqual(len(pruned.U2V[u]), 2)
+        for v in pruned.V:
+            self.assertGreaterEqual(len(pruned.V2U[v]), 3)
+        pruned.add_edge(0, -1, 10)
+        self.assertEqual(original, dict(b.iter_edge_weights()))
+
+        g = Graph.from_edgelist(
+            (rng.randint(0, 40), rng.randint(0, 40)) for _ in xrange(120))
+        cores = g.get_core_numbers()
+        for k in xrange(1, max(cores.values()) + 2):
+            core = g.prune(min_degree=k)
+            self.assertSetEqual(set(v for v, c in cores.iteritems() if c >= k), set(core.V))
+            for v in core.V:
+                self.assertGreaterEqual(len(core.V2U[v] - set([v])), k)
+            for edge, weight in core.iter_edge_weights():
+                self.assertEqual(g.edges[edge], weight)
+
+    def test_set_operations(self):
+        rng = random.Random(6)
+        for cls, sign in [(Bigraph, -1), (Graph, 1)]:
+            edges = [[(rng.randint(0, 15), sign * rng.randint(1, 15), rng.randint(1, 4))
+                      for _ in xrange(80)] for _ in xrange(2)]
+            g, h = [cls.from_edgelist(e) for e in edges]
+            weights = [dict(x.iter_edge_weights()) for x in (g, h)]
+            expected = {
+                '__and__': dict((e, min(w, weights[1][e])) for e, w in weights[0].iteritems()
+                                if e in weights[1]),
+                '__or__': dict((e, weights[0].get(e, 0) + weights[1].get(e, 0))
+                               for e in set(weights[0]) | set(weights[1])),
+                '__sub__': dict((e, w) for e, w in weights[0].iteritems() if e not in weights[1]),
+            }
+            for op, result in expected.iteritems():
+                self.assertEqual(result, dict(getattr(g, op)(h).iter_edge_weights()))
+                for target in [cls(g), OverlayGraph(g) if cls is Graph else OverlayBigraph(g)]:
+                    returned = getattr(target, op.replace('__', '__i', 1))(h)
+                    self.assertIs(target, returned)
+                    self.assertEqual(result, dict(target.iter_edge_weights()))
+                    nodes = set(v for _, v in result) | \
+                        (set(u for u, _ in result) if cls is Graph else set())
+                    self.assertSetEqual(nodes, set(target.V))
+            self.assertEqual(weights[0], dict(g.iter_edge_weights()))
+            self.assertEqual(g | h, cls.from_components([g, h]))
+
+    def test_track_components(self):
+        rng = random.Random(8)
+        for cls, sign in [(Bigraph, -1), (Graph, 1)]:
+            g = cls(track_components=True)
+            for _ in xrange(60):
+                if rng.random() < 0.2:
+                    g.add_clique(([rng.randint(0, 50), rng.randint(0, 50)],
+                                  [sign * rng.randint(1, 50)]) if cls is Bigraph
+                                 else [rng.randint(0, 50) for _ in xrange(3)])
+                else:
+                    g.add_edge(rng.randint(0, 50), sign * rng.randint(1, 50))
+                self.check_components(g)
+            # removing edges rebuilds the union-find when next needed
+            g -= cls.from_edgelist(list(g.iter_edges())[::3])
+            self.check_components(g)
+            self.check_components(cls(g, track_components=True))
+            with self.assertRaises(KeyError):
+                g.get_component_id(1000)
+            with self.assertRaises(ValueError):
+                cls(g).get_component_id(next(iter(g.V)))
+
+    def check_components(self, g):
+        bipartite = isinstance(g, Bigraph) and not isinstance(g, Graph)
+        for component in g.find_connected_components():
+            if bipartite:
+                nodes = [('U', u) for u in component.U] + [('V', v) for v in component.V]
+            else:
+                nodes = [('V', v) for v in component.V]
+            ids = set(g.get_component_id(node, side) for side, node in nodes)
+            self.assertEqual(1, len(ids))
+            side, node = nodes[0]
+            self.assertEqual(len(nodes), g.get_component_size(node, side))
+            members = g.get_component_members(node, side)
+            if bipartite:
+                self.assertEqual((sorted(component.U), sorted(component.V)),
+                                 tuple(map(sorted, members)))
+            else:
+                self.assertEqual(sorted(component.V), sorted(members))
+
+    def check_overlay(self, overlay, expected):
+        self.assertEqual(expected, dict(overlay.iter_edge_weights()))
+        self.assertEqual(len(expected), len(overlay))
+        u2v, v2u = {}, {}
+        for u, v in expected:
+            u2v.setdefault(u, set()).add(v)
+            v2u.setdefault(v, set()).add(u)
+        if isinstance(overlay, Graph):
+            for u, v in expected:
+                u2v.setdefault(v, set()).add(u)
+            v2u = u2v
+        self.assertEqual(u2v, dict(overlay.U2V.iteritems()))
+        self.assertEqual(v2u, dict(overlay.V2U.iteritems()))
+        self.assertEqual(len(v2u), len(overlay.V))
+
+    def test_overlay(self):
+        rng = random.Random(4)
+        for cls, overlay_cls, sign in [(Bigraph, OverlayBigraph, -1),
+                                       (Graph, OverlayGraph, 1)]:
+            base = cls.from_edgelist(
+                (rng.randint(0, 20), sign * rng.randint(1, 20), rng.randint(1, 4))
+                for _ in xrange(100))
+            original = dict(base.iter_edge_weights())
+            overlay = overlay_cls(base)
+            expected = dict(original)
+            for _ in xrange(200):
+                u, v = rng.randint(0, 25), sign * rng.randint(1, 25)
+                edge = base.make_edge(u, v)
+                action = rng.randint(0, 2)
+                if action == 0:
+                    overlay.add_edge(u, v, 2)
+                    expected[edge] = expected.get(edge, 0) + 2
+                elif action == 1:
+                    overlay.set_weight(u, v, 5)
+                    expected[edge] = 5
+                elif edge in expected:
+                    overlay.remove_edge(u, v)
+                    del expected[edge]
+                else:
+                    with self.assertRaises(KeyError):
+                        overlay.remove_edge(u, v)
+            self.check_overlay(overlay, expected)
+            self.assertEqual(original, dict(base.iter_edge_weights()))
+            # derived and copied graphs are standalone
+            frozen = overlay.freeze()
+            self.assertIs(cls, type(frozen))
+            self.assertEqual(frozen, cls(overlay))
+            self.assertEqual(expected, dict(frozen.iter_edge_weights()))
+            self.assertIs(cls, type(overlay | base))
+            if cls is Bigraph:
+                self.assertEqual(sorted(normalize_paired_sets(frozen.find_cliques())),
+                                 sorted(normalize_paired_sets(overlay.find_cliques())))
+            else:
+                self.assertEqual(sorted(map(sorted, frozen.find_cliques())),
+                                 sorted(map(sorted, overlay.find_cliques())))
+            overlay.compact()
+            self.assertIsNot(base, overlay.base)
+            self.check_overlay(overlay, expected)
+
+        with self.assertRaises(TypeError):
+            OverlayGraph(Bigraph())
+        with self.assertRaises(ValueError):
+            OverlayBigraph(Bigraph(), weight_type=float)
+        empty = OverlayGraph.from_edgelist([(1, 2), (2, 3)])
+        self.assertEqual([(1, 2), (2, 3)], sorted(empty.iter_edges()))
+
+    def check_degrees(self, g, side):
+        adjacency = g.U2V if side == 'U' else g.V2U
+        expected = dict((node, (len(neighbors), sum(
+            g.edges[g.make_edge(*((node, n) if side == 'U' else (n, node)))]
+            for n in neighbors))) for node, neighbors in adjacency.items())
+        nodes, degrees, weights = g.get_node_degrees(side)
+        self.assertEqual(expected, dict(zip(nodes, zip(degrees, weights))))
+        for node, (_, weight) in expected.iteritems():
+            get_weight = g.get_unode_weight if side == 'U' else g.get_vnode_weight
+            self.assertEqual(weight, get_weight(node))
+        top = g.get_top_nodes(3, side)
+        self.assertEqual(sorted((w for _, w in expected.itervalues()), reverse=True)[:3],
+                         [w for _, w in top])
+        for node, weight in top:
+            self.assertEqual(expected[node][1], weight)
+        self.assertEqual(sorted((d for d, _ in expected.itervalues()), reverse=True)[:3],
+                         [d for _, d in g.get_top_nodes(3, side, by='degree')])
+
+    def test_node_degrees(self):
+        rng = random.Random(11)
+        edges = [(rng.randint(0, 20), -rng.randint(1, 15), rng.randint(1, 5))
+                 for _ in xrange(100)]
+        g = Bigraph.from_edgelist(edges)
+        for side in ['U', 'V']:
+            self.check_degrees(g, side)
+        self.assertEqual(([-100], [0], [0]), g.get_node_degrees(nodes=[-100]))
+        # cached degrees follow changes to edges
+        g.add_edge(0, -100, 50)
+        self.assertEqual([(-100, 50)], g.get_top_nodes(1))
+        g &= Bigraph.from_edgelist([(u, v, 1) for u, v, _ in edges])
+        for side in ['U', 'V']:
+            self.check_degrees(g, side)
+        g -= Bigraph.from_edgelist(edges[:50])
+        for side in ['U', 'V']:
+            self.check_degrees(g, side)
+        overlay = OverlayBigraph(g)
+        overlay.get_node_degrees()
+        overlay.set_weight(edges[-1][0], edges[-1][1], 100)
+        self.check_degrees(overlay, 'U')
+        self.check_degrees(g, 'U')
+
+        # self-loops count once toward degrees and weights
+        graph = Graph.from_edgelist([(1, 1, 3), (1, 2, 2), (2, 3, 1)])
+        self.assertEqual(([1, 2, 3], [2, 2, 1], [5, 3, 1]),
+                         graph.get_node_degrees(nodes=[1, 2, 3]))
+        self.check_degrees(graph, 'V')
+        graph.add_edge(3, 4, 10)
+        self.assertEqual([(3, 11), (4, 10)], graph.get_top_nodes(2))
+        with self.assertRaises(ValueError):
+            graph.get_node_degrees('U')
+        with self.assertRaises(ValueError):
+            graph.get_top_nodes(2, by='size')
+
+    def test_contract(self):
+        rng = random.Random(13)
+        edges = [(rng.randint(0, 20), -rng.randint(1, 15), rng.randint(1, 5))
+                 for _ in xrange(100)]
+        g = Bigraph.from_edgelist(edges)
+        ugroups = dict((u, u % 4) for u in g.U if u != 3)
+        vgroups = dict((v, 'even' if v % 2 == 0 else 'odd') for v in g.V)
+
+        def renamer(groups):
+            def rename(node):
+                if node not in groups:
+                    raise SkipEdge()
+                return groups[node]
+            return rename
+
+        self.assertEqual(g.rename_nodes(renamer(ugroups), renamer(vgroups)),
+                         g.contract(ugroups, vgroups))
+        expected = {}
+        for (u, v), weight in g.iter_edge_weights():
+            if u in ugroups:
+                expected.setdefault((ugroups[u], v), []).append(weight)
+        for reduce, combine in [('sum', sum), ('max', max), ('min', min)]:
+            self.assertEqual(dict((e, combine(w)) for e, w in expected.iteritems()),
+                             dict(g.contract(ugroups, reduce=reduce).iter_edge_weights()))
+        # nodes left without edges are dropped
+        self.assertEqual(set(v for u, v in g.edges if u in ugroups),
+                         set(g.contract(ugroups).V))
+        self.assertEqual(0, len(g.contract({})))
+        with self.assertRaises(ValueError):
+            g.contract(reduce='mean')
+        with self.assertRaises(TypeError):
+            g.contract([1, 2])
+
+        graph = Graph.from_edgelist([(1, 2, 2), (2, 3, 1), (3, 1, 3), (3, 4, 4)])
+        self.assertEqual({('a', 'a'): 2, ('a', 'b'): 3},
+                         dict(graph.contract({1: 'a', 2: 'a', 3: 'b'}, reduce='max')
+                              .iter_edge_weights()))
+        self.assertIs(Graph, type(OverlayGraph(graph).contract()))
+        self.assertEqual(graph, graph.contract())
+
+    def test_save_load(self):
+        dirname = tempfile.mkdtemp()
+        try:
+            bigraph = Bigraph.from_edgelist([(1, 'a', 2), (2, 'a', 1), (2, ('b', 1), 3)])
+            graph = Graph.from_edgelist([(1, 2, 4), (2, 3, 1), (3, 1, 2), (4, 5)])
+            for g in [bigraph, graph]:
+                cls = type(g)
+                for name, format in [('graph.npz', None), ('graph', None),
+                                     ('graph.pkl', None), ('graph.pkl.gz', None),
+                                     ('arrays', 'arrays'), ('pickle.npz', 'pickle')]:
+                    path = os.path.join(dirname, cls.__name__ + name)
+                    g.save_to(path, format=format)
+                    loaded = cls.load_from(path, format=format)
+                    self.assertIs(cls, type(loaded))
+                    self.assertEqual(g, loaded)
+                    self.assertEqual(sorted(g.V), sorted(loaded.V))
+                # binary format is used for .npz paths and on request only
+                self.assertTrue(os.path.isdir(os.path.join(dirname, cls.__name__ + 'arrays')))
+                for name in ['graph', 'graph.pkl', 'pickle.npz']:
+                    with open(os.path.join(dirname, cls.__name__ + name), 'rb') as fhandle:
+                        self.assertEqual(g, pickle.load(fhandle))
+            with self.assertRaises(ValueError):
+                graph.save_to(os.path.join(dirname, 'graph.bin'), format='binary')
+            # graphs the binary format cannot hold are pickled to .npz paths
+            longs = Bigraph(weight_type=long)
+            longs.add_edge(1, 'a', 3L)
+            tracked = Graph(track_components=True)
+            tracked.add_edge(1, 2)
+            for g in [longs, tracked]:
+                path = os.path.join(dirname, 'fallback.npz')
+                g.save_to(path)
+                loaded = type(g).load_from(path)
+                self.assertEqual(g, loaded)
+                self.assertIs(g.weight_type, loaded.weight_type)
+                self.assertEqual(g.track_components, loaded.track_components)
+            self.assertEqual(loaded.get_component_id(1), loaded.get_component_id(2))
+            for kwargs in [{'compressed': True}, {'block_size': 2}]:
+                with self.assertRaises(ValueError):
+                    longs.save_to(os.path.join(dirname, 'options.npz'), **kwargs)
+            with self.assertRaises(ValueError):
+                Graph.load_from(path, nodes=[1])
+            with self.assertRaises(TypeError):
+                longs.save_to(os.path.join(dirname, 'longs'), format='arrays')
+            with self.assertRaises(ValueError):
+                tracked.save_to(os.path.join(dirname, 'tracked'), format='arrays')
+            path = os.path.join(dirname, 'partial.npz')
+            bigraph.save_to(path, compressed=True, block_size=2)
+            self.assertEqual([((2, 'a'), 1), ((2, ('b', 1)), 3)],
+                             sorted(Bigraph.load_from(path, nodes=[2], side='U').iter_edge_weights()))
+            self.assertEqual([(1, 'a'), (2, 'a')],
+                             sorted(Bigraph.load_from(path, nodes=['a']).iter_edges()))
+            with self.assertRaises(TypeError):
+                Graph.load_from(path)
+            floats = Graph(weight_type=float)
+            floats.add_edge(1, 2, 0.5)
+            path = os.path.join(dirname, 'floats.npz')
+            floats.save_to(path)
+            self.assertEqual([((1, 2), 0.5)],
+                             list(Graph.load_from(path).iter_edge_weights()))
+        finally:
+            shutil.rmtree(dirname)
+
+    def test_writers(self):
+        dirname = tempfile.mkdtemp()
+        try:
+            bigraph = Bigraph.from_edgelist([(1, -1, 5), (2, -1, 1), (2, -2, 3), (3, -3, 2)])
+            graph = Graph.from_edgelist([(1, 2, 4), (2, 3, 1), (3, 1, 2)])
+            for g in [bigraph, graph]:
+                for name in ['edges.bin', 'edges.bin.gz']:
+                    path = os.path.join(dirname, name)
+                    g.write_binary_edgelist(path)
+                    self.assertEqual(g, type(g).from_binary_edgelist(path))
+                    g.write_binary_edgelist(path, max_edges=2)
+                    heaviest = sorted(g.iter_edge_weights(), key=lambda item: -item[1])[:2]
+                    self.assertEqual(sorted(heaviest), sorted(
+                        type(g).from_binary_edgelist(path).iter_edge_weights()))
+            floats = Graph(weight_type=float)
+            floats.add_edge(1, 2, 0.5)
+            path = os.path.join(dirname, 'floats.bin')
+            floats.write_binary_edgelist(path)
+            self.assertEqual([((1, 2), 0.5)],
+                             list(Graph.from_binary_edgelist(path).iter_edge_weights()))
+            with self.assertRaises(ValueError):
+                Graph.from_edgelist([('a', 'b')]).write_binary_edgelist(StringIO())
+            with open(path, 'wb') as handle:
+                handle.write('not an edge list')
+            with self.assertRaises(ValueError):
+                Graph.from_binary_edgelist(path)
+
+            # DOT output lists every node and edge, top-N keeps endpoints only
+            path = os.path.join(dirname, 'graph.dot.gz')
+            bigraph.write_dot(path, name='say "hi"')
+            self.assertTrue(os.path.getsize(path) > 0)
+            output = StringIO()
+            bigraph.write_dot(output, name='say "hi"')
+            text = output.getvalue()
+            self.assertTrue(text.startswith('graph "say \\"hi\\"" {'))
+            self.assertEqual(4, text.count(' -- '))
+            self.assertIn('subgraph "cluster_U"', text)
+            output = StringIO()
+            bigraph.write_dot(output, bipartite=False, max_edges=1)
+            text = output.getvalue()
+            self.assertEqual(['    "1" -- "-1";'],
+                             [line for line in text.splitlines() if ' -- ' in line])
+            self.assertNotIn('"3"', text)
+            self.assertIn('subgraph "U"', text)
+            output = StringIO()
+            graph.write_dot(output, vnode_decorator=lambda g, v: (v, {'label': u'\xe9'}))
+            self.assertIn('"1" [label="\xc3\xa9"];', output.getvalue())
+            self.assertNotIn('subgraph', output.getvalue())
+
+            # GraphML output parses and round-trips edge weights
+            for g in [bigraph, graph]:
+                output = StringIO()
+                g.write_graphml(output, edge_keys=['color'],
+                                edge_decorator=lambda g, u, v, w: ((u, v), {'color': '<b>'}))
+                ns = '{http://graphml.graphdrawing.org/xmlns}'
+                root = ElementTree.fromstring(output.getvalue())
+                nodes = root.findall('%sgraph/%snode' % (ns, ns))
+                self.assertEqual(len(g.U) + len(g.V) if g is bigraph else len(g.V), len(nodes))
+                weights = {}
+                for edge in root.findall('%sgraph/%sedge' % (ns, ns)):
+                    data = dict((d.get('key'), d.text) for d in edge)
+                    self.assertEqual('<b>', data['d%d' % (2 if g is bigraph else 1)])
+                    weights[g.make_edge(int(edge.get('source')), int(edge.get('target')))] = \
+                        int(data['d0'])
+                self.assertEqual(dict(g.iter_edge_weights()), weights)
+            with self.assertRaises(ValueError):
+                graph.write_graphml(StringIO(),
+                                    vnode_decorator=lambda g, v: (v, {'color': 'red'}))
+        finally:
+            shutil.rmtree(dirname)
+
 
 if __name__ == "__main__":
     unittest.main()
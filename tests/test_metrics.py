@@ -0,0 +1,120 @@
+import unittest
+import random
+from math import log, sqrt
+from pymaptools.containers import CrossTab, OrderedCrossTab
+from pymaptools.sparse import SparseCrossTab
+from pymaptools import containers, metrics
+
+
+def comb2(n):
+    return n * (n - 1) / 2.0
+
+
+def reference_scores(table):
+    """Per-cell reference implementation based on margin iterators
+    """
+    n = float(table.grand_total)
+    sum_cells = sum_mi = 0.0
+    for rm, cm, cell in table.iter_vals_with_margins():
+        sum_cells += comb2(cell)
+        sum_mi += cell / n * log(n * cell / (rm * cm))
+    sum_rows = sum(comb2(x) for x in table.iter_row_totals())
+    sum_cols = sum(comb2(x) for x in table.iter_col_totals())
+    h_rows = -sum(x / n * log(x / n) for x in table.iter_row_totals() if x)
+    h_cols = -sum(x / n * log(x / n) for x in table.iter_col_totals() if x)
+    expected = sum_rows * sum_cols / comb2(n)
+    ari = (sum_cells - expected) / ((sum_rows + sum_cols) / 2.0 - expected)
+    fmi = sum_cells / sqrt(sum_rows * sum_cols)
+    h = sum_mi / h_rows
+    c = sum_mi / h_cols
+    return {
+        'ari': ari,
+        'fmi': fmi,
+        'mi': sum_mi,
+        'hcv': (h, c, 2 * h * c / (h + c)),
+    }
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(42)
+        self.ltrue = [rng.randint(0, 9) for _ in xrange(400)]
+        self.lpred = [label if rng.random() < 0.6 else rng.randint(0, 14)
+                      for label in self.ltrue]
+
+    def check_table(self, table):
+        expected = reference_scores(table)
+        self.assertAlmostEqual(expected['ari'], metrics.adjusted_rand_score(table))
+        self.assertAlmostEqual(expected['fmi'], metrics.fowlkes_mallows_score(table))
+        self.assertAlmostEqual(expected['mi'], metrics.mutual_info_score(table))
+        for x, y in zip(expected['hcv'], metrics.homogeneity_completeness_v_measure(table)):
+            self.assertAlmostEqual(x, y)
+        self.assertAlmostEqual(expected['hcv'][2], metrics.normalized_mutual_info_score(table))
+        (tn, fp), (fn, tp) = metrics.pair_confusion_matrix(table).tolist()
+        self.assertEqual(comb2(len(self.ltrue)), tn + fp + fn + tp)
+
+    def test_crosstab(self):
+        self.check_table(CrossTab.from_labels(self.ltrue, self.lpred))
+
+    def test_sparse_crosstab(self):
+        self.check_table(SparseCrossTab.from_labels(self.ltrue, self.lpred))
+
+    def test_degenerate(self):
+        table = SparseCrossTab.from_labels([1, 1, 1], [2, 2, 2])
+        self.assertEqual(1.0, metrics.adjusted_rand_score(table))
+        self.assertEqual((1.0, 1.0, 1.0), metrics.homogeneity_completeness_v_measure(table))
+        table = SparseCrossTab.from_labels([1, 2, 3], [1, 2, 3])
+        self.assertEqual(1.0, metrics.adjusted_rand_score(table))
+        self.assertEqual(1.0, metrics.rand_score(table))
+
+    def test_sliding_window(self):
+        window = 100
+        table = CrossTab.from_labels(self.ltrue[:window], self.lpred[:window])
+        sparse_table = SparseCrossTab.from_labels(self.ltrue[:window], self.lpred[:window])
+        for start in xrange(0, 300, 50):
+            end = start + window
+            for t in (table, sparse_table):
+                t.add_batch(self.ltrue[end:end + 50], self.lpred[end:end + 50])
+                t.add_batch(self.ltrue[start:start + 50], self.lpred[start:start + 50], count=-1)
+            self.assertIsNotNone(table.live_stats)
+            fresh = CrossTab.from_labels(self.ltrue[start + 50:end + 50],
+                                         self.lpred[start + 50:end + 50])
+            self.assertEqual(sorted(fresh.iteritems()), sorted(table.iteritems()))
+            self.assertEqual(sorted(fresh.iteritems()), sorted(sparse_table.iteritems()))
+            self.assertEqual(dict(fresh.row_totals), dict(table.row_totals))
+            self.assertEqual(dict(fresh.col_totals), dict(table.col_totals))
+            for ci, col in fresh.cols.iteritems():
+                self.assertEqual(dict(col), dict(table.cols[ci]))
+            for metric in [metrics.adjusted_rand_score, metrics.mutual_info_score,
+                           metrics.v_measure_score, metrics.fowlkes_mallows_score]:
+                self.assertAlmostEqual(metric(fresh), metric(table))
+                self.assertAlmostEqual(metric(fresh), metric(sparse_table))
+
+    def test_zero_count_updates(self):
+        for cls in [CrossTab, OrderedCrossTab, SparseCrossTab]:
+            table = cls.from_labels([1, 1, 2], ['x', 'y', 'y'])
+            expected = sorted(table.iteritems())
+            table.add(3, 'z', 0)
+            table.add_batch([3, 1], ['z', 'w'], count=0)
+            self.assertEqual(expected, sorted(table.iteritems()))
+            table.add(3, 'z')
+            table.add(3, 'z', -1)
+            self.assertEqual(expected, sorted(table.iteritems()))
+            self.assertEqual({1: 2, 2: 1}, dict(table.row_totals))
+            self.assertEqual({'x': 1, 'y': 2}, dict(table.col_totals))
+
+    def test_live_stats_refresh(self):
+        table = CrossTab.from_labels(self.ltrue, self.lpred)
+        table.add(0, 0)
+        exact = list(table.live_stats)
+        # emulate rounding errors accumulated by running sums
+        table.live_stats[4:] = [x + 1.0 for x in exact[4:]]
+        table._live_updates = containers.LIVE_STATS_REFRESH
+        for expected, actual in zip(exact, table.live_stats):
+            self.assertAlmostEqual(expected, actual)
+        self.assertEqual(0, table._live_updates)
+
+
+if __name__ == '__main__':
+    unittest.main()
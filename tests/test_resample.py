@@ -0,0 +1,67 @@
+import unittest
+import numpy as np
+from pymaptools.containers import CrossTab
+from pymaptools.sparse import SparseCrossTab
+from pymaptools import metrics, resample
+from tests.helpers import noisy_labels
+
+
+class TestResample(unittest.TestCase):
+
+    def setUp(self):
+        self.ltrue, self.lpred = noisy_labels(500, 20, 0.5)
+        self.table = SparseCrossTab.from_labels(self.ltrue, self.lpred)
+
+    def test_replicate_stats(self):
+        """Batched statistics match those of individually built tables"""
+        cells, ri, ci, shape = resample.cell_arrays(self.table)
+        rng = np.random.RandomState(1)
+        counts = rng.multinomial(cells.sum(), cells / float(cells.sum()), size=3)
+        stats = resample._bootstrap_batch(cells, ri, ci, shape, 3, 1)
+        for idx, row in enumerate(counts):
+            table = SparseCrossTab.from_weighted_labels(
+                self.table.row_labels[ri], self.table.col_labels[ci], row)
+            expected = metrics.sufficient_stats(table)
+            self.assertTrue(np.allclose([x[idx] for x in stats], expected))
+
+    def test_permutation_margins(self):
+        """Permutation replicates keep margins and observation counts"""
+        cells, ri, ci, shape = resample.cell_arrays(self.table)
+        stats = resample._permutation_batch(cells, ri, ci, shape, 5, 0)
+        expected = metrics.sufficient_stats(self.table)
+        for idx in (0, 2, 3, 5, 6):
+            self.assertTrue(np.allclose(stats[idx], expected[idx]))
+        # cells can only be as concentrated as margins allow
+        self.assertTrue(np.all(stats[1] <= min(expected[2], expected[3])))
+
+    def test_bootstrap_reproducible(self):
+        """Results depend on random state but not on the number of workers"""
+        kwargs = dict(num_replicates=50, batch_size=7, random_state=42)
+        serial = resample.bootstrap(self.table, metrics.adjusted_rand_score, **kwargs)
+        parallel = resample.bootstrap(self.table, metrics.adjusted_rand_score,
+                                      n_jobs=2, **kwargs)
+        self.assertTrue(np.array_equal(serial, parallel))
+        dict_table = CrossTab.from_labels(self.ltrue.tolist(), self.lpred.tolist())
+        self.assertEqual(len(dict_table.bootstrap(metrics.v_measure_score, 50)), 50)
+
+    def test_bootstrap_interval(self):
+        """Bootstrap distribution is centered near the observed value"""
+        scores = self.table.bootstrap(metrics.adjusted_rand_score, 500, random_state=0)
+        observed = metrics.adjusted_rand_score(self.table)
+        low, high = resample.percentile_interval(scores, 0.99)
+        self.assertLess(low, observed)
+        self.assertGreater(high, observed)
+        self.assertLess(abs(np.mean(scores) - observed), 0.05)
+
+    def test_permutation_null(self):
+        """Unrelated labelings are not significant, related ones are"""
+        rng = np.random.RandomState(0)
+        random_table = SparseCrossTab.from_labels(
+            rng.randint(0, 5, 300), rng.randint(0, 5, 300))
+        _, pvalue, null = random_table.permutation_test(
+            metrics.adjusted_rand_score, 200, random_state=0)
+        self.assertGreater(pvalue, 0.01)
+        self.assertLess(abs(np.mean(null)), 0.02)
+        _, pvalue, _ = self.table.permutation_test(
+            metrics.adjusted_rand_score, 200, random_state=0)
+        self.assertLess(pvalue, 0.01)
@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+from pymaptools.sparse import SparseCrossTab
+from pymaptools.sketch import SketchCrossTab
+from pymaptools import metrics
+from tests.helpers import noisy_labels
+
+
+class TestSketchCrossTab(unittest.TestCase):
+
+    def setUp(self):
+        self.ltrue, self.lpred = noisy_labels(20000, 500, 0.3)
+        self.exact = SparseCrossTab.from_labels(self.ltrue, self.lpred)
+
+    def test_exact_margins(self):
+        """Margins and grand total are tracked exactly"""
+        sketch = SketchCrossTab.from_labels(self.ltrue, self.lpred, width=256)
+        self.assertEqual(sketch.grand_total, self.exact.grand_total)
+        self.assertEqual(dict(sketch.row_totals), dict(self.exact.row_totals))
+        self.assertEqual(dict(sketch.col_totals), dict(self.exact.col_totals))
+        stats = sketch.live_stats
+        exact_stats = metrics.sufficient_stats(self.exact)
+        for idx in (0, 2, 3, 5, 6):
+            self.assertAlmostEqual(stats[idx], exact_stats[idx], places=6)
+
+    def test_metric_accuracy(self):
+        """Metrics from a sketch are close to exact ones"""
+        sketch = SketchCrossTab.from_error_bounds(epsilon=0.1, delta=0.01)
+        sketch.add_batch(self.ltrue, self.lpred)
+        for func in (metrics.adjusted_rand_score, metrics.v_measure_score):
+            self.assertAlmostEqual(func(sketch), func(self.exact), delta=0.05)
+        # entropy error is relative to joint entropy
+        exact_mi = metrics.mutual_info_score(self.exact)
+        self.assertAlmostEqual(metrics.mutual_info_score(sketch), exact_mi,
+                               delta=0.05 * exact_mi)
+
+    def test_point_estimates(self):
+        """Heavy cells are estimated accurately"""
+        sketch = SketchCrossTab.from_labels(self.ltrue, self.lpred)
+        ltrue, lpred, weights = self.exact.to_weighted_labels()
+        for idx in np.argsort(weights)[-10:]:
+            key = (ltrue[idx], lpred[idx])
+            self.assertAlmostEqual(sketch[key], weights[idx], delta=2)
+
+    def test_merge_equals_whole(self):
+        """Merging shard sketches is the same as sketching everything"""
+        params = dict(depth=3, width=512, num_projections=64)
+        whole = SketchCrossTab.from_labels(self.ltrue, self.lpred, **params)
+        shards = [SketchCrossTab.from_labels(self.ltrue[i::3], self.lpred[i::3], **params)
+                  for i in range(3)]
+        merged = shards[0] + shards[1]
+        merged += shards[2]
+        self.assertTrue(np.array_equal(merged._counts, whole._counts))
+        self.assertTrue(np.allclose(merged._projections, whole._projections))
+        self.assertEqual(merged.row_totals, whole.row_totals)
+        with self.assertRaises(ValueError):
+            merged.merge(SketchCrossTab(width=256))
+
+    def test_remove(self):
+        """Removing observations reverts the sketch"""
+        params = dict(depth=3, width=512, num_projections=64)
+        sketch = SketchCrossTab.from_labels(self.ltrue[:100], self.lpred[:100], **params)
+        sketch.add_batch(self.ltrue[100:200], self.lpred[100:200])
+        sketch.add_batch(self.ltrue[100:200], self.lpred[100:200], count=-1)
+        expected = SketchCrossTab.from_labels(self.ltrue[:100], self.lpred[:100], **params)
+        self.assertTrue(np.array_equal(sketch._counts, expected._counts))
+        self.assertEqual(sketch.row_totals, expected.row_totals)
+        self.assertEqual(sketch.shape, expected.shape)
@@ -0,0 +1,205 @@
+import os
+import unittest
+import random
+import shutil
+import tempfile
+import numpy as np
+from pymaptools.containers import CrossTab, OrderedCrossTab
+from pymaptools.sparse import SparseCrossTab
+
+
+def random_labels(num_points, num_classes, seed=0):
+    rng = random.Random(seed)
+    return [rng.randint(0, num_classes - 1) for _ in xrange(num_points)]
+
+
+class TestSparseCrossTab(unittest.TestCase):
+
+    def setUp(self):
+        self.ltrue = random_labels(500, 12, seed=1)
+        self.lpred = random_labels(500, 17, seed=2)
+        self.expected = CrossTab.from_labels(self.ltrue, self.lpred)
+        self.actual = SparseCrossTab.from_labels(self.ltrue, self.lpred)
+
+    def test_margins(self):
+        self.assertEqual(dict(self.expected.row_totals), dict(self.actual.row_totals))
+        self.assertEqual(dict(self.expected.col_totals), dict(self.actual.col_totals))
+        self.assertEqual(self.expected.grand_total, self.actual.grand_total)
+        self.assertEqual(self.expected.shape, self.actual.shape)
+
+    def test_cells(self):
+        self.assertEqual(len(self.expected), len(self.actual))
+        self.assertEqual(sorted(self.expected.iteritems()), sorted(self.actual.iteritems()))
+        self.assertEqual(sorted(self.expected.iter_all()), sorted(self.actual.iter_all()))
+        self.assertEqual(sorted(self.expected.iter_vals_with_margins()),
+                         sorted(self.actual.iter_vals_with_margins()))
+        self.assertEqual(sorted(self.expected.iter_all_with_margins()),
+                         sorted(self.actual.iter_all_with_margins()))
+        self.assertTrue(self.expected == self.actual)
+        self.assertTrue(self.actual == self.expected)
+
+    def test_orientations(self):
+        for ri, row in self.expected.rows.iteritems():
+            self.assertEqual(dict(row), dict(self.actual.rows[ri]))
+        for ci, col in self.expected.cols.iteritems():
+            self.assertEqual(dict(col), dict(self.actual.cols[ci]))
+
+    def test_dense(self):
+        rows = [[10, 3, 8, 11], [9, 9, 3, 10], [9, 7, 7, 14]]
+        expected = OrderedCrossTab(rows=rows)
+        actual = SparseCrossTab(rows=rows)
+        for kwargs in [{}, {'cpad': True}, {'rpad': True}, {'default': None, 'cpad': True}]:
+            self.assertEqual(expected.to_rows(**kwargs), actual.to_rows(**kwargs))
+        self.assertEqual(expected[:, 2], actual[:, 2])
+        self.assertEqual(expected[1, 1:], actual[1, 1:])
+        self.assertEqual(expected.to_labels(), actual.to_labels())
+
+    def test_from_labels_sparse_path(self):
+        ltrue = random_labels(300, 200, seed=3)
+        lpred = random_labels(300, 250, seed=4)
+        expected = CrossTab.from_labels(ltrue, lpred)
+        actual = SparseCrossTab.from_labels(ltrue, lpred)
+        self.assertEqual(sorted(expected.iteritems()), sorted(actual.iteritems()))
+        self.assertEqual(expected.grand_total, actual.grand_total)
+
+    def test_from_labels_mixed(self):
+        ltrue = ['a', ('b', 1), 'a', 3]
+        lpred = [1, 1, 2, 2]
+        expected = CrossTab.from_labels(ltrue, lpred)
+        actual = SparseCrossTab.from_labels(ltrue, lpred)
+        self.assertEqual(sorted(expected.iteritems()), sorted(actual.iteritems()))
+
+    def test_from_labels_empty(self):
+        t = SparseCrossTab.from_labels([], [])
+        self.assertEqual((0, 0), t.shape)
+        self.assertEqual(0, t.grand_total)
+
+    def test_from_partitions(self):
+        p1 = [[5, 6, 7, 8], [9, 10, 11], [0, 1, 2, 3, 4]]
+        p2 = [[0, 1, 5, 6, 9], [2, 3, 7], [8, 10, 11], [4]]
+        expected = CrossTab.from_partitions(p1, p2)
+        actual = SparseCrossTab.from_partitions(p1, p2)
+        self.assertEqual(sorted(expected.iteritems()), sorted(actual.iteritems()))
+
+    def test_merge(self):
+        shards = [(self.ltrue[i:i + 120], self.lpred[i:i + 120]) for i in xrange(0, 500, 120)]
+        partial = [SparseCrossTab.from_labels(*shard) for shard in shards]
+        merged = partial[0].merge(*partial[1:])
+        self.assertEqual(sorted(self.expected.iteritems()), sorted(merged.iteritems()))
+        self.assertEqual(self.expected.grand_total, merged.grand_total)
+        total = sum(CrossTab.from_labels(*shard) for shard in shards)
+        self.assertEqual(sorted(self.expected.iteritems()), sorted(total.iteritems()))
+
+    def test_merge_mixed(self):
+        t1 = SparseCrossTab.from_labels(['a', 'b'], [1, 2])
+        t2 = CrossTab(rows={'c': {1: 3}, 'a': {'z': 1}})
+        t1 += t2
+        self.assertEqual(
+            [(('a', 1), 1), (('a', 'z'), 1), (('b', 2), 1), (('c', 1), 3)],
+            sorted(t1.iteritems()))
+        t3 = t2 + t2
+        self.assertEqual(8, t3.grand_total)
+        self.assertEqual(4, t2.grand_total)
+
+    def test_from_labels_parallel(self):
+        for cls in [CrossTab, SparseCrossTab]:
+            table = cls.from_labels_parallel(self.ltrue, self.lpred, n_jobs=2)
+            self.assertEqual(sorted(self.expected.iteritems()), sorted(table.iteritems()))
+
+    def test_weighted_round_trip(self):
+        for table in [self.expected, self.actual]:
+            cls = table.__class__
+            restored = cls.from_weighted_labels(*table.to_weighted_labels())
+            self.assertEqual(sorted(table.iteritems()), sorted(restored.iteritems()))
+            restored = cls.from_partition_runs(*table.to_partition_runs())
+            self.assertEqual(sorted(table.to_rows()), sorted(restored.to_rows()))
+            restored = cls.from_weighted_clusters(table.to_weighted_clusters())
+            self.assertEqual(sorted(table.iter_row_totals()), sorted(restored.iter_row_totals()))
+            self.assertEqual(sorted(table.iter_col_totals()), sorted(restored.iter_col_totals()))
+
+    def test_weighted_large_counts(self):
+        table = SparseCrossTab(rows={'a': {'x': 10 ** 9, 'y': 3}, 'b': {'y': 10 ** 9}})
+        ptrue, ppred = table.to_partition_runs()
+        self.assertEqual([[(0, 10 ** 9 + 3)], [(10 ** 9 + 3, 2 * 10 ** 9 + 3)]], sorted(ptrue))
+        restored = SparseCrossTab.from_partition_runs(ptrue, ppred)
+        self.assertEqual(table.grand_total, restored.grand_total)
+        self.assertEqual(sorted(table.itervalues()), sorted(restored.itervalues()))
+
+    def test_save_load(self):
+        dirname = tempfile.mkdtemp()
+        try:
+            table = SparseCrossTab.from_labels(
+                ['a', ('b', 1), 'a', 3] * 10, range(40))
+            for path, kwargs in [(os.path.join(dirname, 'table.npz'), {}),
+                                 (os.path.join(dirname, 'compressed.npz'), {'compressed': True}),
+                                 (os.path.join(dirname, 'table'), {})]:
+                table.save_to(path, **kwargs)
+                loaded = SparseCrossTab.load_from(path)
+                self.assertEqual(sorted(table.iteritems()), sorted(loaded.iteritems()))
+                self.assertEqual(dict(table.row_totals), dict(loaded.row_totals))
+            loaded = SparseCrossTab.load_from(os.path.join(dirname, 'table'), mmap_mode='r')
+            # read-only views of mapped memory rather than copies
+            self.assertIsInstance(loaded.row_margin, np.memmap)
+            self.assertFalse(loaded.csr.data.flags.writeable)
+            self.assertFalse(loaded.csr.indices.flags.writeable)
+            self.assertEqual(table.grand_total, loaded.grand_total)
+            self.assertEqual(table, loaded)
+            with self.assertRaises(ValueError):
+                SparseCrossTab.load_from(os.path.join(dirname, 'table.npz'), mmap_mode='r')
+        finally:
+            shutil.rmtree(dirname)
+
+    def test_canonical_equality(self):
+        """Tables built differently compare equal and have equal digests"""
+        shuffled = range(len(self.ltrue))
+        random.Random(0).shuffle(shuffled)
+        ltrue = [self.ltrue[idx] for idx in shuffled]
+        lpred = [self.lpred[idx] for idx in shuffled]
+        for table, other in [(self.actual, SparseCrossTab(rows=self.expected.rows)),
+                             (self.expected, OrderedCrossTab.from_labels(ltrue, lpred)),
+                             (self.expected, self.actual)]:
+            self.assertEqual(table, other)
+            self.assertEqual(table.content_hash, other.content_hash)
+        # labels of other types and fractional counts
+        for ltrue, lpred in [(['a', u'b', 'a'], [('x', 1), ('y', 2), ('x', 1)]),
+                             ([1.5, 2, 2], ['x', 3, 3])]:
+            table = CrossTab.from_labels(ltrue, lpred)
+            self.assertEqual(table.content_hash,
+                             SparseCrossTab.from_labels(ltrue, lpred).content_hash)
+            table.add(ltrue[0], lpred[0], 0.5)
+            self.assertEqual(table.content_hash, SparseCrossTab(rows=table.rows).content_hash)
+        self.assertNotEqual(CrossTab.from_labels([1], [2]).content_hash,
+                            CrossTab.from_labels([2], [1]).content_hash)
+
+    def test_cached_digest_rejection(self):
+        """Tables with different cached digests are unequal without comparing cells"""
+        for cls in [CrossTab, SparseCrossTab]:
+            table = cls.from_labels(self.ltrue, self.lpred)
+            other = cls.from_labels(self.ltrue, self.lpred)
+            self.assertEqual(table.content_hash, other.content_hash)
+            self.assertEqual(table, other)
+            other._content_hash = 'stale'
+            self.assertNotEqual(table, other)
+
+    def test_canonical_invalidation(self):
+        """Cached digests are invalidated by updates"""
+        for table in [CrossTab.from_labels(self.ltrue, self.lpred),
+                      SparseCrossTab.from_labels(self.ltrue, self.lpred)]:
+            old_hash = table.content_hash
+            table.merge(type(table).from_labels([self.ltrue[0]], [self.lpred[0]]))
+            self.assertNotEqual(table.content_hash, old_hash)
+            table.merge(type(table).from_labels(self.ltrue, self.lpred))
+            self.assertNotEqual(table.content_hash, old_hash)
+
+    def test_equality_after_row_write(self):
+        """Direct writes to rows of dict-based tables are seen by comparison"""
+        table = CrossTab.from_labels(self.ltrue, self.lpred)
+        other = CrossTab.from_labels(self.ltrue, self.lpred)
+        self.assertEqual(table, other)
+        table.rows[self.ltrue[0]][self.lpred[0]] += 1
+        self.assertNotEqual(table, other)
+        self.assertNotEqual(table, self.actual)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,8 @@
 __author__ = 'escherba'
 
 import unittest
-from pymaptools.unionfind import UnionFind
+import random
+from pymaptools.unionfind import UnionFind, label_disjoint_sets
 
 
 class TestUnionFind(unittest.TestCase):
@@ -12,6 +13,22 @@ class TestUnionFind(unittest.TestCase):
         uf.union(3, 0)
         self.assertEqual(uf.sets(), [[0, 1, 2, 3]])
 
+    def test_label_disjoint_sets(self):
+        rng = random.Random(0)
+        pairs = [(rng.randint(0, 99), rng.randint(0, 99)) for _ in xrange(60)]
+        uf = UnionFind()
+        for item in xrange(100):
+            uf[item]
+        for a, b in pairs:
+            uf.union(a, b)
+        labels = label_disjoint_sets(100, pairs)
+        self.assertEqual(sorted(sorted(s) for s in uf.sets()),
+                         sorted(sorted(i for i in xrange(100) if labels[i] == label)
+                                for label in set(labels)))
+        # sets are numbered in the order of their lowest item
+        self.assertEqual(range(len(set(labels))), sorted(set(labels)))
+        self.assertEqual(0, labels[0])
+
 
 if __name__ == '__main__':
     unittest.main()